@@ -0,0 +1,191 @@
+# Python standard libraries
+import os
+import asyncio
+from typing import AsyncIterator, Optional
+# external libraries
+from pydantic import BaseModel, ValidationError
+# Internal imports
+from model import validate_input, generate_sentence
+from llm_client import is_retryable, CircuitOpenError
+from storage import Storage, storage
+from uploads import JsonArraySplitter
+from config import BATCH_CONCURRENCY, BATCH_MAX_RETRIES, BATCH_RETRY_BACKOFF_SECONDS, MAX_UPLOAD_BYTES
+from logger import get_logger
+
+logger = get_logger()
+
+""" Batch generation: validates many daily inputs and fans the LLM calls out with bounded concurrency """
+
+
+# record sources, each one yields (item_id, input_id, data) where data is raw JSON text (validated in one pass
+# by validate_input) or None when the record could not be read; input_id links the output to a stored input (None if not stored)
+
+async def iter_directory_records(folder: str) -> AsyncIterator[tuple[str, None, Optional[str]]]:
+    names = await asyncio.to_thread(
+        lambda: sorted(entry.name for entry in os.scandir(folder) if entry.is_file() and entry.name.endswith(".json"))
+    )
+    for name in names:
+        path = os.path.join(folder, name)
+        try:
+            text = await asyncio.to_thread(read_text_file, path)
+        except OSError as e:
+            logger.error("Batch: failed to read %s: %r", path, e)
+            text = None
+        yield name, None, text
+
+
+async def iter_id_records(source: Storage, kind: str, input_ids: list[int]) -> AsyncIterator[tuple[int, int, Optional[str]]]:
+    for input_id in input_ids:
+        record = await asyncio.to_thread(source.get_input, kind, input_id, True)
+        if record is None:
+            logger.error("Batch: input %s not found", input_id)
+        yield input_id, input_id, record["payload"] if record else None
+
+
+async def iter_jsonl_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[str, None, Optional[str]]]:
+    # consumes the upload chunk by chunk (uploads.read_chunks) so a large JSONL stream is never held in memory at once
+    buffer = b""
+    line_no = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_no += 1
+            if line.strip():
+                yield f"line{line_no}", None, line.decode("utf-8", errors="replace")
+        if len(buffer) > MAX_UPLOAD_BYTES:
+            raise ValueError(f"Line {line_no + 1} is longer than {MAX_UPLOAD_BYTES} bytes")
+    if buffer.strip():
+        yield f"line{line_no + 1}", None, buffer.decode("utf-8", errors="replace")
+
+
+async def iter_json_array_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[str, None, bytes]]:
+    splitter = JsonArraySplitter()
+    item_no = 0
+    async for chunk in chunks:
+        for item in splitter.feed(chunk):
+            item_no += 1
+            yield f"item{item_no}", None, item
+    splitter.close()
+
+
+async def iter_upload_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[str, None, Optional[str | bytes]]]:
+    """ Records of a bulk upload: a JSON array when its first non-blank byte is "[", otherwise JSONL """
+    head = b""
+    async for chunk in chunks:
+        head += chunk
+        if head.strip():
+            break
+
+    async def replay():
+        yield head
+        async for chunk in chunks:
+            yield chunk
+
+    source = iter_json_array_records if head.lstrip()[:1] == b"[" else iter_jsonl_records
+    async for record in source(replay()):
+        yield record
+
+
+def read_text_file(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+async def generate_with_retry(
+    input_wrapper: BaseModel,
+    system_prompt: str,
+    output_validation_model: type[BaseModel],
+    daily: bool,
+    max_retries: int) -> BaseModel:
+    # generate_sentence has already retried the LLM call (LLM_MAX_RETRIES); this retries it again, later
+    attempt = 0
+    while True:
+        try:
+            return await generate_sentence(input_wrapper, system_prompt, output_validation_model, daily)
+        except CircuitOpenError:
+            # the LLM is failing for every call: report the item now instead of queueing it behind the circuit
+            raise
+        except Exception as e:
+            # invalid output and 4xx get the same answer when retried
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = BATCH_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+            attempt += 1
+            logger.warning("Batch item failed (%r), retry %s/%s in %ss", e, attempt, max_retries, delay)
+            await asyncio.sleep(delay)
+
+
+def save_batch_output(kind: str, input_id: Optional[int], data: dict) -> dict:
+    # the output of a stored input belongs to that input's user; uploaded records belong to no user
+    record = storage.get_input(kind, input_id, True) if input_id is not None else None
+    return storage.save_output(kind, input_id, data, record["user"] if record else None)
+
+
+async def generate_batch(
+    records: AsyncIterator[tuple],
+    system_prompt: str,
+    output_validation_model: type[BaseModel],
+    daily: bool = True,
+    concurrency: int = BATCH_CONCURRENCY,
+    max_retries: int = BATCH_MAX_RETRIES) -> AsyncIterator[dict]:
+    """
+    Validate every record, generate the sentences with at most `concurrency` calls in flight
+    and yield one result dict per record as soon as it is done (completion order, not input order).
+    Each output is saved to the storage as soon as it is generated.
+    """
+    kind = "daily" if daily else "user"
+    work_queue = asyncio.Queue(maxsize=concurrency * 2)
+    results = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for item_id, input_id, data in records:
+                if data is None:
+                    await results.put({"id": item_id, "status": "invalid", "error": "Input not found or unreadable"})
+                    continue
+                try:
+                    input_wrapper = validate_input(data, daily)
+                except (ValueError, TypeError, ValidationError) as e:
+                    await results.put({"id": item_id, "status": "invalid", "error": str(e)})
+                    continue
+                await work_queue.put((item_id, input_id, input_wrapper))
+        except ValueError as e:
+            # the upload itself is broken (too large, malformed array): the records read so far still run
+            logger.error("Batch: reading the records failed: %r", e)
+            await results.put({"id": None, "status": "error", "error": str(e)})
+
+    async def work():
+        while True:
+            item = await work_queue.get()
+            if item is None:
+                return
+            item_id, input_id, input_wrapper = item
+            try:
+                result = await generate_with_retry(input_wrapper, system_prompt, output_validation_model, daily, max_retries)
+                data = result.model_dump(by_alias=True)
+                output = await asyncio.to_thread(save_batch_output, kind, input_id, data)
+                await results.put({"id": item_id, "status": "ok", "output_id": output["id"], **data})
+            except Exception as e:
+                logger.error("Batch item %s failed: %r", item_id, e)
+                await results.put({"id": item_id, "status": "error", "error": str(e)})
+
+    async def run():
+        workers = [asyncio.create_task(work()) for _ in range(concurrency)]
+        try:
+            await produce()
+            for _ in workers:
+                await work_queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await results.put(None)
+
+    runner = asyncio.create_task(run())
+    try:
+        while (result := await results.get()) is not None:
+            yield result
+        await runner
+    finally:
+        runner.cancel()
@@ -0,0 +1,126 @@
+"""
+Shared reporting for the load test and micro-benchmarks: throughput and p50/p95/p99 latency summaries,
+plus saved baselines in benchmarks/baselines/<name>.json that later runs are compared against.
+
+A run fails (exit code 1) when any latency percentile is more than --tolerance slower than the baseline
+or throughput drops by more than --tolerance. In an open-loop run (fixed arrival rate) the throughput is the
+rate that was sent, not what the server can serve, so it is not compared there. Runs with other settings than
+the baseline are not compared (exit code 2). Baselines are machine-specific: record them on the machine
+(or CI runner) that runs the comparison.
+"""
+# Python standard libraries
+import os
+import sys
+import json
+import platform
+from datetime import datetime, timezone
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+
+def percentile(ordered: list, q: float) -> float:
+    """ Nearest-rank percentile of an already sorted list """
+    if not ordered:
+        return 0.0
+    return ordered[min(max(int(len(ordered) * q + 0.5) - 1, 0), len(ordered) - 1)]
+
+
+def summarize(timings: list, wall: float, errors: int = 0) -> dict:
+    """ timings in seconds (successful calls only), wall = elapsed seconds for the whole run """
+    ordered = sorted(timings)
+    summary = {
+        "count": len(ordered),
+        "errors": errors,
+        "throughput": round(len(ordered) / wall, 2) if wall else 0.0,
+    }
+    for name, q in PERCENTILES:
+        summary[f"{name}_ms"] = round(percentile(ordered, q) * 1000, 4)
+    return summary
+
+
+def error_rate(summary: dict) -> float:
+    total = summary["count"] + summary["errors"]
+    return summary["errors"] / total if total else 0.0
+
+
+def format_summary(name: str, summary: dict) -> str:
+    return (f"{name:<22} n={summary['count']:<6} errors={summary['errors']:<4} "
+            f"throughput={summary['throughput']:9.1f}/s  p50={summary['p50_ms']:9.3f} ms  "
+            f"p95={summary['p95_ms']:9.3f} ms  p99={summary['p99_ms']:9.3f} ms")
+
+
+def add_arguments(parser):
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare this run with the stored baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a run counts as a regression")
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(name: str, results: dict, settings: dict):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    document = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "settings": settings,
+        "results": results,
+    }
+    with open(baseline_path(name), "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2)
+        f.write("\n")
+    print(f"baseline saved to {baseline_path(name)}")
+
+
+def settings_differences(stored: dict, settings: dict) -> list[str]:
+    return [
+        f"{key}: baseline {stored.get(key)!r}, this run {settings.get(key)!r}"
+        for key in sorted(set(stored) | set(settings)) if stored.get(key) != settings.get(key)
+    ]
+
+
+def compare_baseline(baseline: dict, results: dict, tolerance: float, open_loop: bool = False) -> list[str]:
+    """ Regressions of `results` against the baseline results, one line each """
+    regressions = []
+    for case, summary in results.items():
+        before = baseline.get(case)
+        if before is None:
+            continue
+        for metric, _ in PERCENTILES:
+            key = f"{metric}_ms"
+            if before[key] and summary[key] > before[key] * (1 + tolerance):
+                regressions.append(f"{case}: {metric} {before[key]:.3f} -> {summary[key]:.3f} ms")
+        if not open_loop and before["throughput"] and summary["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{case}: throughput {before['throughput']:.1f} -> {summary['throughput']:.1f}/s")
+        # injected errors are random, so the error rate gets one percentage point of slack
+        if error_rate(summary) > error_rate(before) * (1 + tolerance) + 0.01:
+            regressions.append(f"{case}: error rate {error_rate(before):.1%} -> {error_rate(summary):.1%}")
+    return regressions
+
+
+def finish(name: str, results: dict, settings: dict, args, open_loop: bool = False):
+    """ Save and/or compare according to --save-baseline / --compare; exit 1 on a regression,
+    2 when the run does not have the settings of the baseline """
+    if args.compare:
+        if not os.path.exists(baseline_path(name)):
+            sys.exit(f"no baseline at {baseline_path(name)}, run with --save-baseline first")
+        with open(baseline_path(name), "r", encoding="utf-8") as f:
+            document = json.load(f)
+        differences = settings_differences(document["settings"], settings)
+        if differences:
+            print(f"NOT COMPARED: the settings differ from {baseline_path(name)}:")
+            for line in differences:
+                print(f"  {line}")
+            print("run with the baseline settings, or record a new baseline with --save-baseline")
+            sys.exit(2)
+        regressions = compare_baseline(document["results"], results, args.tolerance, open_loop)
+        if regressions:
+            print(f"REGRESSION against {baseline_path(name)} (tolerance {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"OK: within {args.tolerance:.0%} of the baseline")
+    if args.save_baseline:
+        save_baseline(name, results, settings)
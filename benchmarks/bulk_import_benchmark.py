@@ -0,0 +1,96 @@
+"""
+Bulk import benchmark: starts the app (uvicorn, temporary storage) and onboards a cohort of --records users
+with one POST /motivation/input_bulk per size, as JSONL or as a JSON array (--format). Prints the import
+time, records per second and the peak memory (VmHWM) of the app process; each size runs in a fresh app so
+the peaks can be compared, and stay flat when the import runs at constant memory.
+
+Usage:
+    python benchmarks/bulk_import_benchmark.py [--records 10000,100000] [--format jsonl|array]
+"""
+# Python standard libraries
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# external libraries
+import httpx
+# Internal imports
+from load_test import start_app
+
+
+def write_cohort(path: str, records: int, fmt: str):
+    samples = []
+    for sample in sorted(glob.glob(os.path.join(ROOT, "Inputs_Outputs", "inputs", "*.json"))):
+        with open(sample, "r", encoding="utf-8") as f:
+            samples.append(json.load(f))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[" if fmt == "array" else "")
+        for i in range(records):
+            record = samples[i % len(samples)]
+            record = {**record, "user_id": f"cohort-user-{i}"}
+            separator = ("," if i else "") if fmt == "array" else ""
+            f.write(separator + json.dumps(record, ensure_ascii=False) + ("" if fmt == "array" else "\n"))
+        f.write("]" if fmt == "array" else "")
+
+
+def peak_memory_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status", "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run(records: int, args, workdir: str) -> dict:
+    cohort = os.path.join(workdir, f"cohort.{args.format}")
+    write_cohort(cohort, records, args.format)
+    # the app needs an LLM URL but never calls it here
+    app = start_app(args.port, "http://127.0.0.1:9/v1", workdir, {})
+    try:
+        before = peak_memory_mb(app.pid)
+        counts = {}
+        start = time.perf_counter()
+        with open(cohort, "rb") as f, httpx.stream(
+            "POST", f"http://127.0.0.1:{args.port}/motivation/input_bulk",
+            files={"file": (os.path.basename(cohort), f, "application/octet-stream")}, timeout=None
+        ) as response:
+            for line in response.iter_lines():
+                if line:
+                    status = json.loads(line)["status"]
+                    counts[status] = counts.get(status, 0) + 1
+        seconds = time.perf_counter() - start
+        peak = peak_memory_mb(app.pid)
+    finally:
+        app.terminate()
+        app.wait()
+    return {"records": records, "upload_mb": os.path.getsize(cohort) / 2 ** 20, "imported": counts.get("ok", 0),
+            "errors": counts.get("invalid", 0) + counts.get("error", 0), "seconds": seconds,
+            "memory_before_mb": before, "memory_peak_mb": peak}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", default="10000,100000", help="cohort sizes to import")
+    parser.add_argument("--format", default="jsonl", choices=["jsonl", "array"])
+    parser.add_argument("--port", type=int, default=8975)
+    args = parser.parse_args()
+
+    if not os.path.exists("/proc/self/status"):
+        sys.exit("needs /proc to read the memory of the app process (Linux)")
+    for records in (int(n) for n in args.records.split(",")):
+        with tempfile.TemporaryDirectory() as workdir:
+            stats = run(records, args, workdir)
+        print(f"{stats['records']:7} records ({stats['upload_mb']:.1f} MB {args.format}): imported={stats['imported']} "
+              f"errors={stats['errors']}  {stats['seconds']:.1f}s  {stats['imported'] / stats['seconds']:.0f} records/s  "
+              f"app memory {stats['memory_before_mb']:.0f} -> peak {stats['memory_peak_mb']:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
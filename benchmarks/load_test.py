@@ -0,0 +1,194 @@
+"""
+Load test: starts the mock LLM server and the app (uvicorn, both in their own processes, storage and logs
+in a temporary folder) and drives POST /motivation/input, /input_daily and GET /motivation/generate,
+/generate_daily at a fixed arrival rate (open loop: requests are sent on schedule whether or not earlier
+ones have finished, so a slow server shows up as queueing latency instead of a lower request rate).
+Prints throughput and p50/p95/p99 per endpoint.
+
+The LLM latency and error distribution are passed to the mock server, e.g.
+    --llm-latency 0.3 --latency-dist lognormal --errors 500:0.02,429:0.01
+Uploads cycle through the sample files in Inputs_Outputs/inputs and daily_inputs over --users users.
+With --daily-pool the app runs with DAILY_POOL_ENABLED and the pool is filled before the scenarios start,
+so /generate_daily is served from pregenerated sentences.
+
+Usage:
+    python benchmarks/load_test.py [--rps 20] [--duration 10] [--scenarios input,input_daily,generate,generate_daily]
+                                   [--save-baseline] [--compare [--tolerance 0.25]]
+"""
+# Python standard libraries
+import os
+import sys
+import glob
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# external libraries
+import httpx
+# Internal imports
+import baseline
+from connection_pool_benchmark import start_stub
+
+SCENARIOS = ("input", "input_daily", "generate", "generate_daily")
+
+
+def sample_files(folder: str) -> list[tuple[str, bytes]]:
+    files = []
+    for path in sorted(glob.glob(os.path.join(ROOT, "Inputs_Outputs", folder, "*.json"))):
+        with open(path, "rb") as f:
+            files.append((os.path.basename(path), f.read()))
+    return files
+
+
+def start_app(port: int, llm_base_url: str, workdir: str, extra_env: dict, workers: int = 1) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        **extra_env,
+        WORKERS=str(workers),
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "benchmark-key"),
+        LLM_BASE_URL=llm_base_url,
+        LLM_PROVIDERS="",
+        STORAGE_DB_PATH=os.path.join(workdir, "storage.sqlite"),
+        STORAGE_IMPORT_FILES="false",  # start from an empty storage, without the sample files
+        INDEX_DB_PATH=os.path.join(workdir, "counters.sqlite"),
+        RATE_LIMIT_DB_PATH=os.path.join(workdir, "rate_limits.sqlite"),
+        DAILY_POOL_DB_PATH=os.path.join(workdir, "daily_pool.sqlite"),
+        LOG_DIR=os.path.join(workdir, "logs"),
+        RATE_LIMIT_DEFAULT="1000000/1",  # measure the app, not the limiter
+        CACHE_ENABLED="false",  # every generate reaches the (mock) LLM
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    for _ in range(200):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/")
+            return process
+        except httpx.TransportError:
+            time.sleep(0.05)
+    process.kill()
+    raise SystemExit("app did not start")
+
+
+def build_request(scenario: str, i: int, users: int, uploads: dict) -> dict:
+    user_id = f"load-user-{i % users}"
+    if scenario in ("input", "input_daily"):
+        name, body = uploads[scenario][i % len(uploads[scenario])]
+        return {"method": "POST", "url": f"/motivation/{scenario}",
+                "files": {"file": (name, body, "application/json")}, "data": {"user_id": user_id}}
+    return {"method": "GET", "url": f"/motivation/{scenario}", "params": {"user_id": user_id}}
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, rps: float, duration: float,
+                       users: int, uploads: dict) -> dict:
+    timings = []
+    errors = 0
+
+    async def one(i: int):
+        nonlocal errors
+        request = build_request(scenario, i, users, uploads)
+        start = time.perf_counter()
+        try:
+            response = await client.request(**request)
+        except httpx.HTTPError:
+            errors += 1
+            return
+        if response.status_code < 400:
+            timings.append(time.perf_counter() - start)
+        else:
+            errors += 1
+
+    total = int(rps * duration)
+    started = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        # open loop: the i-th request leaves at i / rps whatever happened to the earlier ones
+        delay = started + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+    await asyncio.gather(*tasks)
+    return baseline.summarize(timings, time.perf_counter() - started, errors)
+
+
+async def fill_daily_pool(client: httpx.AsyncClient, users: int):
+    # near-duplicates are dropped, so one fill run can leave a pool short; run again until every pool is full
+    for _ in range(10):
+        await client.post("/motivation/fill_daily_pool")
+        while (stats := (await client.get("/motivation/daily_pool_stats")).json())["running"]:
+            await asyncio.sleep(0.2)
+        if stats["sentences"] >= stats["pool_size"] * users:
+            break
+    print(f"daily pool filled: {stats['sentences']} sentences for {stats['users']} users")
+
+
+async def run(base_url: str, args) -> dict:
+    uploads = {"input": sample_files("inputs"), "input_daily": sample_files("daily_inputs")}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    results = {}
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        # every user needs an input of each kind before the generate scenarios run
+        for i in range(args.users):
+            for scenario in ("input", "input_daily"):
+                await client.request(**build_request(scenario, i, args.users, uploads))
+        if args.daily_pool:
+            await fill_daily_pool(client, args.users)
+        # warm-up: the first generate imports the LLM client, which should not land in the percentiles
+        for scenario in ("generate", "generate_daily"):
+            await client.request(**build_request(scenario, 0, args.users, uploads))
+        for scenario in args.scenarios.split(","):
+            results[scenario] = await run_scenario(client, scenario, args.rps, args.duration, args.users, uploads)
+            print(baseline.format_summary(scenario, results[scenario]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", type=float, default=20.0, help="requests per second per scenario")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="median mock LLM latency in seconds")
+    parser.add_argument("--latency-dist", default="lognormal", choices=["fixed", "uniform", "lognormal"])
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--errors", default="", help="mock LLM error distribution, e.g. 500:0.02,429:0.01")
+    parser.add_argument("--timeout", type=float, default=60.0, help="client timeout per request")
+    parser.add_argument("--daily-pool", action="store_true", help="serve /generate_daily from a prefilled daily pool")
+    parser.add_argument("--workers", type=int, default=1, help="app worker processes")
+    parser.add_argument("--port", type=int, default=8960)
+    parser.add_argument("--llm-port", type=int, default=8961)
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    stub = start_stub(args.llm_port, args.llm_latency, [
+        "--latency-dist", args.latency_dist, "--jitter", str(args.jitter), "--errors", args.errors
+    ])
+    with tempfile.TemporaryDirectory() as workdir:
+        extra_env = {}
+        if args.daily_pool:
+            # enough sentences per user that the measured requests never run the pool dry
+            extra_env = {"DAILY_POOL_ENABLED": "true", "DAILY_POOL_SIZE": str(int(args.rps * args.duration / args.users) + 2)}
+        app = start_app(args.port, f"http://127.0.0.1:{args.llm_port}/v1", workdir, extra_env, args.workers)
+        try:
+            results = asyncio.run(run(f"http://127.0.0.1:{args.port}", args))
+        finally:
+            app.terminate()
+            app.wait()
+            stub.terminate()
+
+    settings = {key: getattr(args, key) for key in ("rps", "duration", "users", "llm_latency", "latency_dist", "jitter", "errors", "daily_pool", "workers")}
+    baseline.finish("load_test", results, settings, args, open_loop=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Micro-benchmarks for the hot helpers, in one process and without the HTTP layer:
+    base_generate        read input file -> validate -> LLM call (mock server, --llm-latency) -> write output file
+    parse_json_output    text_cleaner on a chatty, fenced model answer
+    get_next_index_file  SQLite counter allocation for the next inputN.json name
+Each prints throughput and p50/p95/p99; --save-baseline / --compare work as in load_test.py.
+
+Usage:
+    python benchmarks/micro_benchmarks.py [--calls 500] [--llm-latency 0] [--save-baseline] [--compare]
+"""
+# Python standard libraries
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+WORKDIR = tempfile.mkdtemp(prefix="motivation-bench-")
+MOCK_PORT = 8962
+os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{MOCK_PORT}/v1"
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+os.environ["INDEX_DB_PATH"] = os.path.join(WORKDIR, "counters.sqlite")
+os.environ["LOG_DIR"] = os.path.join(WORKDIR, "logs")
+os.environ["LOG_LEVEL"] = "WARNING"
+os.environ["CACHE_ENABLED"] = "false"
+
+# Internal imports
+import baseline
+from connection_pool_benchmark import start_stub
+
+
+def measure(func, calls: int, batch: int = 1) -> dict:
+    """ One sample per `batch` calls (time per call), so microsecond helpers are not lost in timer noise """
+    timings = []
+    started = time.perf_counter()
+    for _ in range(calls // batch):
+        start = time.perf_counter()
+        for _ in range(batch):
+            func()
+        timings.append((time.perf_counter() - start) / batch)
+    summary = baseline.summarize(timings, time.perf_counter() - started)
+    summary["count"] *= batch
+    summary["throughput"] = round(summary["throughput"] * batch, 2)
+    return summary
+
+
+async def measure_async(func, calls: int) -> dict:
+    timings = []
+    started = time.perf_counter()
+    for _ in range(calls):
+        start = time.perf_counter()
+        await func()
+        timings.append(time.perf_counter() - start)
+    return baseline.summarize(timings, time.perf_counter() - started)
+
+
+def bench_base_generate(calls: int) -> dict:
+    import prompts
+    from model import base_generate
+    from validations.pydantic_validation import MotivationOutputValidation
+
+    input_file = os.path.join(ROOT, "Inputs_Outputs", "inputs", "input1.json")
+    output_file = os.path.join(WORKDIR, "output.json")
+
+    def one():
+        return base_generate(input_file, output_file, prompts.SINGLE_GENERATE_PROMPT, MotivationOutputValidation, False)
+
+    async def run():
+        await one()  # warm-up: client creation and lazy imports
+        return await measure_async(one, calls)
+
+    return asyncio.run(run())
+
+
+def bench_parse_json_output(calls: int) -> dict:
+    from mock_llm_server import CHATTY_SENTENCE
+    from validations.text_cleaner import parse_json_output
+
+    return measure(lambda: parse_json_output(CHATTY_SENTENCE), calls, batch=100)
+
+
+def bench_get_next_index_file(calls: int) -> dict:
+    from file_indexer import get_next_index_file
+
+    folder = os.path.join(WORKDIR, "inputs")
+    os.makedirs(folder, exist_ok=True)
+    get_next_index_file(folder, "input")  # seeds the counter
+    return measure(lambda: get_next_index_file(folder, "input"), calls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="mock LLM latency in seconds for base_generate")
+    baseline.add_arguments(parser)
+    args = parser.parse_args()
+
+    stub = start_stub(MOCK_PORT, args.llm_latency)
+    try:
+        results = {
+            "base_generate": bench_base_generate(args.calls),
+            # the two local helpers are cheap, so they get more iterations for stable percentiles
+            "parse_json_output": bench_parse_json_output(args.calls * 200),
+            "get_next_index_file": bench_get_next_index_file(args.calls * 2),
+        }
+    finally:
+        stub.terminate()
+    for name, summary in results.items():
+        print(baseline.format_summary(name, summary))
+    baseline.finish("micro_benchmarks", results, {"calls": args.calls, "llm_latency": args.llm_latency}, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Local OpenAI-compatible stub for benchmarks: answers POST /v1/chat/completions (plain and streaming)
+with a fixed motivational sentence after an optional delay, so benchmarks need no API key or network.
+With --limit each API key may send that many requests per --window seconds; the stub then answers with
+x-ratelimit-* headers and 429 like OpenAI does.
+With --malformed a share of the plain-text answers is a bare sentence instead of JSON, the way real
+models sometimes ignore the format instruction; requests using response_format (JSON mode or
+structured output) always get clean JSON.
+Sentences are assembled from random phrases, so answers differ like a model's would; --repeat makes that
+share of sentences a repeat of a recent one (to exercise near-duplicate suppression). Prompts asking for
+"motivational_sentences" get a list with the requested number of sentences.
+--latency-dist spreads the delay around --latency (uniform, or lognormal for the long tail real providers
+have) and --errors injects failures with the given probabilities: HTTP statuses, "timeout" (no answer
+within the client's timeout) and "reset" (connection dropped), e.g. --errors 500:0.02,429:0.01,timeout:0.005
+
+Usage:
+    python benchmarks/mock_llm_server.py [--port 8911] [--latency 0.05] [--latency-dist fixed] [--jitter 0.5]
+                                         [--errors ""] [--limit 0] [--window 60] [--malformed 0] [--repeat 0]
+Then point the app at it with LLM_BASE_URL=http://127.0.0.1:8911/v1
+"""
+# Python standard libraries
+import re
+import json
+import math
+import time
+import random
+import socket
+import argparse
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+PLAIN_SENTENCE = "Every small step you take today builds the person you want to be."
+SENTENCE = json.dumps({"motivational_sentence": PLAIN_SENTENCE})
+# plain-text answers usually come wrapped in some chatter
+CHATTY_SENTENCE = f"Here is your motivational sentence:\n```json\n{SENTENCE}\n```\nI hope it brightens the day!"
+
+OPENINGS = [
+    "Every small step you take today", "The patience you show yourself", "Your calm in busy mornings",
+    "The care you put into each meal", "Choosing rest when you need it", "Your gentle voice at bedtime",
+    "Each walk you fit into the week", "Asking for help when it matters", "The way you plan ahead",
+    "Your laugh on a hard afternoon", "Keeping your promises to yourself", "Every page of your journal",
+]
+MIDDLES = [
+    "is quietly building", "already shapes", "keeps growing into", "is the first brick of",
+    "makes room for", "lights the path toward", "turns slowly into", "lays the ground for",
+    "is shaping", "feeds", "will soon bloom into", "carries you toward",
+]
+ENDINGS = [
+    "the stronger version of you.", "a calmer home next month.", "the hug you have been waiting for.",
+    "a weekend full of small joys.", "the confidence your child will copy.", "deep rest by Sunday evening.",
+    "a morning you will remember.", "the family rhythm you dreamed about.", "a lighter heart in spring.",
+    "proud moments at the next checkup.", "a new favourite routine together.", "the peace you truly deserve.",
+]
+MULTI_COUNT = re.compile(r"Write (\d+) different sentences")
+
+
+def random_sentence() -> str:
+    return f"{random.choice(OPENINGS)} {random.choice(MIDDLES)} {random.choice(ENDINGS)}"
+
+
+def completion_body(content: str, prompt: str) -> bytes:
+    # ~4 characters per token, enough to compare token use between output modes
+    prompt_tokens, completion_tokens = len(prompt) // 4, len(content) // 4 + 1
+    return json.dumps({
+        "id": "mock", "object": "chat.completion", "created": 0, "model": "mock",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }).encode()
+
+
+def parse_errors(spec: str) -> list[tuple[str, float]]:
+    """ "500:0.02,timeout:0.01" -> [("500", 0.02), ("timeout", 0.01)] """
+    errors = []
+    for part in filter(None, (item.strip() for item in spec.split(","))):
+        kind, _, rate = part.partition(":")
+        errors.append((kind, float(rate)))
+    return errors
+
+
+def chunk_event(delta: dict, finish_reason=None) -> bytes:
+    chunk = {
+        "id": "mock", "object": "chat.completion.chunk", "created": 0, "model": "mock",
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n".encode()
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse by the client is visible
+    # headers and body go out as separate writes; without TCP_NODELAY delayed ACKs add ~40 ms per reused connection
+    disable_nagle_algorithm = True
+    latency = 0.0
+    latency_dist = "fixed"  # fixed / uniform / lognormal
+    jitter = 0.5  # uniform: +/- share of latency, lognormal: sigma
+    errors = []  # [(HTTP status / "timeout" / "reset", probability)]
+    timeout_seconds = 120.0
+    malformed = 0.0  # share of plain-text answers that are not JSON
+    repeat = 0.0  # share of sentences that repeat a recent one
+    recent = deque(maxlen=100)
+    limit = 0  # requests per key and window, 0 = unlimited
+    window = 60.0
+    connections = 0
+    windows = {}  # api key -> (window start, requests)
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with MockHandler.lock:
+            MockHandler.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def draw_latency(self) -> float:
+        if self.latency_dist == "uniform":
+            return random.uniform(self.latency * (1 - self.jitter), self.latency * (1 + self.jitter))
+        if self.latency_dist == "lognormal" and self.latency > 0:
+            # median = latency, with a long right tail
+            return random.lognormvariate(math.log(self.latency), self.jitter)
+        return self.latency
+
+    def draw_error(self):
+        roll = random.random()
+        for kind, rate in self.errors:
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+    def inject_error(self, error: str):
+        if error == "reset":
+            self.close_connection = True
+            self.connection.shutdown(socket.SHUT_RDWR)
+        elif error == "timeout":
+            time.sleep(self.timeout_seconds)
+            self.close_connection = True
+        else:
+            payload = {"error": {"message": f"Injected error {error}", "type": "server_error", "code": None}}
+            self.send_json(int(error), json.dumps(payload).encode(), {"retry-after": "0.1"} if error == "429" else {})
+
+    def next_sentence(self) -> str:
+        with MockHandler.lock:
+            if MockHandler.recent and random.random() < self.repeat:
+                # same words, different case and punctuation: a near-duplicate, not a byte-for-byte copy
+                return random.choice(MockHandler.recent).lower().rstrip(".") + "!"
+            sentence = random_sentence()
+            MockHandler.recent.append(sentence)
+            return sentence
+
+    def rate_limit_headers(self) -> tuple[bool, dict]:
+        if not self.limit:
+            return True, {}
+        key = self.headers.get("Authorization", "")
+        now = time.time()
+        with MockHandler.lock:
+            started, used = MockHandler.windows.get(key, (now, 0))
+            if now - started >= self.window:
+                started, used = now, 0
+            allowed = used < self.limit
+            used += allowed
+            MockHandler.windows[key] = (started, used)
+        reset = f"{max(self.window - (now - started), 0.001):.3f}s"
+        headers = {
+            "x-ratelimit-limit-requests": str(self.limit),
+            "x-ratelimit-remaining-requests": str(self.limit - used),
+            "x-ratelimit-reset-requests": reset,
+        }
+        if not allowed:
+            headers["retry-after"] = f"{max(self.window - (now - started), 0.001):.3f}"
+        return allowed, headers
+
+    def send_json(self, status: int, payload: bytes, headers: dict):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        # GET /stats: connections accepted so far, read by the benchmarks
+        self.send_json(200, json.dumps({"connections": MockHandler.connections}).encode(), {})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        error = self.draw_error()
+        if error is not None:
+            self.inject_error(error)
+            return
+        allowed, headers = self.rate_limit_headers()
+        if not allowed:
+            error = {"error": {"message": "Rate limit reached for requests", "type": "requests", "code": "rate_limit_exceeded"}}
+            self.send_json(429, json.dumps(error).encode(), headers)
+            return
+        delay = self.draw_latency()
+        if delay > 0:
+            time.sleep(delay)
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            events = [chunk_event({"content": SENTENCE[i:i + 8]}) for i in range(0, len(SENTENCE), 8)]
+            events += [chunk_event({}, "stop"), b"data: [DONE]\n\n"]
+            for event in events:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+            self.wfile.write(b"0\r\n\r\n")
+            return
+        prompt = " ".join(str(message.get("content", "")) for message in body.get("messages", []))
+        multi = MULTI_COUNT.search(prompt)
+        if multi or '"motivational_sentences"' in prompt:
+            count = int(multi.group(1)) if multi else 2
+            content = json.dumps({"motivational_sentences": [self.next_sentence() for _ in range(count)]})
+            if "response_format" not in body and "could not be used" not in prompt:
+                content = f"Here are your sentences:\n```json\n{content}\n```"
+        elif "response_format" in body or "could not be used" in prompt:
+            content = json.dumps({"motivational_sentence": self.next_sentence()})  # JSON mode / structured output, or a repair request
+        elif random.random() < self.malformed:
+            content = self.next_sentence()
+        else:
+            content = CHATTY_SENTENCE.replace(PLAIN_SENTENCE, self.next_sentence())
+        self.send_json(200, completion_body(content, prompt), headers)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # the default backlog of 5 drops connections when many calls start at once
+
+
+def start_server(port: int = 0, latency: float = 0.0, limit: int = 0, window: float = 60.0,
+                 malformed: float = 0.0, latency_dist: str = "fixed", jitter: float = 0.5,
+                 errors: str = "", repeat: float = 0.0) -> ThreadingHTTPServer:
+    """ Start the stub in a daemon thread and return the server (its port is server.server_port) """
+    MockHandler.latency = latency
+    MockHandler.latency_dist = latency_dist
+    MockHandler.jitter = jitter
+    MockHandler.errors = parse_errors(errors)
+    MockHandler.malformed = malformed
+    MockHandler.repeat = repeat
+    MockHandler.limit = limit
+    MockHandler.window = window
+    server = MockServer(("127.0.0.1", port), MockHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8911)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds to wait before answering (median)")
+    parser.add_argument("--repeat", type=float, default=0.0, help="share of sentences repeating a recent one (0-1)")
+    parser.add_argument("--latency-dist", default="fixed", choices=["fixed", "uniform", "lognormal"])
+    parser.add_argument("--jitter", type=float, default=0.5, help="uniform: +/- share of --latency, lognormal: sigma")
+    parser.add_argument("--errors", default="", help="injected failures, e.g. 500:0.02,429:0.01,timeout:0.005,reset:0.005")
+    parser.add_argument("--limit", type=int, default=0, help="requests allowed per API key and window (0 = unlimited)")
+    parser.add_argument("--window", type=float, default=60.0, help="rate-limit window in seconds")
+    parser.add_argument("--malformed", type=float, default=0.0, help="share of plain-text answers that are not JSON (0-1)")
+    args = parser.parse_args()
+    server = start_server(args.port, args.latency, args.limit, args.window, args.malformed,
+                          args.latency_dist, args.jitter, args.errors, args.repeat)
+    print(f"mock LLM listening on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Multi-sentence benchmark: fills the daily pool (daily_pool.start_fill) of --users users up to --pool-size
+sentences against the stub server, once per SENTENCES_PER_CALL value, and prints LLM calls, prompt tokens
+per pooled sentence and how many near-duplicates were dropped. The stub repeats a recent sentence for
+--repeat of its answers, the way a model without memory of earlier messages does.
+
+Usage:
+    python benchmarks/multi_sentence_benchmark.py [--per-call 1,3,5] [--users 20] [--pool-size 10] [--repeat 0.1]
+"""
+# Python standard libraries
+import os
+import sys
+import json
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+
+
+async def fill(users: int) -> dict:
+    """ Runs in a child process configured for one SENTENCES_PER_CALL value """
+    from storage import storage
+    from daily_pool import sentence_pool, start_fill, stop_refills
+    from provider_pool import provider_pool
+    from metrics import LLM_TOKENS, LLM_PROVIDER_REQUESTS, DAILY_POOL_GENERATED
+
+    with open(os.path.join(ROOT, "Inputs_Outputs", "daily_inputs", "input1.json"), "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    for i in range(users):
+        storage.save_input("daily", payload, f"user{i}")
+    await start_fill()
+    # waits for the fill run like the app's shutdown does
+    await stop_refills(grace_seconds=3600)
+    summary = sentence_pool.stats()["last_fill"]
+    await provider_pool.close()
+    tokens = {dict(key)["type"]: value for key, value in LLM_TOKENS._values.items()}
+    results = {dict(key)["result"]: value for key, value in DAILY_POOL_GENERATED._values.items()}
+    return {
+        "added": summary["added"],
+        "failed_calls": summary["failed_calls"],
+        "duplicates": results.get("duplicate", 0),
+        "llm_calls": sum(LLM_PROVIDER_REQUESTS._values.values()),
+        "prompt_tokens": tokens.get("prompt", 0),
+        "seconds": summary["seconds"],
+    }
+
+
+def run_child(per_call: int, args) -> dict:
+    with tempfile.TemporaryDirectory() as workdir:
+        child_env = dict(
+            os.environ, OPENAI_API_KEY="benchmark-key", LLM_BASE_URL=f"http://127.0.0.1:{args.port}/v1",
+            SENTENCES_PER_CALL=str(per_call), DAILY_POOL_SIZE=str(args.pool_size), LOG_LEVEL="ERROR",
+            LOG_DIR=os.path.join(workdir, "logs"), STORAGE_DB_PATH=os.path.join(workdir, "storage.sqlite"),
+            DAILY_POOL_DB_PATH=os.path.join(workdir, "daily_pool.sqlite"), STORAGE_IMPORT_FILES="false",
+        )
+        result = subprocess.run(
+            [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--child", "--users", str(args.users)],
+            cwd=ROOT, env=child_env, capture_output=True, text=True
+        )
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-call", default="1,3,5", help="SENTENCES_PER_CALL values to compare")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--repeat", type=float, default=0.1, help="share of stub sentences repeating a recent one")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--port", type=int, default=8934)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(asyncio.run(fill(args.users))))
+        return
+
+    sys.path.insert(0, BENCHMARKS)
+    from connection_pool_benchmark import start_stub
+
+    stub = start_stub(args.port, args.latency, ["--repeat", str(args.repeat)])
+    try:
+        for per_call in (int(k) for k in args.per_call.split(",")):
+            stats = run_child(per_call, args)
+            added = max(stats["added"], 1)
+            print(f"{per_call} per call: pooled={stats['added']:4}/{args.users * args.pool_size}  "
+                  f"LLM calls={stats['llm_calls']:4}  prompt tokens/sentence={stats['prompt_tokens'] / added:7.1f}  "
+                  f"near-duplicates dropped={stats['duplicates']:3}  failed calls={stats['failed_calls']}  fill time={stats['seconds']:.2f}s")
+    finally:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Output mode benchmark: generates sentences through model.generate_sentence against the stub server,
+which answers --malformed of the plain-text requests with a bare sentence instead of JSON, and
+compares the output modes (LLM_OUTPUT_MODE):
+
+    text (no repair)  the old behaviour: a malformed answer fails the request and wastes the call
+    text              the same prompt, with one repair call instead of failing
+    json_mode         provider JSON mode
+    json_schema       structured output against MotivationOutputValidation
+
+For each it prints the parse-failure rate, failed requests, LLM calls and completion tokens per sentence.
+
+Usage:
+    python benchmarks/output_mode_benchmark.py [--calls 200] [--malformed 0.1]
+"""
+# Python standard libraries
+import os
+import sys
+import json
+import asyncio
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+
+MODES = [
+    ("text (no repair)", {"LLM_OUTPUT_MODE": "text", "OUTPUT_REPAIR_ENABLED": "false"}),
+    ("text", {"LLM_OUTPUT_MODE": "text"}),
+    ("json_mode", {"LLM_OUTPUT_MODE": "json_mode"}),
+    ("json_schema", {"LLM_OUTPUT_MODE": "json_schema"}),
+]
+
+
+async def generate(calls: int) -> dict:
+    """ Runs in a child process configured for one output mode """
+    import prompts
+    from model import generate_sentence
+    from validations.pydantic_validation import UserMotivationInputWrapper, MotivationOutputValidation
+    from metrics import LLM_OUTPUT_PARSE, LLM_TOKENS, LLM_PROVIDER_REQUESTS
+    from provider_pool import provider_pool
+
+    with open(os.path.join(ROOT, "Inputs_Outputs", "inputs", "input1.json"), "r", encoding="utf-8") as f:
+        wrapper = UserMotivationInputWrapper(**json.load(f))
+    failed = 0
+    for _ in range(calls):
+        try:
+            await generate_sentence(wrapper, prompts.SINGLE_GENERATE_PROMPT, MotivationOutputValidation, False)
+        except Exception:
+            failed += 1
+    await provider_pool.close()
+    parse = {dict(key)["result"]: value for key, value in LLM_OUTPUT_PARSE._values.items()}
+    tokens = {dict(key)["type"]: value for key, value in LLM_TOKENS._values.items()}
+    return {
+        "failed": failed,
+        "parse": parse,
+        "llm_calls": sum(LLM_PROVIDER_REQUESTS._values.values()),
+        "completion_tokens": tokens.get("completion", 0),
+    }
+
+
+def run_mode(env: dict, args) -> dict:
+    child_env = dict(
+        os.environ, OPENAI_API_KEY="benchmark-key", LLM_BASE_URL=f"http://127.0.0.1:{args.port}/v1",
+        CACHE_ENABLED="false", LOG_LEVEL="ERROR", **env
+    )
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", os.path.abspath(__file__), "--child", "--calls", str(args.calls)],
+        cwd=ROOT, env=child_env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--malformed", type=float, default=0.1, help="share of plain-text answers that are not JSON")
+    parser.add_argument("--port", type=int, default=8933)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, ROOT)
+        print(json.dumps(asyncio.run(generate(args.calls))))
+        return
+
+    sys.path.insert(0, BENCHMARKS)
+    from connection_pool_benchmark import start_stub
+
+    stub = start_stub(args.port, 0.0, ["--malformed", str(args.malformed)])
+    try:
+        for name, env in MODES:
+            stats = run_mode(env, args)
+            parse = stats["parse"]
+            total = sum(parse.values())
+            failure_rate = (parse.get("repaired", 0) + parse.get("failed", 0)) / total if total else 0
+            sentences = args.calls - stats["failed"]
+            print(f"{name:<17} parse failures={failure_rate:6.1%}  failed requests={stats['failed']:4}  "
+                  f"LLM calls/sentence={stats['llm_calls'] / max(sentences, 1):5.2f}  "
+                  f"completion tokens/sentence={stats['completion_tokens'] / max(sentences, 1):6.1f}")
+    finally:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
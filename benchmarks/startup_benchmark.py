@@ -0,0 +1,65 @@
+"""
+Startup benchmark: measures how long `import main` takes in a fresh interpreter
+while every outgoing network connection is blocked.
+
+If importing the app tried to reach the LLM (or any other host) the import would fail,
+so a passing run also proves that startup does no network I/O.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5] [--limit 1.0]
+"""
+# Python standard libraries
+import os
+import sys
+import argparse
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# runs inside the child interpreter: block the network, then time the import
+CHILD_SCRIPT = """
+import socket, time
+
+def _blocked(*args, **kwargs):
+    raise RuntimeError("network access during import")
+
+socket.socket.connect = _blocked
+socket.socket.connect_ex = _blocked
+socket.create_connection = _blocked
+socket.getaddrinfo = _blocked
+
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+
+
+def run_once() -> float:
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "benchmark-key"))
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", CHILD_SCRIPT],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import main failed:\n{result.stderr}")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--limit", type=float, default=1.0, help="maximum allowed median import time (seconds)")
+    args = parser.parse_args()
+
+    run_once()  # first run warms the .pyc cache
+    timings = [run_once() for _ in range(args.runs)]
+    median = statistics.median(timings)
+    print(f"import main: median={median * 1000:.1f} ms  min={min(timings) * 1000:.1f} ms  max={max(timings) * 1000:.1f} ms")
+    if median >= args.limit:
+        raise SystemExit(f"FAIL: median import time {median:.3f}s >= {args.limit}s")
+    print("OK: no network I/O during import and startup is under the limit")
+
+
+if __name__ == "__main__":
+    main()
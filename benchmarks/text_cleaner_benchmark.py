@@ -0,0 +1,84 @@
+"""
+Output parsing micro-benchmark: CPU time per response of the old clean-up path
+(normalize_mixed_text + force_json_closure + json.loads) against the single-pass extract_json_object.
+
+The corpus is every saved response in Inputs_Outputs/outputs and daily_outputs (wrapped the way models
+often answer: in a ```json fence after a short preamble) plus synthetic large responses with Persian
+text and emoji, long chatter around the object and a cut-off tail.
+
+Usage:
+    python benchmarks/text_cleaner_benchmark.py [--repeat 2000]
+"""
+# Python standard libraries
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Internal imports
+from validations.text_cleaner import extract_json_object, normalize_mixed_text, force_json_closure
+
+
+def old_path(text: str):
+    return json.loads(force_json_closure(normalize_mixed_text(text.strip())))
+
+
+def saved_corpus() -> list[str]:
+    responses = []
+    for folder in ("outputs", "daily_outputs"):
+        for path in sorted(glob.glob(os.path.join(ROOT, "Inputs_Outputs", folder, "*.json"))):
+            with open(path, "r", encoding="utf-8") as f:
+                body = f.read()
+            responses.append(f"Here is your sentence:\n```json\n{body}\n```")
+    return responses
+
+
+def synthetic_corpus() -> list[str]:
+    sentence = "هر روز یک قدم کوچک بردار، تو از آنچه فکر می‌کنی قوی‌تری 🌟 Keep going, you are doing great! "
+    chatter = "Sure, happy to help with that request. " * 400
+    big = json.dumps({"motivational_sentence": sentence * 40}, ensure_ascii=False)
+    return [
+        chatter + big + chatter,
+        json.dumps({"motivational_sentence": sentence * 200}, indent=2, ensure_ascii=False),
+        big[:-len(sentence) // 2],  # cut off mid-string
+    ]
+
+
+def cpu_per_call(func, texts: list[str], repeat: int) -> float:
+    start = time.process_time()
+    for _ in range(repeat):
+        for text in texts:
+            try:
+                func(text)
+            except ValueError:
+                pass
+    return (time.process_time() - start) / (repeat * len(texts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    for name, texts, repeat in (
+        ("saved outputs", saved_corpus(), args.repeat),
+        ("synthetic large", synthetic_corpus(), max(args.repeat // 20, 1)),
+    ):
+        old = cpu_per_call(old_path, texts, repeat)
+        new = cpu_per_call(extract_json_object, texts, repeat)
+        print(f"{name:<16} {len(texts):3} responses  old={old * 1e6:9.1f} us  new={new * 1e6:9.1f} us  speed-up={old / new:5.1f}x")
+
+    # the fast path must give the same result as the old one on the (ASCII) saved corpus
+    for text in saved_corpus():
+        assert extract_json_object(text) == old_path(text), text
+    sample = synthetic_corpus()[0]
+    print(f"unicode kept: old={'🌟' in str(old_path(sample))}  new={'🌟' in str(extract_json_object(sample))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Input validation benchmark: validations per second on the saved inputs (Inputs_Outputs/inputs and
+daily_inputs) for the old path and the current one.
+
+    json.loads + Wrapper(**data)     what an upload used to do
+    Wrapper.model_validate_json      parse and validate the uploaded bytes in one pass (pydantic-core)
+    upload + generate, before        json.loads + Wrapper(**data) on upload, and again on the stored payload in /generate
+    upload + generate, now           model_validate_json on the upload bytes and on the stored JSON text (raw=True)
+
+Usage:
+    python benchmarks/validation_benchmark.py [--seconds 1]
+"""
+# Python standard libraries
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+
+# Internal imports
+from validations.pydantic_validation import UserMotivationInputWrapper, DailyMotivationInputWrapper
+
+
+def load_corpus() -> list[tuple[bytes, bool]]:
+    corpus = []
+    for folder, daily in (("inputs", False), ("daily_inputs", True)):
+        for path in sorted(glob.glob(os.path.join(ROOT, "Inputs_Outputs", folder, "*.json"))):
+            with open(path, "rb") as f:
+                corpus.append((f.read(), daily))
+    return corpus
+
+
+def wrapper_for(daily: bool):
+    return DailyMotivationInputWrapper if daily else UserMotivationInputWrapper
+
+
+def old_upload(raw: bytes, daily: bool):
+    return wrapper_for(daily)(**json.loads(raw.decode("utf-8").strip()))
+
+
+def new_upload(raw: bytes, daily: bool):
+    return wrapper_for(daily).model_validate_json(raw)
+
+
+def old_flow(raw: bytes, daily: bool):
+    stored = json.dumps(old_upload(raw, daily).model_dump(), ensure_ascii=False)
+    return wrapper_for(daily)(**json.loads(stored))
+
+
+def new_flow(raw: bytes, daily: bool):
+    stored = json.dumps(new_upload(raw, daily).model_dump(), ensure_ascii=False)
+    return wrapper_for(daily).model_validate_json(stored)
+
+
+def per_second(func, corpus: list, seconds: float) -> float:
+    done = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for raw, daily in corpus:
+            func(raw, daily)
+        done += len(corpus)
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=1.0, help="time spent on each variant")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    for raw, daily in corpus:
+        assert old_upload(raw, daily) == new_upload(raw, daily)
+    print(f"{len(corpus)} saved payloads")
+    for name, func in (
+        ("json.loads + Wrapper(**data)", old_upload),
+        ("Wrapper.model_validate_json", new_upload),
+        ("upload + generate, before", old_flow),
+        ("upload + generate, now", new_flow),
+    ):
+        print(f"{name:<30} {per_second(func, corpus, args.seconds):10.0f} /s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Worker scaling benchmark: starts the mock LLM server and the app with 1, 2, 4... worker processes (WORKERS)
+and drives one scenario of the load test closed loop (--concurrency clients, each sending its next request
+as soon as the previous one is answered) for --duration seconds, so the throughput is the most the app
+serves. Prints requests per second per worker count and the speedup over one worker; with enough cores
+it grows about linearly until the cores (or the single-process mock server and load generator) run out.
+
+Usage:
+    python benchmarks/worker_scaling_benchmark.py [--workers 1,2,4] [--scenario generate] [--concurrency 64] [--duration 10]
+"""
+# Python standard libraries
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# external libraries
+import httpx
+# Internal imports
+import baseline
+from connection_pool_benchmark import start_stub
+from load_test import SCENARIOS, sample_files, start_app, build_request
+
+
+async def drive(base_url: str, args) -> dict:
+    uploads = {"input": sample_files("inputs"), "input_daily": sample_files("daily_inputs")}
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=args.concurrency)
+    timings = []
+    errors = 0
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        for i in range(args.users):
+            for scenario in ("input", "input_daily"):
+                await client.request(**build_request(scenario, i, args.users, uploads))
+        # warm-up: every worker imports and builds its clients before the measured run
+        await asyncio.gather(*(
+            client.request(**build_request(args.scenario, i, args.users, uploads)) for i in range(args.concurrency)
+        ))
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+
+        async def client_loop(n: int):
+            nonlocal errors
+            i = n
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    response = await client.request(**build_request(args.scenario, i, args.users, uploads))
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    timings.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+                i += args.concurrency
+
+        await asyncio.gather(*(client_loop(n) for n in range(args.concurrency)))
+    return baseline.summarize(timings, time.perf_counter() - started, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="worker counts to compare")
+    parser.add_argument("--scenario", default="generate", choices=SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=64, help="clients sending requests back to back")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per worker count")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="mock LLM latency in seconds")
+    parser.add_argument("--port", type=int, default=8970)
+    parser.add_argument("--llm-port", type=int, default=8971)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, scenario {args.scenario}, {args.concurrency} clients, {args.duration:.0f}s per run")
+    stub = start_stub(args.llm_port, args.llm_latency)
+    first = None
+    try:
+        for workers in (int(n) for n in args.workers.split(",")):
+            with tempfile.TemporaryDirectory() as workdir:
+                app = start_app(args.port, f"http://127.0.0.1:{args.llm_port}/v1", workdir, {}, workers)
+                try:
+                    summary = asyncio.run(drive(f"http://127.0.0.1:{args.port}", args))
+                finally:
+                    app.terminate()
+                    app.wait()
+            first = first or summary["throughput"]
+            speedup = summary["throughput"] / first if first else 0.0
+            print(f"{workers} worker(s): {baseline.format_summary(args.scenario, summary)}  "
+                  f"speedup={speedup:.2f}x  per worker={speedup / workers:.0%}")
+    finally:
+        stub.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Python standard libraries
+import asyncio
+from typing import AsyncIterator
+# external libraries
+from pydantic import ValidationError
+# Internal imports
+from validations.pydantic_validation import UserBulkInputRecord, DailyBulkInputRecord
+from storage import storage, new_user_id
+from config import BULK_IMPORT_BATCH_SIZE
+from logger import get_logger
+
+logger = get_logger()
+
+""" Bulk import of inputs (/input_bulk): the records of an upload are validated and stored
+BULK_IMPORT_BATCH_SIZE at a time, one storage transaction per batch, so a cohort of any size is imported
+at constant memory and every record gets its own result """
+
+RECORD_MODELS = {"user": UserBulkInputRecord, "daily": DailyBulkInputRecord}
+
+
+def import_batch(kind: str, batch: list[tuple[str, str | bytes]]) -> list[dict]:
+    """ Validate (item_id, raw JSON) records and store the valid ones; one result per record, in order """
+    record_model = RECORD_MODELS[kind]
+    results, valid = [], []
+    for item_id, data in batch:
+        try:
+            record = record_model.model_validate_json(data)
+        except ValidationError as e:
+            results.append({"id": item_id, "status": "invalid", "error": str(e)})
+            continue
+        user_id = record.user_id or new_user_id()
+        results.append({"id": item_id, "status": "ok", "user_id": user_id})
+        valid.append((len(results) - 1, (record.model_dump(exclude={"user_id"}), user_id)))
+    saved = storage.save_inputs(kind, [entry for _, entry in valid])
+    for (index, _), record in zip(valid, saved):
+        results[index]["input_id"] = record["id"]
+    return results
+
+
+async def import_records(records: AsyncIterator[tuple], kind: str,
+                         batch_size: int = BULK_IMPORT_BATCH_SIZE) -> AsyncIterator[dict]:
+    """ Yield the result of every record (see batch_generator for the record sources) as its batch is stored """
+    batch = []
+    try:
+        async for item_id, _, data in records:
+            batch.append((item_id, data))
+            if len(batch) >= batch_size:
+                for result in await asyncio.to_thread(import_batch, kind, batch):
+                    yield result
+                batch = []
+    except ValueError:
+        # the upload broke off (too large, malformed array): the records read before it are still stored
+        for result in await asyncio.to_thread(import_batch, kind, batch):
+            yield result
+        raise
+    if batch:
+        for result in await asyncio.to_thread(import_batch, kind, batch):
+            yield result
@@ -0,0 +1,141 @@
+# Python standard libraries
+import os
+# external libraries
+from dotenv import load_dotenv
+
+""" Central place for the settings read from the .env file / environment """
+
+load_dotenv()
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Server (HOST / PORT are read by main.py when it is run directly)
+# worker processes; state they must agree on (rate limits, counters, storage, daily pool, cache tier) is kept in SQLite
+WORKERS = int(os.getenv("WORKERS", "1"))
+# on SIGTERM, in-flight requests and background LLM calls get this long to finish before they are cancelled
+SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "30"))
+
+# LLM client
+# To connect to the OpenAI GPT API, we utilized https://avalai.ir (any OpenAI-compatible base URL works)
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "https://api.avalai.ir/v1")
+LLM_TEMPERATURE = float(os.getenv("LLM_TEMPERATURE", "0.7"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1000"))
+# Provider pool: JSON list (or path of a JSON file) of {"name", "base_url", "api_key" / "api_key_env", "model", "weight", "rpm"};
+# empty = the single endpoint above
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "")
+LLM_ROUTING = os.getenv("LLM_ROUTING", "round_robin")  # "round_robin" (weighted) or "least_outstanding"
+# how long a throttled key is skipped when the provider does not say when to retry
+LLM_PROVIDER_DRAIN_SECONDS = float(os.getenv("LLM_PROVIDER_DRAIN_SECONDS", "20"))
+# Resilient call layer: deadline per call, retries with exponential backoff, hedging and circuit breaker
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "0.5"))
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+# fire the hedged request after this many seconds; 0 = use the observed p95 latency
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+# Connection pool of the HTTP clients used by ChatOpenAI (shared by all calls of a worker)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"  # needs the h2 package (pip install httpx[http2])
+# send one test request in the background at startup so the first real call finds a warm client
+LLM_WARMUP = os.getenv("LLM_WARMUP", "false").lower() == "true"
+# how long a /health/ready result is reused before the LLM is probed again
+READINESS_CACHE_SECONDS = float(os.getenv("READINESS_CACHE_SECONDS", "30"))
+
+# longest allowed current_situation / challenges / goals / extra_notes in the prompt, in tokens (0 = no limit)
+PROMPT_FIELD_MAX_TOKENS = int(os.getenv("PROMPT_FIELD_MAX_TOKENS", "150"))
+# tiktoken encoding files are kept here; without TOKENIZER_DOWNLOAD only an encoding already in the folder is
+# used (no network access at startup) and prompt tokens are estimated from the length otherwise
+TOKENIZER_CACHE_DIR = os.getenv("TOKENIZER_CACHE_DIR", os.path.join(BASE_DIR, "Inputs_Outputs", "tiktoken"))
+TOKENIZER_DOWNLOAD = os.getenv("TOKENIZER_DOWNLOAD", "false").lower() == "true"
+# How the model is asked for JSON: "text" (prompt only, parsed by validations/text_cleaner),
+# "json_mode" (provider JSON mode) or "json_schema" (structured output against the output model)
+LLM_OUTPUT_MODE = os.getenv("LLM_OUTPUT_MODE", "text")
+# upper bound for motivational_sentence (0 = no limit); also caps max_tokens of the call
+MAX_SENTENCE_CHARS = int(os.getenv("MAX_SENTENCE_CHARS", "0"))
+# one cheap follow-up call that fixes an output that could not be parsed, instead of failing the request
+OUTPUT_REPAIR_ENABLED = os.getenv("OUTPUT_REPAIR_ENABLED", "true").lower() == "true"
+# Maximum number of LLM generations allowed to run at the same time in one worker process
+MAX_CONCURRENT_GENERATIONS = int(os.getenv("MAX_CONCURRENT_GENERATIONS", "32"))
+
+# Batch generation (/generate_batch)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", str(MAX_CONCURRENT_GENERATIONS)))
+# every LLM call already makes 1 + LLM_MAX_RETRIES attempts, so an item makes up to
+# (1 + BATCH_MAX_RETRIES) * (1 + LLM_MAX_RETRIES) of them; batch retries ride out longer transient outages
+BATCH_MAX_RETRIES = int(os.getenv("BATCH_MAX_RETRIES", "1"))
+BATCH_RETRY_BACKOFF_SECONDS = float(os.getenv("BATCH_RETRY_BACKOFF_SECONDS", "2"))
+
+# Uploads: single-input files and every record of a bulk upload are limited to MAX_UPLOAD_BYTES,
+# the whole body of /input_bulk and /generate_batch to MAX_BULK_UPLOAD_BYTES
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(1024 * 1024)))
+MAX_BULK_UPLOAD_BYTES = int(os.getenv("MAX_BULK_UPLOAD_BYTES", str(512 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(64 * 1024)))
+BULK_IMPORT_BATCH_SIZE = int(os.getenv("BULK_IMPORT_BATCH_SIZE", "500"))  # records validated and stored per transaction
+
+# Daily sentence pool: sentences generated off-peak for every user with a daily input, served by /generate_daily
+DAILY_POOL_ENABLED = os.getenv("DAILY_POOL_ENABLED", "false").lower() == "true"
+DAILY_POOL_SIZE = int(os.getenv("DAILY_POOL_SIZE", "7"))  # upcoming sentences kept per user
+DAILY_POOL_REFILL_BELOW = int(os.getenv("DAILY_POOL_REFILL_BELOW", "2"))  # background refill when fewer are left
+DAILY_POOL_SCHEDULE = os.getenv("DAILY_POOL_SCHEDULE", "03:00")  # local time of the daily fill run (HH:MM)
+DAILY_POOL_CONCURRENCY = int(os.getenv("DAILY_POOL_CONCURRENCY", str(BATCH_CONCURRENCY)))
+DAILY_POOL_BATCH_SIZE = int(os.getenv("DAILY_POOL_BATCH_SIZE", "100"))  # roster users loaded per page
+DAILY_POOL_DB_PATH = os.getenv("DAILY_POOL_DB_PATH", os.path.join(BASE_DIR, "Inputs_Outputs", "daily_pool.sqlite"))
+# Sentences asked for per LLM call when the daily pool is filled (1 = one sentence per call, the single-sentence prompt)
+SENTENCES_PER_CALL = int(os.getenv("SENTENCES_PER_CALL", "1"))
+# New pool sentences at least this similar (cosine of character 3-gram vectors, 0-1) to one the user already
+# got or has pooled are dropped; 1 keeps everything but exact repeats
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+DEDUP_HISTORY = int(os.getenv("DEDUP_HISTORY", "200"))  # delivered sentences per user compared against
+
+# Response cache
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "86400"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+# empty = memory only; with several workers the SQLite tier is on by default, so they share cached responses
+CACHE_SQLITE_PATH = os.getenv(
+    "CACHE_SQLITE_PATH", os.path.join(BASE_DIR, "Inputs_Outputs", "response_cache.sqlite") if WORKERS > 1 else ""
+)
+CACHE_SQLITE_MAX_ENTRIES = int(os.getenv("CACHE_SQLITE_MAX_ENTRIES", "100000"))
+CACHE_PURGE_INTERVAL_SECONDS = float(os.getenv("CACHE_PURGE_INTERVAL_SECONDS", "300"))
+# Daily sentences must stay unique, so they are only cached when keyed per day
+DAILY_CACHE_PER_DAY = os.getenv("DAILY_CACHE_PER_DAY", "false").lower() == "true"
+
+# SQLite file holding the atomic counters used to name inputN/outputN files
+INDEX_DB_PATH = os.getenv("INDEX_DB_PATH", os.path.join(BASE_DIR, "Inputs_Outputs", "counters.sqlite"))
+
+# Storage of inputs/outputs: "sqlite" (one indexed database) or "files" (one JSON file per record)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+STORAGE_DB_PATH = os.getenv("STORAGE_DB_PATH", os.path.join(BASE_DIR, "Inputs_Outputs", "storage.sqlite"))
+# import the inputN/outputN files of Inputs_Outputs into a new sqlite storage once, on its first start
+STORAGE_IMPORT_FILES = os.getenv("STORAGE_IMPORT_FILES", "true").lower() == "true"
+
+# Rate limiting: token bucket per client (API key or IP) and route, "<requests>/<seconds>[:<burst>]"
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "1/60")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "sqlite").lower()  # "sqlite" (shared by workers) or "memory"
+RATE_LIMIT_DB_PATH = os.getenv("RATE_LIMIT_DB_PATH", os.path.join(BASE_DIR, "Inputs_Outputs", "rate_limits.sqlite"))
+# with several workers the rpm pacing and drain windows of the LLM_PROVIDERS keys are kept in this SQLite file,
+# so the workers together send a key at most its rpm; a single worker keeps them in process
+LLM_PROVIDER_STATE_DB_PATH = os.getenv("LLM_PROVIDER_STATE_DB_PATH", RATE_LIMIT_DB_PATH) if WORKERS > 1 else ""
+# comma separated keys; a request whose X-API-Key header is one of them is limited per key instead of per address
+RATE_LIMIT_API_KEYS = frozenset(key.strip() for key in os.getenv("RATE_LIMIT_API_KEYS", "").split(",") if key.strip())
+# use the first X-Forwarded-For address as client id (only behind a trusted proxy)
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
+
+# Logging (written to LOG_DIR/app.log by a background thread)
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" or "json" (one JSON object per line)
+LOG_ROTATION = os.getenv("LOG_ROTATION", "size").lower()  # "size" or "time" (daily)
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+# Metrics: with several workers each one writes its samples to this SQLite file, so /metrics (answered by any
+# worker) reports the sum over all of them; a single worker keeps them in process
+METRICS_DB_PATH = os.getenv("METRICS_DB_PATH", os.path.join(LOG_DIR, "metrics.sqlite")) if WORKERS > 1 else ""
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))  # how stale the other workers' values may be
@@ -0,0 +1,311 @@
+# Python standard libraries
+import json
+import time
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+# Internal imports
+import prompts
+from sqlite_db import ThreadConnections, transaction
+from model import validate_input, generate_sentences
+from storage import storage
+from similarity import SimilarityIndex
+from metrics import DAILY_POOL_GENERATED
+from config import (
+    DAILY_POOL_SIZE, DAILY_POOL_REFILL_BELOW, DAILY_POOL_SCHEDULE, DAILY_POOL_CONCURRENCY,
+    DAILY_POOL_BATCH_SIZE, DAILY_POOL_DB_PATH, SENTENCES_PER_CALL, DEDUP_HISTORY
+)
+from logger import get_logger
+
+logger = get_logger()
+
+""" Per-user pool of pregenerated daily sentences.
+
+Once a day at DAILY_POOL_SCHEDULE (off-peak) the scheduler walks the roster of users with a daily input and
+tops every pool up to DAILY_POOL_SIZE sentences, with at most DAILY_POOL_CONCURRENCY LLM calls in flight.
+/generate_daily takes the oldest sentence of the user's pool, so it does not wait for the LLM, and refills
+the pool in the background once fewer than DAILY_POOL_REFILL_BELOW are left. Sentences belong to the input
+they were generated from and are dropped when the user uploads a newer daily input.
+With SENTENCES_PER_CALL > 1 one LLM call yields several sentences, and every new sentence that is a near-duplicate
+of one the user already received or has pooled (similarity.SimilarityIndex) is dropped before it is stored.
+The pool and the state of the fill run live in SQLite, so every worker process sees the same ones.
+"""
+
+# a fill run whose worker died without finishing it stops blocking new runs after this long
+FILL_LEASE_SECONDS = 6 * 3600
+
+
+class SentencePool:
+    def __init__(self, path: str):
+        self.path = path
+        self._connections = ThreadConnections(path, """
+            CREATE TABLE IF NOT EXISTS daily_pool (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user TEXT NOT NULL,
+                input_id INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_daily_pool_user ON daily_pool (user, id);
+            CREATE TABLE IF NOT EXISTS daily_pool_runs (day TEXT PRIMARY KEY, started_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS daily_pool_fill (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                started_at REAL NOT NULL,
+                finished_at REAL,
+                summary TEXT
+            );
+        """)
+        self._conn = self._connections.get
+        self._conn()
+
+    def add(self, user: str, input_id: int, payloads: list[dict]) -> int:
+        """ Store sentences generated from `input_id` up to DAILY_POOL_SIZE; returns how many were stored
+        (fewer when another worker topped the pool up meanwhile) """
+        now = time.time()
+        with transaction(self._conn()) as conn:
+            room = DAILY_POOL_SIZE - conn.execute(
+                "SELECT COUNT(*) FROM daily_pool WHERE user = ? AND input_id = ?", (user, input_id)
+            ).fetchone()[0]
+            payloads = payloads[:max(room, 0)]
+            conn.executemany(
+                "INSERT INTO daily_pool (user, input_id, created_at, payload) VALUES (?, ?, ?, ?)",
+                [(user, input_id, now, json.dumps(payload, ensure_ascii=False)) for payload in payloads]
+            )
+        return len(payloads)
+
+    def sentences(self, user: str) -> list[dict]:
+        rows = self._conn().execute("SELECT payload FROM daily_pool WHERE user = ? ORDER BY id", (user,))
+        return [json.loads(row[0]) for row in rows]
+
+    def size(self, user: str, input_id: int) -> int:
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM daily_pool WHERE user = ? AND input_id = ?", (user, input_id)
+        ).fetchone()[0]
+
+    def take(self, user: str, input_id: int) -> tuple[Optional[dict], int]:
+        """ Remove and return the oldest sentence generated from `input_id` (None when the pool is empty)
+        and the number left; sentences from older inputs of the user are dropped """
+        # one write transaction, so two workers never hand out the same sentence
+        with transaction(self._conn()) as conn:
+            conn.execute("DELETE FROM daily_pool WHERE user = ? AND input_id != ?", (user, input_id))
+            row = conn.execute(
+                "SELECT id, payload FROM daily_pool WHERE user = ? ORDER BY id LIMIT 1", (user,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM daily_pool WHERE id = ?", (row[0],))
+            left = conn.execute("SELECT COUNT(*) FROM daily_pool WHERE user = ?", (user,)).fetchone()[0]
+        return (json.loads(row[1]) if row else None), left
+
+    def claim_run(self, day: str) -> bool:
+        """ True for the first worker asking for `day`, so one scheduled run happens per day across workers """
+        cursor = self._conn().execute(
+            "INSERT OR IGNORE INTO daily_pool_runs (day, started_at) VALUES (?, ?)", (day, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def begin_fill(self) -> bool:
+        """ Mark a fill run as started; False while a run (of any worker) is still going """
+        with transaction(self._conn()) as conn:
+            running = self._fill_running(conn.execute("SELECT started_at, finished_at FROM daily_pool_fill").fetchone())
+            if not running:
+                conn.execute(
+                    "INSERT INTO daily_pool_fill (id, started_at) VALUES (1, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET started_at = excluded.started_at, finished_at = NULL",
+                    (time.time(),)
+                )
+        return not running
+
+    def end_fill(self, summary: Optional[dict]):
+        # a cancelled run has no summary and keeps the previous one
+        self._conn().execute(
+            "UPDATE daily_pool_fill SET finished_at = ?, summary = COALESCE(?, summary)",
+            (time.time(), json.dumps(summary) if summary else None)
+        )
+
+    @staticmethod
+    def _fill_running(row) -> bool:
+        return row is not None and row[1] is None and time.time() - row[0] < FILL_LEASE_SECONDS
+
+    def stats(self) -> dict:
+        users, sentences = self._conn().execute("SELECT COUNT(DISTINCT user), COUNT(*) FROM daily_pool").fetchone()
+        last_run = self._conn().execute("SELECT MAX(day) FROM daily_pool_runs").fetchone()[0]
+        fill = self._conn().execute("SELECT started_at, finished_at, summary FROM daily_pool_fill").fetchone()
+        return {
+            "users": users, "sentences": sentences, "last_run": last_run, "pool_size": DAILY_POOL_SIZE,
+            "running": self._fill_running(fill), "last_fill": json.loads(fill[2]) if fill and fill[2] else None,
+        }
+
+
+sentence_pool = SentencePool(DAILY_POOL_DB_PATH)
+
+# users being refilled by this process, so repeated requests do not start a second refill
+_refilling = set()
+_refill_tasks = set()
+
+
+def seen_sentences(user: str) -> SimilarityIndex:
+    """ Index of the user's last DEDUP_HISTORY delivered sentences and everything in their pool """
+    payloads = [record["payload"] for record in storage.recent_outputs("daily", user, DEDUP_HISTORY)]
+    payloads += sentence_pool.sentences(user)
+    return SimilarityIndex(payload.get("motivational_sentence", "") for payload in payloads)
+
+
+def keep_unique(sentences: list[str], seen: SimilarityIndex) -> list[dict]:
+    """ Output payloads of the sentences that are not near-duplicates of `seen` (or of each other) """
+    unique = []
+    for sentence in sentences:
+        if seen.add_if_new(sentence):
+            unique.append({"motivational_sentence": sentence})
+            DAILY_POOL_GENERATED.inc(result="ok")
+        else:
+            DAILY_POOL_GENERATED.inc(result="duplicate")
+            logger.info("Daily pool: dropped a near-duplicate sentence")
+    return unique
+
+
+def has_pool(record: dict) -> bool:
+    """ Pools belong to a user; an input stored without one (e.g. an imported legacy file) is always served live """
+    return record["user"] is not None
+
+
+async def fill_user(record: dict, semaphore: asyncio.Semaphore) -> tuple[int, int]:
+    """ Top one roster record (a stored daily input, raw payload) up to DAILY_POOL_SIZE; returns (added, failed calls) """
+    if not has_pool(record):
+        return 0, 0
+    user, input_id = record["user"], record["id"]
+    missing = DAILY_POOL_SIZE - await asyncio.to_thread(sentence_pool.size, user, input_id)
+    if missing <= 0:
+        return 0, 0
+    try:
+        input_wrapper = validate_input(record["payload"], True)
+    except Exception as e:
+        logger.error("Daily pool: input %s of %s is invalid: %r", input_id, user, e)
+        return 0, 1
+
+    async def one() -> Optional[list[str]]:
+        async with semaphore:
+            try:
+                return await generate_sentences(input_wrapper, prompts.DAILY_GENERATE_PROMPT, True, SENTENCES_PER_CALL)
+            except Exception as e:
+                DAILY_POOL_GENERATED.inc(result="error")
+                logger.error("Daily pool: generation for %s failed: %r", user, e)
+                return None
+
+    calls = -(-missing // SENTENCES_PER_CALL)
+    batches = await asyncio.gather(*(one() for _ in range(calls)))
+    seen = await asyncio.to_thread(seen_sentences, user)
+    unique = keep_unique([sentence for batch in batches if batch for sentence in batch], seen)[:missing]
+    added = await asyncio.to_thread(sentence_pool.add, user, input_id, unique) if unique else 0
+    return added, batches.count(None)
+
+
+async def generate_now(record: dict) -> tuple[Optional[dict], int]:
+    """ Pool miss: one LLM call for SENTENCES_PER_CALL sentences; the first new one is delivered and the rest
+    pooled. Returns (sentence or None when every one was a near-duplicate, sentences now in the pool) """
+    user, input_id = record["user"], record["id"]
+    input_wrapper = validate_input(record["payload"], True)
+    sentences = await generate_sentences(input_wrapper, prompts.DAILY_GENERATE_PROMPT, True, SENTENCES_PER_CALL)
+    seen = await asyncio.to_thread(seen_sentences, user)
+    unique = keep_unique(sentences, seen)
+    if not unique:
+        return None, 0
+    pooled = await asyncio.to_thread(sentence_pool.add, user, input_id, unique[1:]) if len(unique) > 1 else 0
+    return unique[0], pooled
+
+
+async def start_fill() -> bool:
+    """ Walk the daily-input roster page by page in the background and top every user's pool up;
+    False when a run is already going. The summary of the run ends up in sentence_pool.stats()["last_fill"]. """
+    # marked as started before the task runs, so a status check right after sees it
+    if not await asyncio.to_thread(sentence_pool.begin_fill):
+        return False
+    task = asyncio.create_task(_run_fill())
+    _refill_tasks.add(task)
+    task.add_done_callback(_refill_tasks.discard)
+    return True
+
+
+async def _run_fill() -> Optional[dict]:
+    summary = None
+    try:
+        summary = await _fill_roster()
+    except Exception as e:
+        logger.error("Daily pool fill failed: %r", e)
+    finally:
+        sentence_pool.end_fill(summary)
+    return summary
+
+
+async def _fill_roster() -> dict:
+    semaphore = asyncio.Semaphore(DAILY_POOL_CONCURRENCY)
+    start = time.perf_counter()
+    users = added = failed_calls = 0
+    after_user = None
+    while True:
+        page = await asyncio.to_thread(storage.roster, "daily", after_user, DAILY_POOL_BATCH_SIZE, True)
+        if not page:
+            break
+        for ok, errors in await asyncio.gather(*(fill_user(record, semaphore) for record in page)):
+            added += ok
+            failed_calls += errors
+        users += len(page)
+        after_user = page[-1]["user"]
+    summary = {"users": users, "added": added, "failed_calls": failed_calls, "seconds": round(time.perf_counter() - start, 2)}
+    logger.info("Daily pool fill finished: %s", summary)
+    return summary
+
+
+def schedule_refill(record: dict):
+    """ Top the user's pool up in the background (no-op while a refill for the user is already running) """
+    user = record["user"]
+    if not has_pool(record) or user in _refilling:
+        return
+    _refilling.add(user)
+
+    async def refill():
+        try:
+            await fill_user(record, asyncio.Semaphore(DAILY_POOL_CONCURRENCY))
+        except Exception as e:
+            # nobody awaits the task, so the error is logged here instead of being lost
+            logger.error("Daily pool: refill for %s failed: %r", user, e)
+        finally:
+            _refilling.discard(user)
+
+    task = asyncio.create_task(refill())
+    _refill_tasks.add(task)
+    task.add_done_callback(_refill_tasks.discard)
+
+
+def needs_refill(left: int) -> bool:
+    return left < DAILY_POOL_REFILL_BELOW
+
+
+def seconds_until(clock: str, now: datetime) -> float:
+    hour, minute = (int(part) for part in clock.split(":"))
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+async def run_daily_scheduler():
+    """ Started by the app's lifespan: one fill run per day at DAILY_POOL_SCHEDULE """
+    logger.info("Daily pool scheduler started, fill runs at %s", DAILY_POOL_SCHEDULE)
+    while True:
+        await asyncio.sleep(seconds_until(DAILY_POOL_SCHEDULE, datetime.now()))
+        day = datetime.now().date().isoformat()
+        if not await asyncio.to_thread(sentence_pool.claim_run, day):
+            logger.info("Daily pool fill for %s already started by another worker", day)
+            continue
+        # in the background, so shutdown drains it like the other pool tasks
+        await start_fill()
+
+
+async def stop_refills(grace_seconds: float = 0):
+    """ On shutdown: give running refills and fill runs `grace_seconds` to finish, then cancel the rest """
+    if _refill_tasks and grace_seconds > 0:
+        logger.info("Waiting up to %ss for %s daily pool tasks", grace_seconds, len(_refill_tasks))
+        await asyncio.wait(list(_refill_tasks), timeout=grace_seconds)
+    for task in list(_refill_tasks):
+        task.cancel()
+    await asyncio.gather(*_refill_tasks, return_exceptions=True)
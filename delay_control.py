@@ -1,11 +1,104 @@
 # Python standard libraries
 import os
 import time
+import hashlib
+import threading
+# Internal imports
+from sqlite_db import ThreadConnections, transaction
+from config import (
+    RATE_LIMIT_BACKEND, RATE_LIMIT_DB_PATH, RATE_LIMIT_DEFAULT, RATE_LIMIT_TRUST_FORWARDED, RATE_LIMIT_API_KEYS
+)
+from logger import get_logger
 
-DELAY_SECONDS = 60
-def check_delay(last_time):
-    now = time.time()
-    elapsed = now - last_time
-    if elapsed < DELAY_SECONDS:
-        return False, DELAY_SECONDS - int(elapsed)
-    return True, now
+logger = get_logger()
+
+""" Per-client token-bucket rate limiting.
+
+Each (route, client) pair owns a bucket holding up to `burst` tokens that refills at `rate` tokens per second;
+a request takes one token or is rejected with the number of seconds until the next token.
+With the "sqlite" backend the buckets live in one database file, so every uvicorn worker sees the same state.
+"""
+
+# routes that are limited; each can be overridden with RATE_LIMIT_<ROUTE> (e.g. RATE_LIMIT_GENERATE="30/60:10")
+ROUTES = ("input", "input_daily", "input_bulk", "generate", "generate_daily", "generate_batch", "fill_daily_pool")
+
+
+def parse_limit(spec: str) -> tuple[float, float]:
+    """ "<requests>/<seconds>[:<burst>]" -> (tokens per second, burst) e.g. "1/60" or "30/60:10" """
+    rate_part, _, burst_part = spec.partition(":")
+    requests, _, seconds = rate_part.partition("/")
+    rate = float(requests) / float(seconds or 1)
+    burst = float(burst_part) if burst_part else max(float(requests), 1.0)
+    return rate, burst
+
+
+ROUTE_LIMITS = {
+    route: parse_limit(os.getenv(f"RATE_LIMIT_{route.upper()}", RATE_LIMIT_DEFAULT)) for route in ROUTES
+}
+
+
+def take_token(tokens: float, updated_at: float, now: float, rate: float, burst: float) -> tuple[bool, float, int]:
+    """ Refill the bucket up to now and try to take one token -> (allowed, tokens left, retry_after seconds) """
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0
+    retry_after = int((1 - tokens) / rate) + 1 if rate > 0 else 60
+    return False, tokens, retry_after
+
+
+class MemoryRateLimiter:
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, rate: float, burst: float) -> tuple[bool, int]:
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (burst, now))
+            ok, tokens, retry_after = take_token(tokens, updated_at, now, rate, burst)
+            self._buckets[key] = (tokens, now)
+        return ok, retry_after
+
+
+class SQLiteRateLimiter:
+    def __init__(self, path: str):
+        self.path = path
+        self._connections = ThreadConnections(
+            path, "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL);",
+            timeout=10
+        )
+        self._calls = 0
+
+    def acquire(self, key: str, rate: float, burst: float) -> tuple[bool, int]:
+        # refill + take in one transaction, atomic across worker processes
+        with transaction(self._connections.get()) as conn:
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated_at = row if row else (burst, now)
+            ok, tokens, retry_after = take_token(tokens, updated_at, now, rate, burst)
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)", (key, tokens, now))
+            self._calls += 1
+            if self._calls % 1000 == 0:
+                # buckets idle for a day are full again anyway, drop them so the table does not grow forever
+                conn.execute("DELETE FROM buckets WHERE updated_at < ?", (now - 86400,))
+        return ok, retry_after
+
+
+def client_key(request) -> str:
+    # a configured API key (hashed, so keys are never stored), otherwise the client address; unknown keys are
+    # ignored, or a client could get a fresh bucket with every made-up key
+    api_key = request.headers.get("x-api-key")
+    if api_key and api_key in RATE_LIMIT_API_KEYS:
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:32]
+    if RATE_LIMIT_TRUST_FORWARDED and request.headers.get("x-forwarded-for"):
+        return "ip:" + request.headers["x-forwarded-for"].split(",")[0].strip()
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+def check_rate_limit(route: str, client: str) -> tuple[bool, int]:
+    """ Take one token for `client` on `route` -> (allowed, seconds to wait before retrying) """
+    rate, burst = ROUTE_LIMITS[route]
+    return rate_limiter.acquire(f"{route}|{client}", rate, burst)
+
+
+rate_limiter = SQLiteRateLimiter(RATE_LIMIT_DB_PATH) if RATE_LIMIT_BACKEND == "sqlite" else MemoryRateLimiter()
@@ -1,14 +1,42 @@
 # Python standard libraries
 import os
+# Internal imports
+from sqlite_db import ThreadConnections, transaction
+from config import INDEX_DB_PATH
 
-def get_next_index_file(folder, prefix, ext=".json"):
-    existing = [f for f in os.listdir(folder) if f.startswith(prefix) and f.endswith(ext)]
+""" Allocates the next inputN/outputN file name from an atomic counter stored in SQLite.
+The counter is shared by every worker process, so two concurrent uploads never get the same index,
+and allocation does not depend on how many files the folder already holds. """
+
+# synchronous=FULL: a counter rolled back by a power loss would hand out the name of an existing file again
+_connections = ThreadConnections(
+    INDEX_DB_PATH, "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);",
+    synchronous="FULL"
+)
+
+
+def _scan_max_index(folder, prefix, ext):
+    # only used once per folder/prefix to seed the counter from files created before it existed
     indices = []
-    for f in existing:
-        try:
-            index = int(f[len(prefix):-len(ext)])
-            indices.append(index)
-        except:
-            pass
-    next_index = max(indices) + 1 if indices else 1
-    return os.path.join(folder, f"{prefix}{next_index}{ext}")
\ No newline at end of file
+    for f in os.listdir(folder):
+        if f.startswith(prefix) and f.endswith(ext):
+            try:
+                indices.append(int(f[len(prefix):-len(ext)]))
+            except ValueError:
+                pass
+    return max(indices) if indices else 0
+
+
+def allocate_index(folder, prefix, ext=".json") -> int:
+    name = f"{os.path.abspath(folder)}|{prefix}|{ext}"
+    # read-increment-write in one transaction, so concurrent workers never get the same index
+    with transaction(_connections.get()) as conn:
+        row = conn.execute("SELECT value FROM counters WHERE name = ?", (name,)).fetchone()
+        next_index = (row[0] if row else _scan_max_index(folder, prefix, ext)) + 1
+        conn.execute("INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)", (name, next_index))
+    return next_index
+
+
+def get_next_index_file(folder, prefix, ext=".json"):
+    next_index = allocate_index(folder, prefix, ext)
+    return os.path.join(folder, f"{prefix}{next_index}{ext}")
@@ -0,0 +1,272 @@
+# Python standard libraries
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, AsyncIterator
+# Internal imports
+from config import (
+    HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY_SECONDS, HTTP2_ENABLED,
+    LLM_TIMEOUT_SECONDS, LLM_MAX_RETRIES, LLM_RETRY_BACKOFF_SECONDS,
+    LLM_HEDGE_ENABLED, LLM_HEDGE_AFTER_SECONDS, LLM_HEDGE_MIN_SAMPLES,
+    CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS
+)
+from metrics import LLM_RETRIES, LLM_HEDGES, CIRCUIT_STATE
+from logger import get_logger
+
+logger = get_logger()
+
+""" Resilient call layer around the LLM client: per-call deadline, retries with exponential backoff,
+optional hedged requests and a circuit breaker that fails fast while the provider is down.
+Also builds the pooled HTTP clients the LLM client sends its requests through. """
+
+# shared sync/async httpx clients, created by build_http_clients()
+http_clients = {}
+
+
+def build_http_clients() -> tuple:
+    """ Pooled keep-alive clients, so calls reuse open connections instead of paying a TCP/TLS handshake each time """
+    import httpx
+
+    if http_clients:
+        # shared by every provider entry, and closed once by close_http_clients()
+        return http_clients["sync"], http_clients["async"]
+
+    http2 = HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("HTTP2_ENABLED is set but the h2 package is not installed, using HTTP/1.1")
+            http2 = False
+
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    )
+    timeout = httpx.Timeout(LLM_TIMEOUT_SECONDS)
+    http_clients["sync"] = httpx.Client(limits=limits, timeout=timeout, http2=http2)
+    http_clients["async"] = httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+    logger.info(
+        "HTTP connection pool: max_connections=%s keepalive=%s expiry=%ss http2=%s",
+        HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY_SECONDS, http2
+    )
+    return http_clients["sync"], http_clients["async"]
+
+
+def pool_stats() -> dict:
+    """ Open / idle connections per client, read from the httpcore pool behind each httpx client """
+    stats = {}
+    for name, client in http_clients.items():
+        pool = getattr(getattr(client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        if connections is None:
+            continue
+        idle = sum(1 for connection in connections if connection.is_idle())
+        stats[name] = {"open": len(connections), "idle": idle, "active": len(connections) - idle}
+    return stats
+
+
+async def close_http_clients():
+    client = http_clients.pop("async", None)
+    if client is not None:
+        await client.aclose()
+    client = http_clients.pop("sync", None)
+    if client is not None:
+        client.close()
+
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# checked by name so openai (slow to import) is not needed at startup
+RETRYABLE_ERRORS = {"APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError", "TimeoutError"}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"LLM provider unavailable, circuit open for {retry_after:.0f} more seconds")
+        self.retry_after = retry_after
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    if getattr(error, "status_code", None) in RETRYABLE_STATUS:
+        return True
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+class CircuitBreaker:
+    """ closed -> open after `failure_threshold` consecutive failures; after `reset_seconds` one trial
+    call is let through (half-open) and its result closes or re-opens the circuit """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> bool:
+        """ Raise CircuitOpenError when the call may not run; True when it is the half-open trial call,
+        which must be ended with end_trial() however it finishes """
+        state = self.state
+        if state == "open" or (state == "half_open" and self.trial_running):
+            remaining = max(self.reset_seconds - (time.monotonic() - self.opened_at), 1)
+            raise CircuitOpenError(remaining)
+        if state == "half_open":
+            self.trial_running = True
+            return True
+        return False
+
+    def end_trial(self):
+        # a cancelled trial (client gone, shutdown) has no result; the next call becomes the trial
+        self.trial_running = False
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("Circuit breaker closed, LLM provider recovered")
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        CIRCUIT_STATE.set(0)
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_running = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.error("Circuit breaker opened after %s consecutive LLM failures", self.failures)
+            self.opened_at = time.monotonic()
+            CIRCUIT_STATE.set(1)
+
+
+class LatencyTracker:
+    def __init__(self, size: int = 200):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+class ResilientCaller:
+    def __init__(self):
+        self.breaker = CircuitBreaker(CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RESET_SECONDS)
+        self.latency = LatencyTracker()
+
+    def hedge_delay(self):
+        if not LLM_HEDGE_ENABLED:
+            return None
+        if LLM_HEDGE_AFTER_SECONDS > 0:
+            return LLM_HEDGE_AFTER_SECONDS
+        if len(self.latency.samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return self.latency.percentile(0.95)
+
+    async def _attempt(self, call: Callable[[], Awaitable]):
+        """ One attempt within the deadline; with hedging a second identical call is fired when the
+        first one is slower than the p95 latency, and whichever finishes first wins """
+        delay = self.hedge_delay()
+        first = asyncio.ensure_future(call())
+        if delay is None:
+            return await first
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                LLM_HEDGES.inc()
+                logger.info("LLM call slower than %.2fs, sending hedged request", delay)
+                tasks.add(asyncio.ensure_future(call()))
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                if not tasks:
+                    raise done.pop().exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def call(self, call: Callable[[], Awaitable]):
+        attempt = 0
+        while True:
+            trial = self.breaker.before_call()
+            start = time.perf_counter()
+            try:
+                result = await asyncio.wait_for(self._attempt(call), LLM_TIMEOUT_SECONDS)
+            except Exception as e:
+                if not is_retryable(e):
+                    # the provider answered (e.g. a 400), so it is up
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if attempt >= LLM_MAX_RETRIES:
+                    raise
+                backoff = LLM_RETRY_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5)
+                attempt += 1
+                LLM_RETRIES.inc()
+                logger.warning("LLM call failed (%r), retry %s/%s in %.2fs", e, attempt, LLM_MAX_RETRIES, backoff)
+                await asyncio.sleep(backoff)
+                continue
+            finally:
+                # also when the call is cancelled (client disconnect, shutdown) and so has no result
+                if trial:
+                    self.breaker.end_trial()
+            self.latency.add(time.perf_counter() - start)
+            self.breaker.record_success()
+            return result
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """ Stream chunks; a failure is retried only while nothing has been sent to the caller yet """
+        attempt = 0
+        while True:
+            trial = self.breaker.before_call()
+            started = False
+            try:
+                iterator = open_stream().__aiter__()
+                while True:
+                    # the deadline applies to the wait for every chunk, not to the whole stream
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), LLM_TIMEOUT_SECONDS)
+                    except StopAsyncIteration:
+                        break
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if not is_retryable(e):
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                if started or attempt >= LLM_MAX_RETRIES:
+                    raise
+                backoff = LLM_RETRY_BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5)
+                attempt += 1
+                LLM_RETRIES.inc()
+                logger.warning("LLM stream failed (%r), retry %s/%s in %.2fs", e, attempt, LLM_MAX_RETRIES, backoff)
+                await asyncio.sleep(backoff)
+                continue
+            finally:
+                # also on cancellation and on GeneratorExit when the SSE client goes away
+                if trial:
+                    self.breaker.end_trial()
+            self.breaker.record_success()
+            return
+
+
+llm_caller = ResilientCaller()
@@ -1,21 +1,78 @@
 import os
+import json
+import queue
+import atexit
 import logging
-from datetime import datetime
+import contextvars
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, TimedRotatingFileHandler
 
-if not os.path.exists("logs"):
-    os.makedirs("logs")
+from config import LOG_DIR, LOG_LEVEL, LOG_FORMAT, LOG_ROTATION, LOG_MAX_BYTES, LOG_BACKUP_COUNT
+from worker_slot import worker_slot
 
+""" Queue-based logging: request code only puts records on an in-memory queue, a background
+listener thread formats them and writes them to a rotating file in logs/ """
 
-now = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-log_filename = f"logs/{now}.log"
+# set per request by the middleware in main.py, added to every record logged while handling it
+request_id_var = contextvars.ContextVar("request_id", default="-")
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def _build_file_handler() -> logging.Handler:
+    if not os.path.exists(LOG_DIR):
+        os.makedirs(LOG_DIR)
+    # rotation is not safe with several processes writing one file, so every worker gets its own,
+    # named by its slot rather than its pid so restarts reuse the files instead of adding new ones
+    slot = worker_slot()
+    log_filename = os.path.join(LOG_DIR, "app.log" if slot is None else f"app-{slot}.log")
+    if LOG_ROTATION == "time":
+        # one file per day, older files removed after LOG_BACKUP_COUNT days
+        handler = TimedRotatingFileHandler(log_filename, when="midnight", backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    else:
+        handler = RotatingFileHandler(log_filename, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(request_id)s | %(message)s"))
+    return handler
+
+
+def truncate_for_log(text, limit: int = 500) -> str:
+    # keeps error logs small when a whole model response would otherwise be dumped
+    text = str(text)
+    return text if len(text) <= limit else f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+
+log_queue = queue.SimpleQueue()
+queue_handler = QueueHandler(log_queue)
+queue_handler.addFilter(RequestIdFilter())
+
+root_logger = logging.getLogger()
+root_logger.setLevel(LOG_LEVEL)
+root_logger.addHandler(queue_handler)
+
+listener = QueueListener(log_queue, _build_file_handler(), respect_handler_level=True)
+listener.start()
+# flush what is still queued when the process exits
+atexit.register(listener.stop)
 
-# logger config
-logging.basicConfig(
-    filename=log_filename,
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s",
-    encoding="utf-8"
-)
 
 def get_logger():
-    return logging.getLogger()
\ No newline at end of file
+    return logging.getLogger()
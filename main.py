@@ -1,21 +1,101 @@
 # Python standard libraries
 import os
+import time
+import uuid
+import asyncio
+from contextlib import asynccontextmanager
 # External libraries
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 import uvicorn
 # Internal imports
 from routes.Endpoints import router
-from logger import get_logger
+from model import check_llm_connection
+from prompt_builder import load_tokenizer
+from provider_pool import provider_pool
+from daily_pool import run_daily_scheduler, stop_refills
+from response_cache import response_cache
+from uploads import BodySizeLimitMiddleware
+from metrics import render as render_metrics, run_flush as run_metrics_flush, REQUEST_SECONDS
+from config import (
+    LLM_WARMUP, READINESS_CACHE_SECONDS, DAILY_POOL_ENABLED, WORKERS, SHUTDOWN_GRACE_SECONDS,
+    RATE_LIMIT_BACKEND, METRICS_DB_PATH
+)
+from logger import get_logger, request_id_var
 
 logger = get_logger()
 
+# last readiness result, so frequent probes do not each cost an LLM call
+last_ready_check = {"time": 0.0, "ok": False}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # runs once per worker process: clients are built before it takes requests and closed after it drained
+    await asyncio.to_thread(provider_pool.open)
+    warmup_task = None
+    scheduler_task = asyncio.create_task(run_daily_scheduler()) if DAILY_POOL_ENABLED else None
+    cache_purge_task = asyncio.create_task(response_cache.run_purge()) if response_cache.has_sqlite_tier else None
+    metrics_flush_task = asyncio.create_task(run_metrics_flush()) if METRICS_DB_PATH else None
+    # reading (or, with TOKENIZER_DOWNLOAD, downloading) the encoding is done off the event loop; prompts use an
+    # estimate until then
+    tokenizer_task = asyncio.create_task(asyncio.to_thread(load_tokenizer))
+    if LLM_WARMUP:
+        logger.info("Starting background LLM warm-up")
+        warmup_task = asyncio.create_task(check_llm_connection())
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if not tokenizer_task.done():
+        tokenizer_task.cancel()
+    if scheduler_task:
+        scheduler_task.cancel()
+    if cache_purge_task:
+        cache_purge_task.cancel()
+    if metrics_flush_task:
+        metrics_flush_task.cancel()
+    # uvicorn has already waited for the in-flight requests; background pool refills get the same grace period
+    await stop_refills(SHUTDOWN_GRACE_SECONDS)
+    await provider_pool.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Motivational Sentence Generator API",
     description="API for uploading user data and generating motivational sentences",
+    lifespan=lifespan,
 )
 
 
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    # reuse the caller's X-Request-ID when given, so log lines can be matched across services
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # route template instead of the raw path (query strings, ids), to keep label cardinality low
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        route=getattr(route, "path", "unmatched"), method=request.method, status=str(response.status_code)
+    )
+    return response
+
+
+# outermost, so an oversized body is refused before it is parsed (added last = runs first)
+app.add_middleware(BodySizeLimitMiddleware)
+
 # Register (include) routers
 app.include_router(router, prefix="/motivation", tags=["Motivation"])
 
@@ -27,8 +107,28 @@ def home():
     logger.info("Root endpoint called.")
     return {"message": "Motivational Sentence Generator API is running"}
 
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health/ready")
+async def health_ready():
+    now = time.time()
+    if now - last_ready_check["time"] > READINESS_CACHE_SECONDS:
+        last_ready_check["ok"] = await check_llm_connection()
+        last_ready_check["time"] = now
+    if not last_ready_check["ok"]:
+        return JSONResponse(content={"status": "unavailable", "llm": "unreachable"}, status_code=503)
+    return {"status": "ready", "llm": "ok"}
+
 if __name__ == "__main__":
-    HOST = os.getenv("HOST") 
-    PORT = int(os.getenv("PORT"))  
-    logger.info(f"Starting FastAPI app on *.*.*.* : ****")
-    uvicorn.run(app, host=HOST, port=PORT)
\ No newline at end of file
+    HOST = os.getenv("HOST")
+    PORT = int(os.getenv("PORT"))
+    logger.info("Starting FastAPI app on *.*.*.* : **** with %s worker(s)", WORKERS)
+    if WORKERS > 1 and RATE_LIMIT_BACKEND == "memory":
+        logger.warning("RATE_LIMIT_BACKEND=memory keeps one bucket per worker, clients get up to %s times their limit", WORKERS)
+    # an import string, so uvicorn can start the app in every worker process; SIGTERM stops accepting
+    # connections and waits up to SHUTDOWN_GRACE_SECONDS for in-flight requests before the lifespan shutdown
+    uvicorn.run("main:app", host=HOST, port=PORT, workers=WORKERS, timeout_graceful_shutdown=SHUTDOWN_GRACE_SECONDS)
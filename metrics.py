@@ -0,0 +1,234 @@
+# Python standard libraries
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+# Internal imports
+from config import METRICS_DB_PATH, METRICS_FLUSH_SECONDS
+from worker_slot import worker_slot, slot_in_use
+from logger import get_logger
+
+logger = get_logger()
+
+""" Minimal in-process metrics (counters, gauges, histograms) rendered in the Prometheus text format at /metrics.
+Recording a value is a dict lookup and an addition under a lock, cheap enough to leave on in production.
+With several workers (METRICS_DB_PATH) every worker also writes its samples to one SQLite table, keyed by its
+worker slot, and /metrics renders counters and histograms summed over the live workers and gauges per worker. """
+
+# seconds; covers fast stages (validation, cache) up to slow LLM calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = []
+# callables run on every render(), for values that are read on demand (e.g. connection pool sizes)
+_collectors = []
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._values.items()}
+        samples = []
+        for key, series in snapshot.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", key + (("le", str(bound)),), cumulative))
+            samples.append((f"{self.name}_bucket", key + (("le", "+Inf"),), series[-1]))
+            samples.append((f"{self.name}_sum", key, series[-2]))
+            samples.append((f"{self.name}_count", key, series[-1]))
+        return samples
+
+
+@contextmanager
+def timed(stage: str):
+    """ Record the duration of a hot-path stage in motivation_stage_seconds """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def register_collector(collector):
+    _collectors.append(collector)
+
+
+_db = None
+_db_lock = threading.Lock()
+
+
+def _shared_db() -> sqlite3.Connection:
+    global _db
+    if _db is None:
+        os.makedirs(os.path.dirname(os.path.abspath(METRICS_DB_PATH)), exist_ok=True)
+        _db = sqlite3.connect(METRICS_DB_PATH, check_same_thread=False, timeout=5)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute("""
+            CREATE TABLE IF NOT EXISTS samples (
+                slot INTEGER NOT NULL,
+                metric TEXT NOT NULL,
+                sample TEXT NOT NULL,
+                labels TEXT NOT NULL,
+                value REAL NOT NULL
+            )
+        """)
+        _db.execute("CREATE INDEX IF NOT EXISTS idx_samples_slot ON samples (slot)")
+        _db.commit()
+    return _db
+
+
+def _local_samples() -> dict:
+    for collector in _collectors:
+        collector()
+    return {metric.name: metric.samples() for metric in _registry}
+
+
+def flush():
+    """ Replace this worker's rows in the shared table with its current samples """
+    slot = worker_slot()
+    rows = [
+        (slot, metric, name, json.dumps(key), value)
+        for metric, samples in _local_samples().items() for name, key, value in samples
+    ]
+    with _db_lock:
+        db = _shared_db()
+        with db:
+            db.execute("DELETE FROM samples WHERE slot = ?", (slot,))
+            db.executemany("INSERT INTO samples (slot, metric, sample, labels, value) VALUES (?, ?, ?, ?, ?)", rows)
+
+
+async def run_flush(interval_seconds: float = METRICS_FLUSH_SECONDS):
+    """ Background task (main.lifespan): keep this worker's rows at most interval_seconds old; the first
+    flush at startup replaces the rows a previous process left under the same slot """
+    while True:
+        try:
+            await asyncio.to_thread(flush)
+        except sqlite3.Error as e:
+            logger.error("Metrics flush failed: %r", e)
+        await asyncio.sleep(interval_seconds)
+
+
+def _shared_samples() -> dict:
+    flush()
+    own_slot = worker_slot()
+    kinds = {metric.name: metric.kind for metric in _registry}
+    with _db_lock:
+        db = _shared_db()
+        rows = db.execute("SELECT slot, metric, sample, labels, value FROM samples ORDER BY slot, rowid").fetchall()
+        # rows of workers that exited (and were not replaced) would otherwise be counted forever
+        dead = {slot for slot, *_ in rows if slot != own_slot and not slot_in_use(slot)}
+        if dead:
+            with db:
+                db.executemany("DELETE FROM samples WHERE slot = ?", [(slot,) for slot in dead])
+    totals = {}
+    for slot, metric, name, labels, value in rows:
+        if slot in dead:
+            continue
+        key = tuple(tuple(pair) for pair in json.loads(labels))
+        if kinds.get(metric) == "gauge":
+            key += (("worker", str(slot)),)
+        series = totals.setdefault(metric, {})
+        series[(name, key)] = series.get((name, key), 0) + value
+    return {metric: [(name, key, value) for (name, key), value in series.items()] for metric, series in totals.items()}
+
+
+def render() -> str:
+    samples = _shared_samples() if METRICS_DB_PATH else _local_samples()
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, key, value in samples.get(metric.name, []):
+            lines.append(f"{name}{_format_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "motivation_stage_seconds",
+    "Duration of request stages: request_parse, validation, file_io, llm, output_parse, output_write"
+)
+REQUEST_SECONDS = Histogram("motivation_request_seconds", "HTTP request duration by route and status")
+LLM_TOKENS = Counter("motivation_llm_tokens_total", "Tokens used by LLM calls, by type (prompt/completion)")
+LLM_COST = Counter("motivation_llm_cost_usd_total", "Estimated LLM cost in USD")
+LLM_ERRORS = Counter("motivation_llm_errors_total", "Failed LLM calls by error type")
+LLM_INFLIGHT = Gauge("motivation_llm_inflight", "LLM calls currently running in this process")
+LLM_RETRIES = Counter("motivation_llm_retries_total", "LLM calls retried after a retryable error")
+LLM_HEDGES = Counter("motivation_llm_hedged_requests_total", "Hedged (duplicate) LLM requests sent because the first was slow")
+CIRCUIT_STATE = Gauge("motivation_llm_circuit_open", "1 while the LLM circuit breaker is open")
+LLM_PROVIDER_REQUESTS = Counter("motivation_llm_provider_requests_total", "LLM requests by provider pool entry and result")
+LLM_PROVIDER_OUTSTANDING = Gauge("motivation_llm_provider_outstanding", "LLM requests in flight per provider pool entry")
+LLM_PROVIDER_DRAINED = Gauge("motivation_llm_provider_drained", "1 while a provider pool entry is skipped because its key is throttled")
+HTTP_POOL_CONNECTIONS = Gauge("motivation_http_pool_connections", "Connections in the LLM HTTP pool by client and state")
+LLM_OUTPUT_PARSE = Counter("motivation_llm_output_parse_total", "Model outputs by output mode and parse result (ok/repaired/failed)")
+DAILY_POOL_REQUESTS = Counter("motivation_daily_pool_requests_total", "/generate_daily requests by daily pool result (hit/miss)")
+DAILY_POOL_GENERATED = Counter("motivation_daily_pool_generated_total", "Daily pool sentences by result: ok, duplicate (dropped), error (failed LLM call)")
+CACHE_REQUESTS = Counter("motivation_cache_requests_total", "Response cache lookups by result (hit/miss)")
+RATE_LIMIT_REJECTIONS = Counter("motivation_rate_limit_rejections_total", "Requests rejected by the rate limiter, by route")
@@ -2,113 +2,387 @@
 # To connect to the OpenAI GPT API, we utilized https://avalai.ir. After signing in, we generated an API key specifically for our project.
 
 # Python standard libraries
-import os
 import json
+import asyncio
+from datetime import date
+from typing import AsyncIterator
 # external libraries
-from dotenv import load_dotenv
 from pydantic import ValidationError,BaseModel
-from langchain_openai import ChatOpenAI
-from langchain_community.callbacks import get_openai_callback
 # Internal project libraries
 from validations.pydantic_validation import (
     UserMotivationInputWrapper,
-    DailyMotivationInputWrapper
+    DailyMotivationInputWrapper,
+    MotivationOutputValidation,
+    MotivationListOutputValidation
+)
+from validations.text_cleaner import parse_json_output, SentenceStreamExtractor
+from logger import get_logger, truncate_for_log
+from response_cache import response_cache, make_cache_key
+from llm_client import llm_caller, pool_stats
+from provider_pool import provider_pool
+from metrics import (
+    timed, register_collector, LLM_TOKENS, LLM_COST, LLM_ERRORS, LLM_INFLIGHT, LLM_OUTPUT_PARSE, HTTP_POOL_CONNECTIONS
+)
+from prompts import REPAIR_PROMPT, MULTI_SENTENCE_PROMPT
+from prompt_builder import build_messages
+from config import (
+    LLM_TEMPERATURE, LLM_MAX_TOKENS, LLM_OUTPUT_MODE, MAX_SENTENCE_CHARS, OUTPUT_REPAIR_ENABLED,
+    MAX_CONCURRENT_GENERATIONS, CACHE_ENABLED, DAILY_CACHE_PER_DAY
 )
-from validations.text_cleaner import normalize_mixed_text , force_json_closure
-from logger import get_logger   
 
 logger = get_logger()
 
-load_dotenv()
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-logger.info("Receiving API key from .env file ...")
-if not OPENAI_API_KEY:
-    logger.error("API key not found in .env file!")
-    raise ValueError("API key not found in .env file!")
-else: logger.info("API key received")
-
-llm = ChatOpenAI(
-    model="gpt-4o-mini", # in this case we want to use gpt-4o-mini
-    base_url="https://api.avalai.ir/v1",
-    temperature=0.7,
-    max_tokens=1000, #token limiter
-    timeout=None,
-    max_retries=0,
-    api_key=OPENAI_API_KEY)
-
-
-# testing the API connection and tracking token usage
-try:
-    logger.info("Testing OpenAI API connection...")
-    with get_openai_callback() as cb:
-        test_response = llm.invoke([
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": "Hello world!"}
-        ])
-        logger.info(cb)
-        logger.info("OpenAI API test successful")
+# The LLM clients (one per provider_pool entry) are built on first use, not at import, so importing the app
+# needs no network or API key. langchain_openai is imported lazily for the same reason: it alone takes seconds to import.
 
-except Exception as e:
-    logger.error(f"OpenAI API test failed: {repr(e)}")
-    raise
 
-#main function for generating 
+def collect_pool_metrics():
+    for client, stats in pool_stats().items():
+        for state in ("idle", "active"):
+            HTTP_POOL_CONNECTIONS.set(stats[state], client=client, state=state)
 
-def base_generate(
-    input_file: str,
-    output_file: str,
-    system_prompt: str,
-    output_validation_model: type[BaseModel],
-    daily:bool):# Determine whether the entry is daily or not
 
+register_collector(collect_pool_metrics)
+
+
+# testing the API connection and tracking token usage (used by the readiness probe and warm-up)
+async def check_llm_connection() -> bool:
+    from langchain_community.callbacks import get_openai_callback
     try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            input_data = json.load(f)
-        logger.info("Input file loaded successfully.")
+        logger.info("Testing OpenAI API connection...")
+        with get_openai_callback() as cb:
+            await provider_pool.ainvoke([
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": "Hello world!"}
+            ])
+            logger.info(cb)
+        logger.info("OpenAI API test successful")
+        return True
     except Exception as e:
-        logger.error(f"Failed to read input file: {repr(e)}")
-        raise
+        logger.error("OpenAI API test failed: %r", e)
+        return False
+
+# limits how many LLM calls a single worker runs at once, extra requests wait here
+generation_semaphore = asyncio.Semaphore(MAX_CONCURRENT_GENERATIONS)
+
+
+def read_bytes_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def write_json_file(path: str, data: dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+
+def validate_input(input_data: dict | str | bytes, daily: bool) -> BaseModel:
+    """ Raw JSON (str/bytes) is parsed and validated in one pass by pydantic-core, without json.loads first """
     #chosing the right wrapper
     wrapper_class = DailyMotivationInputWrapper if daily else UserMotivationInputWrapper
 
-    if "user_info" not in input_data:
+    if isinstance(input_data, dict) and "user_info" not in input_data:
         logger.error("JSON does not contain 'user_info' key")
         raise ValueError("Missing 'user_info' key in input JSON")
 
     try:
-        input_wrapper = wrapper_class(**input_data)
-        logger.info(f"Input JSON validated successfully using {wrapper_class.__name__}")
+        with timed("validation"):
+            if isinstance(input_data, dict):
+                input_wrapper = wrapper_class.model_validate(input_data)
+            else:
+                input_wrapper = wrapper_class.model_validate_json(input_data)
+        logger.info("Input JSON validated successfully using %s", wrapper_class.__name__)
     except ValidationError as ve:
-        logger.error(f"Input JSON validation failed: {ve.json()}")
+        logger.error("Input JSON validation failed: %s", ve.json())
         raise
+    return input_wrapper
+
+
+def get_cache_key(payload: dict, system_prompt: str, output_validation_model: type[BaseModel], daily: bool):
+    # daily sentences must be unique, so they are only cached when the key includes the day
+    if not CACHE_ENABLED or (daily and not DAILY_CACHE_PER_DAY):
+        return None
+    model_params = {
+        "model": provider_pool.model_names(),
+        "temperature": LLM_TEMPERATURE,
+        "max_tokens": LLM_MAX_TOKENS,
+        "output": output_validation_model.__name__,
+        "output_mode": LLM_OUTPUT_MODE,
+        "max_sentence_chars": MAX_SENTENCE_CHARS,
+    }
+    return make_cache_key(payload, system_prompt, model_params, date.today().isoformat() if daily else None)
 
+
+def record_llm_usage(cb):
+    LLM_TOKENS.inc(cb.prompt_tokens, type="prompt")
+    LLM_TOKENS.inc(cb.completion_tokens, type="completion")
+    LLM_COST.inc(cb.total_cost)
+
+
+def output_options(output_validation_model: type[BaseModel], count: int = 1) -> dict:
+    """ provider_pool options for the configured output mode and sentence length limit """
+    options = {}
+    if MAX_SENTENCE_CHARS:
+        # a sentence needs at most ~1 token per 2 characters (less for English), plus the JSON around it
+        options["max_tokens"] = count * (MAX_SENTENCE_CHARS // 2 + 10) + 20
+    if LLM_OUTPUT_MODE in ("json_mode", "json_schema"):
+        options["output_model"] = output_validation_model
+        options["method"] = LLM_OUTPUT_MODE
+    return options
+
+
+def check_output(result: BaseModel) -> BaseModel:
+    sentence = getattr(result, "motivational_sentence", None)
+    if MAX_SENTENCE_CHARS and isinstance(sentence, str) and len(sentence) > MAX_SENTENCE_CHARS:
+        raise ValueError(f"motivational_sentence is {len(sentence)} characters long, the limit is {MAX_SENTENCE_CHARS}")
+    # in a list, sentences over the limit are dropped by generate_sentences instead of failing the whole list
+    sentences = getattr(result, "motivational_sentences", None)
+    if sentences is not None and not any(s.strip() for s in sentences):
+        raise ValueError("motivational_sentences is empty")
+    return result
+
+
+def output_shape(output_validation_model: type[BaseModel]) -> str:
+    """ Example object for the repair prompt, e.g. {"motivational_sentence": "..."} """
+    return json.dumps({
+        name: ["...", "..."] if field.annotation == list[str] else "..."
+        for name, field in output_validation_model.model_fields.items()
+    })
+
+
+def parse_model_output(raw_text: str, output_validation_model: type[BaseModel]) -> BaseModel:
+    with timed("output_parse"):
+        data = parse_json_output(raw_text)
+        return check_output(output_validation_model(**data))
+
+
+def raw_text_of(response) -> str:
+    message = response["raw"] if isinstance(response, dict) else response
+    return message.content if message is not None else ""
+
+
+def read_output(response, output_validation_model: type[BaseModel]) -> BaseModel:
+    """ Turn an LLM response into the output model; with structured output the provider already parsed it """
+    if not isinstance(response, dict):
+        return parse_model_output(response.content, output_validation_model)
+    if response["parsing_error"] is not None or response["parsed"] is None:
+        raise ValueError(f"structured output could not be parsed: {response['parsing_error']!r}")
+    parsed = response["parsed"]
+    if isinstance(parsed, dict):
+        parsed = output_validation_model(**parsed)
+    return check_output(parsed)
+
+
+async def invoke_llm(messages: list[dict], options: dict):
+    from langchain_community.callbacks import get_openai_callback
+
+    async with generation_semaphore:
+        LLM_INFLIGHT.inc()
+        try:
+            with timed("llm"), get_openai_callback() as cb:
+                response = await llm_caller.call(lambda: provider_pool.ainvoke(messages, **options))
+            logger.info(cb)
+            record_llm_usage(cb)
+            return response
+        except Exception as e:
+            LLM_ERRORS.inc(error=type(e).__name__)
+            raise
+        finally:
+            LLM_INFLIGHT.dec()
+
+
+async def repair_output(raw_text: str, error: Exception, output_validation_model: type[BaseModel]) -> BaseModel:
+    """ One cheap follow-up call: only the broken output and the problem are sent, not the user payload """
+    if not OUTPUT_REPAIR_ENABLED or not raw_text:
+        raise error
+    logger.warning("Model output could not be used (%s), asking for a repaired version", truncate_for_log(error, 200))
     messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": json.dumps(input_wrapper.model_dump(), ensure_ascii=False)}
+        {"role": "system", "content": REPAIR_PROMPT.format(
+            shape=output_shape(output_validation_model), error=truncate_for_log(error, 300)
+        )},
+        {"role": "user", "content": truncate_for_log(raw_text, 2000)}
     ]
+    response = await invoke_llm(messages, output_options(output_validation_model))
+    try:
+        return read_output(response, output_validation_model)
+    except (ValueError, ValidationError) as repair_error:
+        logger.error("Repaired output is still unusable: %r", repair_error)
+        raise error
+
+
+async def finish_output(raw_text: str, read, output_validation_model: type[BaseModel]) -> BaseModel:
+    """ Parse the output; a parse failure gets one repair call before the request fails """
+    try:
+        result = read()
+    except (ValueError, ValidationError) as e:
+        try:
+            result = await repair_output(raw_text, e, output_validation_model)
+        except Exception:
+            LLM_OUTPUT_PARSE.inc(mode=LLM_OUTPUT_MODE, result="failed")
+            raise
+        LLM_OUTPUT_PARSE.inc(mode=LLM_OUTPUT_MODE, result="repaired")
+        return result
+    LLM_OUTPUT_PARSE.inc(mode=LLM_OUTPUT_MODE, result="ok")
+    return result
+
+
+async def generate_sentence(
+    input_wrapper: BaseModel,
+    system_prompt: str,
+    output_validation_model: type[BaseModel],
+    daily: bool,
+    use_cache: bool = True) -> BaseModel:
+    # use_cache=False when several different sentences are wanted for the same input (daily pool)
+
+    payload = input_wrapper.model_dump()
+    cache_key = get_cache_key(payload, system_prompt, output_validation_model, daily) if use_cache else None
+    if cache_key:
+        cached = await response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Response cache hit, skipping LLM call")
+            return output_validation_model(**cached)
+
+    messages = build_messages(system_prompt, payload)
     logger.info("Preparing to send request to OpenAI API")
   
     response = None
     try:
-        with get_openai_callback() as cb:
-            response = llm.invoke(messages)
-            logger.info(cb)
-        cleaned_text = normalize_mixed_text(response.content.strip())
-        cleaned_json = force_json_closure(cleaned_text)
-        data = json.loads(cleaned_json)
-        result = output_validation_model(**data)
+        response = await invoke_llm(messages, output_options(output_validation_model))
+        result = await finish_output(
+            raw_text_of(response), lambda: read_output(response, output_validation_model), output_validation_model
+        )
+        if cache_key:
+            await response_cache.set(cache_key, result.model_dump())
+        return result
+
+    except ValidationError as ve:
+        logger.error("Model output does not match expected structure!")
+        logger.error(ve.json())
+        logger.error("Raw model output: %s", truncate_for_log(raw_text_of(response)) if response else 'No response')
+        raise
 
-        with open(output_file, 'w', encoding="utf-8") as f:
-            json.dump(result.model_dump(by_alias=True), f, indent=2, ensure_ascii=False)
+    except Exception as e:
+        logger.error("Unexpected error: %r", e)
+        logger.error("Raw model output: %s", truncate_for_log(raw_text_of(response)) if response else 'No response')
+        raise
+
+
+async def generate_sentences(input_wrapper: BaseModel, system_prompt: str, daily: bool, count: int) -> list[str]:
+    """
+    `count` sentences from one LLM call, for the daily pool (never cached: they must all be new).
+    Sentences over MAX_SENTENCE_CHARS are dropped rather than repaired, so the list can come back shorter.
+    count=1 is a plain generate_sentence call with the single-sentence prompt.
+    """
+    if count == 1:
+        result = await generate_sentence(input_wrapper, system_prompt, MotivationOutputValidation, daily, use_cache=False)
+        return [result.motivational_sentence]
+
+    output_model = MotivationListOutputValidation
+    messages = build_messages(system_prompt + MULTI_SENTENCE_PROMPT.format(count=count), input_wrapper.model_dump())
+    logger.info("Requesting %s sentences in one call", count)
+    response = None
+    try:
+        response = await invoke_llm(messages, output_options(output_model, count))
+        result = await finish_output(raw_text_of(response), lambda: read_output(response, output_model), output_model)
+    except Exception as e:
+        logger.error("Multi-sentence generation failed: %r", e)
+        logger.error("Raw model output: %s", truncate_for_log(raw_text_of(response)) if response else 'No response')
+        raise
+    sentences = [sentence.strip() for sentence in result.motivational_sentences if sentence.strip()]
+    if MAX_SENTENCE_CHARS:
+        sentences = [sentence for sentence in sentences if len(sentence) <= MAX_SENTENCE_CHARS]
+    return sentences
 
 
+async def stream_sentence(
+    input_wrapper: BaseModel,
+    system_prompt: str,
+    output_validation_model: type[BaseModel],
+    daily: bool) -> AsyncIterator[tuple[str, object]]:
+    """
+    Stream the generation: yields ("token", text) for every new piece of motivational_sentence
+    and finally ("result", validated output model).
+    Streaming always asks for plain text (provider JSON mode cannot stream through langchain);
+    a final parse failure is still repaired like in generate_sentence.
+    """
+    from langchain_community.callbacks import get_openai_callback
+
+    payload = input_wrapper.model_dump()
+    cache_key = get_cache_key(payload, system_prompt, output_validation_model, daily)
+    if cache_key:
+        cached = await response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Response cache hit, skipping LLM call")
+            result = output_validation_model(**cached)
+            yield "token", result.motivational_sentence
+            yield "result", result
+            return
+
+    messages = build_messages(system_prompt, payload)
+    options = {key: value for key, value in output_options(output_validation_model).items() if key == "max_tokens"}
+    logger.info("Preparing to send streaming request to OpenAI API")
+
+    extractor = SentenceStreamExtractor()
+    raw_text = ""
+    try:
+        async with generation_semaphore:
+            LLM_INFLIGHT.inc()
+            try:
+                with timed("llm"), get_openai_callback() as cb:
+                    async for chunk in llm_caller.stream(lambda: provider_pool.astream(messages, **options)):
+                        raw_text += chunk.content
+                        text = extractor.feed(chunk.content)
+                        if text:
+                            yield "token", text
+                logger.info(cb)
+                record_llm_usage(cb)
+            except Exception as e:
+                LLM_ERRORS.inc(error=type(e).__name__)
+                raise
+            finally:
+                LLM_INFLIGHT.dec()
+        result = await finish_output(
+            raw_text, lambda: parse_model_output(raw_text, output_validation_model), output_validation_model
+        )
+
     except ValidationError as ve:
         logger.error("Model output does not match expected structure!")
         logger.error(ve.json())
-        logger.error(f"Raw model output: {response.content if response else 'No response'}")
+        logger.error("Raw model output: %s", truncate_for_log(raw_text) if raw_text else 'No response')
+        raise
+
+    except Exception as e:
+        logger.error("Unexpected error: %r", e)
+        logger.error("Raw model output: %s", truncate_for_log(raw_text) if raw_text else 'No response')
         raise
 
+    if cache_key:
+        await response_cache.set(cache_key, result.model_dump())
+    yield "result", result
+
+#main function for generating 
+
+async def base_generate(
+    input_file: str,
+    output_file: str,
+    system_prompt: str,
+    output_validation_model: type[BaseModel],
+    daily:bool):# Determine whether the entry is daily or not
+
+    try:
+        # file I/O runs in a worker thread so the event loop keeps serving other requests
+        with timed("file_io"):
+            input_data = await asyncio.to_thread(read_bytes_file, input_file)
+        logger.info("Input file loaded successfully.")
+    except Exception as e:
+        logger.error("Failed to read input file: %r", e)
+        raise
+
+    input_wrapper = validate_input(input_data, daily)
+    result = await generate_sentence(input_wrapper, system_prompt, output_validation_model, daily)
+
+    try:
+        with timed("output_write"):
+            await asyncio.to_thread(write_json_file, output_file, result.model_dump(by_alias=True))
     except Exception as e:
-        logger.error(f"Unexpected error: {repr(e)}")
-        logger.error(f"Raw model output: {response.content if response else 'No response'}")
+        logger.error("Failed to write output file: %r", e)
         raise
@@ -0,0 +1,110 @@
+# Python standard libraries
+import os
+import json
+import logging
+# Internal imports
+from config import LLM_MODEL, MAX_SENTENCE_CHARS, PROMPT_FIELD_MAX_TOKENS, TOKENIZER_CACHE_DIR, TOKENIZER_DOWNLOAD
+from logger import get_logger
+
+logger = get_logger()
+
+""" Builds the messages sent to the LLM.
+
+The static system prompt always comes first and is byte-identical between calls, so providers that cache
+prompt prefixes can reuse it. The user message is the input with null fields dropped, long free-text
+fields cut to PROMPT_FIELD_MAX_TOKENS tokens and compact JSON separators.
+"""
+
+# free-text fields users can make arbitrarily long
+FREE_TEXT_FIELDS = ("current_situation", "challenges", "goals", "extra_notes")
+
+# tiktoken downloads its encoding on first use, so it is loaded once in the background (load_tokenizer);
+# until then, or when it cannot be loaded, tokens are estimated from the length
+_encoding = None
+
+
+def load_tokenizer():
+    """ Load the encoding of LLM_MODEL from TOKENIZER_CACHE_DIR; it is downloaded into that folder (once, for
+    every worker and restart) only with TOKENIZER_DOWNLOAD, so offline deployments never wait on the network """
+    global _encoding
+    try:
+        import tiktoken
+        from tiktoken.model import encoding_name_for_model
+    except ImportError:
+        logger.warning("tiktoken is not installed, estimating prompt tokens from length")
+        return
+    try:
+        name = encoding_name_for_model(LLM_MODEL)
+    except KeyError:
+        name = "o200k_base"
+    # written after a successful load: tiktoken names its cache files by a hash of the download URL
+    marker = os.path.join(TOKENIZER_CACHE_DIR, f"{name}.loaded")
+    if not TOKENIZER_DOWNLOAD and not os.path.exists(marker):
+        logger.info("tiktoken encoding %s is not in %s and TOKENIZER_DOWNLOAD is off, estimating prompt tokens "
+                    "from length", name, TOKENIZER_CACHE_DIR)
+        return
+    os.environ["TIKTOKEN_CACHE_DIR"] = TOKENIZER_CACHE_DIR
+    try:
+        encoding = tiktoken.get_encoding(name)
+        encoding.encode("warm-up")
+        os.makedirs(TOKENIZER_CACHE_DIR, exist_ok=True)
+        open(marker, "a").close()
+    except Exception as e:
+        logger.warning("tiktoken encoding unavailable (%r), estimating prompt tokens from length", e)
+        return
+    _encoding = encoding
+    logger.info("Prompt tokenizer loaded: %s", encoding.name)
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    # ~4 characters per token for English, fewer for other scripts; close enough for budgeting and logs
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if max_tokens <= 0 or count_tokens(text) <= max_tokens:
+        return text
+    if _encoding is not None:
+        # errors="ignore": the cut can fall inside a multi-byte character (Persian, emoji)
+        cut = _encoding.decode(_encoding.encode(text)[:max_tokens], errors="ignore")
+    else:
+        cut = text[:max_tokens * 4]
+    # end on a word boundary so the model does not see half a word
+    if " " in cut:
+        cut = cut[:cut.rindex(" ")]
+    return cut.rstrip(" ,;") + "…"
+
+
+def compact_payload(payload: dict) -> dict:
+    """ Drop null / empty values and cut the free-text fields to the token budget """
+    compact = {}
+    for key, value in payload.items():
+        if isinstance(value, dict):
+            value = compact_payload(value)
+        elif isinstance(value, str) and key in FREE_TEXT_FIELDS:
+            value = truncate_to_tokens(value.strip(), PROMPT_FIELD_MAX_TOKENS)
+        if value is None or value == "" or value == {}:
+            continue
+        compact[key] = value
+    return compact
+
+
+def build_system_prompt(system_prompt: str) -> str:
+    # only static, per-deployment text here: anything per-request would break the shared cacheable prefix
+    if MAX_SENTENCE_CHARS:
+        system_prompt += f"\nEvery motivational sentence must be at most {MAX_SENTENCE_CHARS} characters long."
+    return system_prompt
+
+
+def build_messages(system_prompt: str, payload: dict) -> list[dict]:
+    user_message = json.dumps(compact_payload(payload), ensure_ascii=False, separators=(",", ":"))
+    if logger.isEnabledFor(logging.INFO):  # skip the extra tokenization when it would not be logged
+        before = count_tokens(json.dumps(payload, ensure_ascii=False))
+        logger.info("Prompt user message tokens: %s -> %s (%s)", before, count_tokens(user_message),
+                    "tiktoken" if _encoding is not None else "estimate")
+    return [
+        {"role": "system", "content": build_system_prompt(system_prompt)},
+        {"role": "user", "content": user_message}
+    ]
@@ -39,3 +39,22 @@ Rules:
 7. Never give medical, psychological, or clinical advice.
 8. Ensure the output is valid JSON.
 """
+
+
+REPAIR_PROMPT = """
+The text below was supposed to be a JSON object of the form {shape} but it could not be used.
+Problem: {error}
+Return only the corrected JSON object. Keep the original sentence and its language; shorten it only if the problem says it is too long.
+"""
+
+
+# appended to a generate prompt to get several sentences from one call (SENTENCES_PER_CALL)
+MULTI_SENTENCE_PROMPT = """
+Write {count} different sentences that each follow the rules above. They must not share their main idea,
+opening words or structure with each other.
+
+Output Format (JSON), instead of the single sentence above:
+{{
+  "motivational_sentences": ["...", "..."]
+}}
+"""
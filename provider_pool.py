@@ -0,0 +1,308 @@
+# Python standard libraries
+import os
+import re
+import json
+import time
+import asyncio
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import AsyncIterator, Optional
+# Internal imports
+from llm_client import build_http_clients, close_http_clients
+from delay_control import take_token
+from sqlite_db import ThreadConnections, transaction
+from metrics import register_collector, LLM_PROVIDER_REQUESTS, LLM_PROVIDER_OUTSTANDING, LLM_PROVIDER_DRAINED
+from config import (
+    OPENAI_API_KEY, LLM_MODEL, LLM_BASE_URL, LLM_TEMPERATURE, LLM_MAX_TOKENS, LLM_TIMEOUT_SECONDS,
+    LLM_PROVIDERS, LLM_ROUTING, LLM_PROVIDER_DRAIN_SECONDS, LLM_PROVIDER_STATE_DB_PATH
+)
+from logger import get_logger
+
+logger = get_logger()
+
+""" Pool of LLM endpoints (base URL + API key + model) that calls are spread over.
+
+Routing is weighted round-robin or least-outstanding-requests. Every entry follows its own rate-limit
+headroom from the x-ratelimit-* response headers and is drained (skipped) while its key is throttled,
+so total throughput grows with the number of keys in LLM_PROVIDERS. With several workers the rpm buckets and
+drain windows are shared through SQLite, since the quota of a key is shared by every process using it.
+"""
+
+# "6m0s", "1.5s", "20ms" as sent in x-ratelimit-reset-* headers
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value) -> float:
+    if value is None:
+        return 0.0
+    value = str(value).strip()
+    try:
+        return float(value)  # Retry-After is plain seconds
+    except ValueError:
+        return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in DURATION_PART.findall(value))
+
+
+class Provider:
+    def __init__(self, name: str, base_url: str, api_key: str, model: str, weight: float = 1, rpm: float = 0):
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        self.weight = weight
+        self.rpm = rpm  # optional client-side pacing, 0 = only follow the provider's headers
+        self.outstanding = 0
+        self.current_weight = 0.0  # smooth weighted round-robin state
+        self.drained_until = 0.0
+        self.remaining_requests = None
+        self._tokens = float(rpm)
+        self._tokens_at = time.time()
+        self._llm = None
+        self._runnables = {}
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+
+            if not self.api_key:
+                logger.error("API key not found in .env file!")
+                raise ValueError("API key not found in .env file!")
+            http_client, http_async_client = build_http_clients()
+            self._llm = ChatOpenAI(
+                model=self.model,
+                base_url=self.base_url,
+                temperature=LLM_TEMPERATURE,
+                max_tokens=LLM_MAX_TOKENS, #token limiter
+                timeout=LLM_TIMEOUT_SECONDS,
+                max_retries=0, # retries are handled by llm_client.ResilientCaller
+                api_key=self.api_key,
+                include_response_headers=True, # x-ratelimit-* headers feed the headroom tracking
+                http_client=http_client,
+                http_async_client=http_async_client)
+        return self._llm
+
+    def runnable(self, max_tokens: int = None, output_model=None, method: str = None):
+        """ The client, optionally with a lower max_tokens and/or wrapped in with_structured_output
+        (include_raw=True, so the raw message with its headers stays available) """
+        key = (max_tokens, output_model, method)
+        if key not in self._runnables:
+            llm = self.llm if max_tokens is None else self.llm.model_copy(update={"max_tokens": max_tokens})
+            if output_model is not None:
+                llm = llm.with_structured_output(
+                    output_model, method=method, include_raw=True, strict=True if method == "json_schema" else None
+                )
+            self._runnables[key] = llm
+        return self._runnables[key]
+
+    def wait_time(self, now: float) -> float:
+        """ Seconds until this entry may be used again, 0 when it is available now """
+        wait = max(self.drained_until - now, 0.0)
+        if self.rpm:
+            tokens = min(self.rpm, self._tokens + (now - self._tokens_at) * self.rpm / 60)
+            wait = max(wait, (1 - tokens) * 60 / self.rpm)
+        return wait
+
+    def take(self, now: float):
+        self.outstanding += 1
+        if self.rpm:
+            _, self._tokens, _ = take_token(self._tokens, self._tokens_at, now, self.rpm / 60, self.rpm)
+            self._tokens_at = now
+
+    def drain(self, seconds: float, reason: str):
+        self.drained_until = max(self.drained_until, time.time() + seconds)
+        if shared_state is not None:
+            shared_state.drain(self)
+        logger.warning("LLM provider %s drained for %.1fs (%s)", self.name, seconds, reason)
+
+    def record_headers(self, headers: dict):
+        if not headers:
+            return
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        if remaining is None:
+            return
+        self.remaining_requests = int(float(remaining))
+        if self.remaining_requests <= 0:
+            reset = parse_duration(headers.get("x-ratelimit-reset-requests")) or LLM_PROVIDER_DRAIN_SECONDS
+            self.drain(reset, "request quota used up")
+
+    def record_error(self, error: Exception):
+        if getattr(error, "status_code", None) != 429:
+            return
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        seconds = parse_duration(headers.get("retry-after") or headers.get("x-ratelimit-reset-requests"))
+        self.drain(seconds or LLM_PROVIDER_DRAIN_SECONDS, "429 Too Many Requests")
+
+
+def load_providers(spec: str) -> list[Provider]:
+    """ LLM_PROVIDERS is a JSON list (or the path of a JSON file holding it) of
+    {"name", "base_url", "api_key" or "api_key_env", "model", "weight", "rpm"}; missing fields fall back to
+    LLM_BASE_URL / OPENAI_API_KEY / LLM_MODEL. Without it the pool has the single configured endpoint. """
+    if not spec.strip():
+        return [Provider("default", LLM_BASE_URL, OPENAI_API_KEY, LLM_MODEL)]
+    if not spec.lstrip().startswith("["):
+        with open(spec, "r", encoding="utf-8") as f:
+            spec = f.read()
+    providers = []
+    for i, entry in enumerate(json.loads(spec), start=1):
+        name = entry.get("name", f"provider{i}")
+        if any(p.name == name for p in providers):
+            # the name keys the state shared between workers
+            raise ValueError(f"LLM_PROVIDERS: duplicate entry name {name!r}")
+        weight = float(entry.get("weight", 1))
+        if not weight > 0:
+            # routing divides by the weight; an entry that should get no traffic is left out of the list instead
+            raise ValueError(f"LLM_PROVIDERS: weight of {name!r} must be greater than 0, got {entry.get('weight')!r}")
+        api_key = entry.get("api_key") or os.getenv(entry.get("api_key_env", ""), "") or OPENAI_API_KEY
+        providers.append(Provider(
+            name=name,
+            base_url=entry.get("base_url", LLM_BASE_URL),
+            api_key=api_key,
+            model=entry.get("model", LLM_MODEL),
+            weight=weight,
+            rpm=float(entry.get("rpm", 0)),
+        ))
+    return providers
+
+
+class SharedProviderState:
+    """ rpm buckets and drain windows of the pool entries in a SQLite file shared by the workers """
+
+    def __init__(self, path: str):
+        self._connections = ThreadConnections(path, """
+            CREATE TABLE IF NOT EXISTS llm_providers (
+                name TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                tokens_at REAL NOT NULL,
+                drained_until REAL NOT NULL
+            );
+        """, timeout=10)
+
+    @contextmanager
+    def synced(self, providers: list[Provider]):
+        """ Load the shared state into `providers` inside a write transaction, so a token taken (and stored
+        with `save`) in the block cannot be taken by another worker too """
+        by_name = {p.name: p for p in providers}
+        with transaction(self._connections.get()) as conn:
+            for name, tokens, tokens_at, drained_until in conn.execute(
+                "SELECT name, tokens, tokens_at, drained_until FROM llm_providers"
+            ):
+                if name in by_name:
+                    p = by_name[name]
+                    p._tokens, p._tokens_at, p.drained_until = tokens, tokens_at, drained_until
+            yield
+
+    def save(self, provider: Provider):
+        self._connections.get().execute(
+            "INSERT INTO llm_providers (name, tokens, tokens_at, drained_until) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET tokens = excluded.tokens, tokens_at = excluded.tokens_at",
+            (provider.name, provider._tokens, provider._tokens_at, provider.drained_until)
+        )
+
+    def drain(self, provider: Provider):
+        # MAX: a shorter window reported by one worker must not end a longer one set by another
+        self._connections.get().execute(
+            "INSERT INTO llm_providers (name, tokens, tokens_at, drained_until) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET drained_until = MAX(drained_until, excluded.drained_until)",
+            (provider.name, provider._tokens, provider._tokens_at, provider.drained_until)
+        )
+
+
+class ProviderPool:
+    def __init__(self, providers: list[Provider], routing: str):
+        self.providers = providers
+        self.routing = routing
+        self._lock = threading.Lock()
+        logger.info("LLM provider pool: %s (%s routing)", ", ".join(p.name for p in providers), routing)
+
+    def _select(self, candidates: list[Provider]) -> Provider:
+        if self.routing == "least_outstanding":
+            return min(candidates, key=lambda p: p.outstanding / p.weight)
+        # smooth weighted round-robin (as in nginx): even spread, proportional to weight
+        total = sum(p.weight for p in candidates)
+        for p in candidates:
+            p.current_weight += p.weight
+        provider = max(candidates, key=lambda p: p.current_weight)
+        provider.current_weight -= total
+        return provider
+
+    async def acquire(self) -> Provider:
+        """ Pick an entry; while every key is throttled, wait for the first one to recover instead of
+        sending requests that would only get 429 (the caller's deadline bounds the wait) """
+        while True:
+            with self._lock, shared_state.synced(self.providers) if shared_state else nullcontext():
+                now = time.time()
+                candidates = [p for p in self.providers if p.wait_time(now) <= 0]
+                if candidates:
+                    provider = self._select(candidates)
+                    provider.take(now)
+                    if shared_state is not None and provider.rpm:
+                        shared_state.save(provider)
+                    return provider
+                wait = min(p.wait_time(now) for p in self.providers)
+            await asyncio.sleep(wait)
+
+    def model_names(self) -> list[str]:
+        return sorted({p.model for p in self.providers})
+
+    async def ainvoke(self, messages, **options):
+        """ options go to Provider.runnable(); with output_model the result is the
+        {"raw", "parsed", "parsing_error"} dict of with_structured_output """
+        provider = await self.acquire()
+        try:
+            response = await provider.runnable(**options).ainvoke(messages)
+        except Exception as e:
+            provider.record_error(e)
+            LLM_PROVIDER_REQUESTS.inc(provider=provider.name, result="error")
+            raise
+        finally:
+            provider.outstanding -= 1
+        raw = response["raw"] if isinstance(response, dict) else response
+        provider.record_headers(raw.response_metadata.get("headers"))
+        LLM_PROVIDER_REQUESTS.inc(provider=provider.name, result="ok")
+        return response
+
+    async def astream(self, messages, **options) -> AsyncIterator:
+        provider = await self.acquire()
+        try:
+            async for chunk in provider.runnable(**options).astream(messages):
+                # headers only come with the first chunk
+                provider.record_headers(chunk.response_metadata.get("headers"))
+                yield chunk
+        except Exception as e:
+            provider.record_error(e)
+            LLM_PROVIDER_REQUESTS.inc(provider=provider.name, result="error")
+            raise
+        finally:
+            provider.outstanding -= 1
+        LLM_PROVIDER_REQUESTS.inc(provider=provider.name, result="ok")
+
+    def open(self):
+        """ Build the clients of every entry at startup (run by the app's lifespan), so the first requests
+        of a worker do not pay for importing and creating them """
+        for provider in self.providers:
+            try:
+                provider.llm
+            except Exception as e:
+                logger.error("LLM provider %s could not be set up: %r", provider.name, e)
+
+    async def close(self):
+        """ Close the pooled HTTP connections on shutdown; the next call builds fresh clients """
+        with self._lock:
+            for provider in self.providers:
+                provider._llm = None
+                provider._runnables = {}
+        await close_http_clients()
+
+    def collect_metrics(self):
+        now = time.time()
+        for provider in self.providers:
+            LLM_PROVIDER_OUTSTANDING.set(provider.outstanding, provider=provider.name)
+            LLM_PROVIDER_DRAINED.set(int(now < provider.drained_until), provider=provider.name)
+
+
+shared_state: Optional[SharedProviderState] = (
+    SharedProviderState(LLM_PROVIDER_STATE_DB_PATH) if LLM_PROVIDER_STATE_DB_PATH else None
+)
+provider_pool = ProviderPool(load_providers(LLM_PROVIDERS), LLM_ROUTING)
+register_collector(provider_pool.collect_metrics)
@@ -0,0 +1,159 @@
+# Python standard libraries
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+# Internal imports
+from metrics import CACHE_REQUESTS
+from config import (CACHE_ENABLED, CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CACHE_SQLITE_PATH, CACHE_SQLITE_MAX_ENTRIES,
+                    CACHE_PURGE_INTERVAL_SECONDS)
+from logger import get_logger
+
+logger = get_logger()
+
+""" Content-addressed cache for LLM responses: in-memory LRU with TTL and an optional SQLite tier.
+get/set answer from memory and run the SQLite tier in a thread, off the event loop; expired SQLite
+entries are removed by run_purge on a timer, not by the writes. """
+
+
+def make_cache_key(payload: dict, system_prompt: str, model_params: dict, day: Optional[str] = None) -> str:
+    # canonical JSON (sorted keys, no whitespace) so equal payloads always hash the same
+    canonical = json.dumps(
+        {"payload": payload, "prompt": system_prompt, "params": model_params, "day": day},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int, ttl_seconds: float, sqlite_path: str = "",
+                 sqlite_max_entries: int = CACHE_SQLITE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_max_entries = sqlite_max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()  # the SQLite connection is shared by the threads running the tier
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._db = None
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_expires ON response_cache (expires_at)")
+            self._db.commit()
+            logger.info("Response cache SQLite tier enabled: %s", sqlite_path)
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = self._memory_get(key)
+        if value is None and self._db is not None:
+            value = await asyncio.to_thread(self._disk_get, key)
+        return self._count(value)
+
+    async def set(self, key: str, value: dict):
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store_in_memory(key, value, expires_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_set, key, value, expires_at)
+
+    def _memory_get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                return value
+            del self._entries[key]
+            return None
+
+    def _disk_get(self, key: str) -> Optional[dict]:
+        with self._db_lock:
+            row = self._db.execute("SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        value = json.loads(row[0])
+        with self._lock:
+            self._store_in_memory(key, value, row[1])
+            self.disk_hits += 1
+        return value
+
+    def _disk_set(self, key: str, value: dict, expires_at: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+            self._db.commit()
+
+    def _count(self, value: Optional[dict]) -> Optional[dict]:
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        CACHE_REQUESTS.inc(result="miss" if value is None else "hit")
+        return value
+
+    @property
+    def has_sqlite_tier(self) -> bool:
+        return self._db is not None
+
+    def purge(self) -> int:
+        """ Remove the expired SQLite entries, then the ones closest to expiry beyond sqlite_max_entries """
+        if self._db is None:
+            return 0
+        with self._db_lock:
+            removed = self._db.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),)).rowcount
+            excess = self._db.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0] - self.sqlite_max_entries
+            if excess > 0:
+                removed += self._db.execute(
+                    "DELETE FROM response_cache WHERE key IN "
+                    "(SELECT key FROM response_cache ORDER BY expires_at LIMIT ?)", (excess,)
+                ).rowcount
+            self._db.commit()
+        return removed
+
+    async def run_purge(self, interval_seconds: float = CACHE_PURGE_INTERVAL_SECONDS):
+        """ Background task (main.lifespan): purge the SQLite tier every interval_seconds """
+        while True:
+            try:
+                removed = await asyncio.to_thread(self.purge)
+                if removed:
+                    logger.info("Response cache: purged %s SQLite entries", removed)
+            except sqlite3.Error as e:
+                logger.error("Response cache purge failed: %r", e)
+            await asyncio.sleep(interval_seconds)
+
+    def _store_in_memory(self, key: str, value: dict, expires_at: float):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": CACHE_ENABLED,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "memory_entries": len(self._entries),
+                "sqlite_tier": self._db is not None,
+                "sqlite_max_entries": self.sqlite_max_entries if self._db is not None else 0,
+            }
+
+
+response_cache = ResponseCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CACHE_SQLITE_PATH)
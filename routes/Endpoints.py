@@ -1,16 +1,26 @@
 # Python standard libraries
 import os
 import json
+import asyncio
 # external libraries
-from fastapi import APIRouter, File, UploadFile
-from fastapi.responses import JSONResponse
+from typing import Optional
+from fastapi import APIRouter, File, UploadFile, Form, Query, Request, BackgroundTasks
+from fastapi.responses import JSONResponse, StreamingResponse
 # internal imports
 from validations.pydantic_validation import (MotivationOutputValidation,UserMotivationInputWrapper,DailyMotivationInputWrapper)
 
-from model import base_generate
+from model import validate_input, generate_sentence, stream_sentence
+from llm_client import CircuitOpenError
+from response_cache import response_cache
+from storage import storage, KINDS, new_user_id
+from batch_generator import generate_batch, iter_directory_records, iter_id_records, iter_upload_records
+from bulk_import import import_records
+from uploads import read_upload, read_chunks, UploadTooLarge
+from daily_pool import sentence_pool, schedule_refill, needs_refill, start_fill, generate_now, has_pool
+from config import DAILY_POOL_ENABLED, MAX_BULK_UPLOAD_BYTES
 from logger import get_logger
-from delay_control import check_delay
-from file_indexer import get_next_index_file
+from delay_control import check_rate_limit, client_key
+from metrics import timed, RATE_LIMIT_REJECTIONS, DAILY_POOL_REQUESTS
 import prompts
 logger = get_logger()
 
@@ -19,221 +29,502 @@ router = APIRouter()
 BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 BASE_PATH = os.path.dirname(BASE_PATH)  # back to root
 
-INPUTS_FOLDER = os.path.join(BASE_PATH, "Inputs_Outputs/inputs")
-OUTPUTS_FOLDER = os.path.join(BASE_PATH, "Inputs_Outputs/outputs")
-DAILY_INPUTS_FOLDER = os.path.join(BASE_PATH, "Inputs_Outputs/daily_inputs" )
-DAILY_OUTPUTS_FOLDER = os.path.join(BASE_PATH, "Inputs_Outputs/daily_outputs" )
 
-os.makedirs(INPUTS_FOLDER, exist_ok=True)
-os.makedirs(OUTPUTS_FOLDER, exist_ok=True)
-os.makedirs(DAILY_INPUTS_FOLDER, exist_ok=True)
-os.makedirs(DAILY_OUTPUTS_FOLDER,exist_ok=True)
+async def rate_limit_response(request: Request, route: str) -> Optional[JSONResponse]:
+    """ None when the client may call `route`, otherwise the 429 response to return """
+    ok, retry_after = await asyncio.to_thread(check_rate_limit, route, client_key(request))
+    if ok:
+        logger.info("Rate-limit check passed for /%s", route)
+        return None
+    RATE_LIMIT_REJECTIONS.inc(route=route)
+    logger.warning("Rate limit: must wait %s seconds before next /%s request.", retry_after, route)
+    return JSONResponse(
+        content={"error": f"Please wait {retry_after} seconds before next /{route} request"},
+        status_code=429,
+        headers={"Retry-After": str(retry_after)}
+    )
 
-# Delay control
-last_input_time = 0
-last_analyze_time = 0
-last_daily_input_time = 0
-last_daily_analyze_time = 0
 
-@router.post("/input")
-async def upload_input_json(file: UploadFile = File(...)):
-    logger.info("Received request: POST /input")
+def circuit_open_response(error: CircuitOpenError) -> JSONResponse:
+    logger.warning("Generate rejected, LLM circuit open: %s", error)
+    return JSONResponse(
+        content={"error": str(error)},
+        status_code=503,
+        headers={"Retry-After": str(int(error.retry_after))}
+    )
 
-    global last_input_time
-    ok, result = check_delay(last_input_time)
 
-    if not ok:
-        wait_seconds = result
-        logger.warning(f"Rate limit: must wait {wait_seconds} seconds before next /input request.")
-        return JSONResponse(
-            content={"error": f"Please wait {wait_seconds} seconds before next input upload"},
-            status_code=429
-        )
+@router.post("/input")
+async def upload_input_json(request: Request, file: UploadFile = File(...), user_id: Optional[str] = Form(None)):
+    logger.info("Received request: POST /input")
 
-    last_input_time = result
-    logger.info("Rate-limit check passed for /input")
+    limited = await rate_limit_response(request, "input")
+    if limited:
+        return limited
 
+    # user_info.name is a display name shared by many users, so it never identifies the user
+    user_id = user_id or new_user_id()
     try:
         # 1. Read file
-        contents = await file.read()
-        text = contents.decode("utf-8").strip()
-
-        if not text:
+        with timed("request_parse"):
+            try:
+                contents = await read_upload(file)
+            except UploadTooLarge as e:
+                logger.warning("Upload failed: %s", e)
+                return JSONResponse(content={"error": str(e)}, status_code=413)
+
+        if not contents.strip():
             logger.warning("Upload failed: empty file content.")
             return JSONResponse(content={"error": "The uploaded file is empty"}, status_code=400)
 
-        logger.info(f"File content read successfully. Filename={file.filename}")
+        logger.info("File content read successfully. Filename=%s", file.filename)
 
         # 2. JSON validation using Pydantic
         try:
-            parsed_json = UserMotivationInputWrapper(**json.loads(text))
+            with timed("validation"):
+                parsed_json = UserMotivationInputWrapper.model_validate_json(contents)
             logger.info("JSON validation passed (UserMotivationInput).")
         except Exception as e:
-            logger.error(f"JSON validation failed: {repr(e)}")
+            logger.error("JSON validation failed: %r", e)
             return JSONResponse(
                 content={"error": "Invalid JSON format or missing required fields", "details": str(e)},
                 status_code=400
             )
         # 3. Save validated JSON file
-        save_path = get_next_index_file(INPUTS_FOLDER, "input")
-
-        with open(save_path, "w", encoding="utf-8") as f:
-            f.write(text)
+        validated_data = parsed_json.model_dump()
+        with timed("file_io"):
+            record = await asyncio.to_thread(
+                storage.save_input, "user", validated_data, user_id
+            )
 
         logger.info(
-            f"Input JSON saved successfully. Original={file.filename} | Saved={save_path}"
+            "Input JSON saved successfully. Original=%s | Saved=%s", file.filename, record['location']
         )
 
         return {
             "status": "ok",
             "filename": file.filename,
-            "saved_path": save_path,
-            "validated_data": parsed_json.model_dump()
+            "input_id": record["id"],
+            "user_id": user_id,
+            "saved_path": record["location"],
+            "validated_data": validated_data
         }
 
     except Exception as e:
-        logger.error(f"Unexpected exception in /input: {repr(e)}")
+        logger.error("Unexpected exception in /input: %r", e)
         return JSONResponse(content={"error": "Internal server error", "details": str(e)}, status_code=500)
 
     
 @router.post("/input_daily")
-async def upload_daily_input_json(file: UploadFile = File(...)):
+async def upload_daily_input_json(request: Request, file: UploadFile = File(...), user_id: Optional[str] = Form(None)):
     logger.info("Received request: POST /input_daily")
 
-    global last_daily_input_time
-    ok, result = check_delay(last_daily_input_time)
-
-    if not ok:
-        wait_seconds = result
-        logger.warning(f"Rate limit: must wait {wait_seconds} seconds before next /input_daily request.")
-        return JSONResponse(
-            content={"error": f"Please wait {wait_seconds} seconds before next daily input upload"},
-            status_code=429
-        )
-
-    last_daily_input_time = result
-    logger.info("Rate-limit check passed for /input_daily")
+    limited = await rate_limit_response(request, "input_daily")
+    if limited:
+        return limited
 
+    user_id = user_id or new_user_id()
     try:
         # 1. Read uploaded file
-        contents = await file.read()
-        text = contents.decode("utf-8").strip()
-
-        if not text:
+        with timed("request_parse"):
+            try:
+                contents = await read_upload(file)
+            except UploadTooLarge as e:
+                logger.warning("Upload failed: %s", e)
+                return JSONResponse(content={"error": str(e)}, status_code=413)
+
+        if not contents.strip():
             logger.warning("Daily upload failed: empty file content.")
             return JSONResponse(content={"error": "The uploaded file is empty"}, status_code=400)
 
-        logger.info(f"Daily file content read successfully. Filename={file.filename}")
+        logger.info("Daily file content read successfully. Filename=%s", file.filename)
 
         # 2. JSON validation using Pydantic
         try:
-            parsed_json = DailyMotivationInputWrapper(**json.loads(text))
+            with timed("validation"):
+                parsed_json = DailyMotivationInputWrapper.model_validate_json(contents)
             logger.info("JSON validation passed (DailyMotivationInput).")
         except Exception as e:
-            logger.error(f"Daily JSON validation failed: {repr(e)}")
+            logger.error("Daily JSON validation failed: %r", e)
             return JSONResponse(
                 content={"error": "Invalid JSON format or missing required fields", "details": str(e)},
                 status_code=400
             )
 
         # 3. Save validated JSON file
-        save_path = get_next_index_file(DAILY_INPUTS_FOLDER, "input")
-
-        with open(save_path, "w", encoding="utf-8") as f:
-            f.write(text)
+        validated_data = parsed_json.model_dump()
+        with timed("file_io"):
+            record = await asyncio.to_thread(
+                storage.save_input, "daily", validated_data, user_id
+            )
 
         logger.info(
-            f"Daily input JSON saved successfully. Original={file.filename} | Saved={save_path}"
+            "Daily input JSON saved successfully. Original=%s | Saved=%s", file.filename, record['location']
         )
 
         return {
             "status": "ok",
             "filename": file.filename,
-            "saved_path": save_path,
-            "validated_data": parsed_json.model_dump()
+            "input_id": record["id"],
+            "user_id": user_id,
+            "saved_path": record["location"],
+            "validated_data": validated_data
         }
 
     except Exception as e:
-        logger.error(f"Unexpected exception in /input_daily: {repr(e)}")
+        logger.error("Unexpected exception in /input_daily: %r", e)
         return JSONResponse(
             content={"error": "Internal server error", "details": str(e)},
             status_code=500
         )
 
 
-@router.get("/generate")
-async def generate_json():
-    logger.info("Received request: /generate (generate_json)")
+@router.post("/input_bulk")
+async def upload_bulk_inputs(request: Request, file: UploadFile = File(...), kind: str = Form("user")):
+    """
+    Import many inputs in one request: a JSONL file (one {"user_info": ...} object per line) or a JSON array
+    of them, each stored under its optional "user_id" (a new id is generated and returned when it is missing).
+    Records are validated and saved batch by batch while the upload is read; one JSON line per record is
+    streamed back, then a summary line.
+    """
+    logger.info("Received request: POST /input_bulk")
 
-    global last_analyze_time
+    limited = await rate_limit_response(request, "input_bulk")
+    if limited:
+        return limited
 
-    ok, result = check_delay(last_analyze_time)
-    if not ok:
-        logger.warning(f"Generate request rejected due to delay. Must wait {result} seconds.")
-        return JSONResponse(
-            content={"error": f"Please wait {result} seconds before next generate"},
-            status_code=429
-        )
+    if kind not in KINDS:
+        return JSONResponse(content={"error": f"kind must be one of: {', '.join(KINDS)}"}, status_code=400)
+
+    async def stream_results():
+        counts = {"ok": 0, "invalid": 0}
+        records = iter_upload_records(read_chunks(file, MAX_BULK_UPLOAD_BYTES))
+        try:
+            async for item in import_records(records, kind):
+                counts[item["status"]] += 1
+                yield json.dumps(item, ensure_ascii=False) + "\n"
+        except ValueError as e:
+            # upload too large or not a valid JSONL / JSON array: the records before the error are kept
+            logger.error("Bulk import stopped: %r", e)
+            yield json.dumps({"id": None, "status": "error", "error": str(e)}, ensure_ascii=False) + "\n"
+        logger.info("Bulk import (%s) completed. %s imported, %s invalid", kind, counts["ok"], counts["invalid"])
+        yield json.dumps({"status": "done", "imported": counts["ok"], "invalid": counts["invalid"]}) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
 
-    last_analyze_time = result
-    logger.info("Rate-limit check passed for /generate")
+
+@router.get("/generate")
+async def generate_json(request: Request, user_id: Optional[str] = None):
+    logger.info("Received request: /generate (generate_json)")
+
+    limited = await rate_limit_response(request, "generate")
+    if limited:
+        return limited
 
     try:
-        input_files = sorted(os.listdir(INPUTS_FOLDER))
-        if not input_files:
-            logger.warning("Generate failed: no input files found.")
+        with timed("file_io"):
+            # raw JSON text, validated below in one pass instead of json.loads + validation
+            latest = await asyncio.to_thread(storage.latest_input, "user", user_id, True)
+        if latest is None:
+            logger.warning("Generate failed: no input found.")
             return JSONResponse(content={"error": "No file has been uploaded yet"}, status_code=400)
 
-        input_file_path = os.path.join(INPUTS_FOLDER, input_files[-1])
-        logger.info(f"Selected latest input file: {input_file_path}")
+        logger.info("Selected latest input: %s", latest['location'])
 
-        output_file_path = get_next_index_file(OUTPUTS_FOLDER, "output")
-        logger.info(f"Generating output file: {output_file_path}")
+        input_wrapper = validate_input(latest["payload"], False)
+        result = await generate_sentence(input_wrapper, prompts.SINGLE_GENERATE_PROMPT, MotivationOutputValidation, False)
+        with timed("output_write"):
+            output = await asyncio.to_thread(
+                storage.save_output, "user", latest["id"], result.model_dump(by_alias=True), latest["user"]
+            )
 
-        base_generate(input_file_path, output_file_path,prompts.SINGLE_GENERATE_PROMPT,MotivationOutputValidation,False)
+        logger.info("Generation completed. Output saved to %s", output['location'])
+        return {"status": "ok", "input_id": latest["id"], "output_id": output["id"], "output_file": output["location"]}
 
-        logger.info(f"Generation completed. Output saved to {output_file_path}")
-        return {"status": "ok", "output_file": output_file_path}
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
 
     except Exception as e:
-        logger.error(f"Exception in /generate: {repr(e)}")
+        logger.error("Exception in /generate: %r", e)
         return JSONResponse(content={"error": str(e)}, status_code=500)
     
 
 @router.get("/generate_daily")
-async def generate_daily_json():
+async def generate_daily_json(request: Request, user_id: Optional[str] = None):
     logger.info("Received request: /generate_daily (generate_json)")
 
-    global last_daily_analyze_time
+    limited = await rate_limit_response(request, "generate_daily")
+    if limited:
+        return limited
 
-    ok, result = check_delay(last_daily_analyze_time)
-    if not ok:
-        logger.warning(f"Generate request rejected due to delay. Must wait {result} seconds.")
-        return JSONResponse(
-            content={"error": f"Please wait {result} seconds before next generate"},
-            status_code=429
-        )
+    try:
+        with timed("file_io"):
+            latest = await asyncio.to_thread(storage.latest_input, "daily", user_id, True)
+        if latest is None:
+            logger.warning("Generate failed: no input found.")
+            return JSONResponse(content={"error": "No file has been uploaded yet"}, status_code=400)
+
+        logger.info("Selected latest input: %s", latest['location'])
+
+        sentence = None
+        if DAILY_POOL_ENABLED and has_pool(latest):
+            sentence, left = await asyncio.to_thread(sentence_pool.take, latest["user"], latest["id"])
+            DAILY_POOL_REQUESTS.inc(result="hit" if sentence else "miss")
+            if sentence is None:
+                # live call; with SENTENCES_PER_CALL > 1 the extra sentences go to the pool
+                sentence, left = await generate_now(latest)
+            else:
+                logger.info("Served daily sentence from the pool (%s left)", left)
+            if needs_refill(left):
+                schedule_refill(latest)
+        if sentence is None:
+            input_wrapper = validate_input(latest["payload"], True)
+            result = await generate_sentence(input_wrapper, prompts.DAILY_GENERATE_PROMPT, MotivationOutputValidation, True)
+            sentence = result.model_dump(by_alias=True)
+        with timed("output_write"):
+            output = await asyncio.to_thread(storage.save_output, "daily", latest["id"], sentence, latest["user"])
+
+        logger.info("Generation completed. Output saved to %s", output['location'])
+        return {"status": "ok", "input_id": latest["id"], "output_id": output["id"], "output_file": output["location"]}
+
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+
+    except Exception as e:
+        logger.error("Exception in /generate_daily: %r", e)
+        return JSONResponse(content={"error": str(e)}, status_code=500)
 
-    last_daily_analyze_time = result
-    logger.info("Rate-limit check passed for /generate_daily")
 
+def persist_generation(kind: str, payload: dict, output: dict, user: str):
+    # runs after the response is sent; failures are only logged because the client already has its sentence
     try:
-        input_files = sorted(os.listdir(DAILY_INPUTS_FOLDER))
-        if not input_files:
-            logger.warning("Generate failed: no input files found.")
-            return JSONResponse(content={"error": "No file has been uploaded yet"}, status_code=400)
+        record = storage.save_input(kind, payload, user)
+        storage.save_output(kind, record["id"], output, user)
+        logger.info("Inline generation persisted. Input=%s", record['location'])
+    except Exception as e:
+        logger.error("Failed to persist inline generation: %r", e)
 
-        input_file_path = os.path.join(DAILY_INPUTS_FOLDER, input_files[-1])
-        logger.info(f"Selected latest input file: {input_file_path}")
 
-        output_file_path = get_next_index_file(DAILY_OUTPUTS_FOLDER, "output")
-        logger.info(f"Generating output file: {output_file_path}")
+@router.post("/generate")
+async def generate_inline(
+    request: Request,
+    user_input: UserMotivationInputWrapper,
+    background_tasks: BackgroundTasks,
+    persist: bool = True,
+    user_id: Optional[str] = None):
+    """ Validate the posted user_info and return the sentence in the response, without an /input upload first """
+    logger.info("Received request: POST /generate (generate_inline)")
 
-        base_generate(input_file_path, output_file_path,prompts.DAILY_GENERATE_PROMPT,MotivationOutputValidation,True)
+    limited = await rate_limit_response(request, "generate")
+    if limited:
+        return limited
 
-        logger.info(f"Generation completed. Output saved to {output_file_path}")
-        return {"status": "ok", "output_file": output_file_path}
+    try:
+        result = await generate_sentence(user_input, prompts.SINGLE_GENERATE_PROMPT, MotivationOutputValidation, False)
+        output = result.model_dump(by_alias=True)
+        if persist:
+            user_id = user_id or new_user_id()
+            background_tasks.add_task(persist_generation, "user", user_input.model_dump(), output, user_id)
+        logger.info("Inline generation completed.")
+        return {"status": "ok", "user_id": user_id, **output}
+
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
 
     except Exception as e:
-        logger.error(f"Exception in /generate_daily: {repr(e)}")
+        logger.error("Exception in POST /generate: %r", e)
         return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+@router.post("/generate_daily")
+async def generate_daily_inline(
+    request: Request,
+    user_input: DailyMotivationInputWrapper,
+    background_tasks: BackgroundTasks,
+    persist: bool = True,
+    user_id: Optional[str] = None):
+    """ Validate the posted daily user_info and return the sentence in the response, without an /input_daily upload first """
+    logger.info("Received request: POST /generate_daily (generate_daily_inline)")
+
+    limited = await rate_limit_response(request, "generate_daily")
+    if limited:
+        return limited
+
+    try:
+        result = await generate_sentence(user_input, prompts.DAILY_GENERATE_PROMPT, MotivationOutputValidation, True)
+        output = result.model_dump(by_alias=True)
+        if persist:
+            user_id = user_id or new_user_id()
+            background_tasks.add_task(persist_generation, "daily", user_input.model_dump(), output, user_id)
+        logger.info("Inline daily generation completed.")
+        return {"status": "ok", "user_id": user_id, **output}
+
+    except CircuitOpenError as e:
+        return circuit_open_response(e)
+
+    except Exception as e:
+        logger.error("Exception in POST /generate_daily: %r", e)
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_generation(input_wrapper, system_prompt: str, kind: str, persist: bool, user: Optional[str]) -> StreamingResponse:
+    """ Server-Sent Events: "token" events with pieces of the sentence, then one "result" (or "error") event """
+    daily = kind == "daily"
+
+    async def events():
+        try:
+            async for event, value in stream_sentence(input_wrapper, system_prompt, MotivationOutputValidation, daily):
+                if event == "token":
+                    yield sse_event("token", {"text": value})
+                else:
+                    output = value.model_dump(by_alias=True)
+                    yield sse_event("result", {"status": "ok", "user_id": user, **output})
+                    if persist:
+                        await asyncio.to_thread(persist_generation, kind, input_wrapper.model_dump(), output, user)
+            logger.info("Streaming generation completed (%s).", kind)
+        except Exception as e:
+            logger.error("Exception in streaming generation (%s): %r", kind, e)
+            yield sse_event("error", {"error": str(e)})
+
+    # no-cache / no buffering so proxies forward every event immediately
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
+
+@router.post("/generate_stream")
+async def generate_stream(
+    request: Request,
+    user_input: UserMotivationInputWrapper,
+    persist: bool = True,
+    user_id: Optional[str] = None):
+    """ Like POST /generate, but streams the sentence over Server-Sent Events as the model writes it """
+    logger.info("Received request: POST /generate_stream")
+
+    limited = await rate_limit_response(request, "generate")
+    if limited:
+        return limited
+
+    return stream_generation(
+        user_input, prompts.SINGLE_GENERATE_PROMPT, "user", persist, user_id or (new_user_id() if persist else None)
+    )
+
+
+@router.post("/generate_daily_stream")
+async def generate_daily_stream(
+    request: Request,
+    user_input: DailyMotivationInputWrapper,
+    persist: bool = True,
+    user_id: Optional[str] = None):
+    """ Like POST /generate_daily, but streams the sentence over Server-Sent Events as the model writes it """
+    logger.info("Received request: POST /generate_daily_stream")
+
+    limited = await rate_limit_response(request, "generate_daily")
+    if limited:
+        return limited
+
+    return stream_generation(
+        user_input, prompts.DAILY_GENERATE_PROMPT, "daily", persist, user_id or (new_user_id() if persist else None)
+    )
+
+
+@router.get("/history")
+async def history(
+    kind: str = "user",
+    user_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+    before_id: Optional[int] = None):
+    """ Stored inputs (newest first) with the outputs generated from each; use next_before_id to page """
+    if kind not in KINDS:
+        return JSONResponse(content={"error": f"kind must be one of: {', '.join(KINDS)}"}, status_code=400)
+
+    def load_page():
+        inputs = storage.list_inputs(kind, user_id, limit, before_id)
+        for record in inputs:
+            record["outputs"] = storage.outputs_for_input(kind, record["id"])
+        return inputs
+
+    items = await asyncio.to_thread(load_page)
+    next_before_id = items[-1]["id"] if len(items) == limit else None
+    return {"items": items, "next_before_id": next_before_id}
+
+
+@router.get("/cache_stats")
+async def cache_stats():
+    return response_cache.stats()
+
+
+@router.get("/daily_pool_stats")
+async def daily_pool_stats():
+    return {"enabled": DAILY_POOL_ENABLED, **await asyncio.to_thread(sentence_pool.stats)}
+
+
+@router.post("/fill_daily_pool")
+async def fill_daily_pool(request: Request):
+    """ Start a fill run of the daily pool now instead of waiting for DAILY_POOL_SCHEDULE """
+    logger.info("Received request: POST /fill_daily_pool")
+
+    limited = await rate_limit_response(request, "fill_daily_pool")
+    if limited:
+        return limited
+
+    if not DAILY_POOL_ENABLED:
+        return JSONResponse(content={"error": "The daily pool is disabled (DAILY_POOL_ENABLED)"}, status_code=400)
+    started = await start_fill()
+    return JSONResponse(content={"status": "started" if started else "already running"}, status_code=202)
+
+
+@router.post("/generate_batch")
+async def generate_batch_json(
+    request: Request,
+    file: Optional[UploadFile] = File(None),
+    input_dir: Optional[str] = Form(None),
+    input_ids: Optional[str] = Form(None)):
+    """
+    Generate daily sentences for many inputs in one run. Exactly one source is used:
+    - file: a JSONL upload, one {"user_info": ...} object per line, or a JSON array of them
+    - input_dir: a folder inside Inputs_Outputs holding one input JSON per file
+    - input_ids: comma separated ids of stored daily inputs (e.g. "1,2,5")
+    Results are streamed back as JSON lines while the outputs are saved to the storage.
+    """
+    logger.info("Received request: POST /generate_batch")
+
+    limited = await rate_limit_response(request, "generate_batch")
+    if limited:
+        return limited
+
+    sources = [source for source in (file, input_dir, input_ids) if source]
+    if len(sources) != 1:
+        logger.warning("Batch failed: expected exactly one of file, input_dir or input_ids.")
+        return JSONResponse(
+            content={"error": "Provide exactly one of: file (JSONL or JSON array), input_dir, input_ids"},
+            status_code=400
+        )
+
+    if file:
+        records = iter_upload_records(read_chunks(file, MAX_BULK_UPLOAD_BYTES))
+    elif input_dir:
+        # only folders inside Inputs_Outputs may be read
+        allowed_root = os.path.realpath(os.path.join(BASE_PATH, "Inputs_Outputs"))
+        folder = os.path.realpath(os.path.join(allowed_root, input_dir))
+        if os.path.commonpath([allowed_root, folder]) != allowed_root or not os.path.isdir(folder):
+            logger.warning("Batch failed: invalid input_dir %s", input_dir)
+            return JSONResponse(content={"error": "input_dir must be an existing folder inside Inputs_Outputs"}, status_code=400)
+        records = iter_directory_records(folder)
+    else:
+        ids = [input_id.strip() for input_id in input_ids.split(",") if input_id.strip()]
+        if not all(input_id.isdigit() for input_id in ids):
+            return JSONResponse(content={"error": "input_ids must be comma separated numbers"}, status_code=400)
+        records = iter_id_records(storage, "daily", [int(input_id) for input_id in ids])
+
+    async def stream_results():
+        processed = 0
+        async for item in generate_batch(records, prompts.DAILY_GENERATE_PROMPT, MotivationOutputValidation):
+            processed += 1
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+        logger.info("Batch completed. %s items processed", processed)
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
@@ -0,0 +1,58 @@
+# Python standard libraries
+import zlib
+import unicodedata
+# Internal imports
+from config import DEDUP_THRESHOLD
+
+""" Near-duplicate detection for generated sentences.
+
+Every sentence becomes a vector of its character 3-gram counts, hashed into a fixed number of dimensions
+and L2-normalised, so the cosine similarity against everything already seen is one NumPy matrix-vector
+product. Character n-grams catch reworded repeats ("you are so strong" / "you're so strong") and work the
+same for Persian text and emoji. numpy is imported on first use to keep startup fast.
+"""
+
+NGRAM = 3
+DIMENSIONS = 4096
+
+
+def normalize(text: str) -> str:
+    # case, punctuation and spacing differences do not make a sentence new
+    text = unicodedata.normalize("NFKC", text).casefold()
+    kept = "".join(c if c.isalnum() or unicodedata.category(c) == "So" else " " for c in text)
+    return " ".join(kept.split())
+
+
+def ngram_vector(text: str):
+    import numpy as np
+
+    padded = f" {normalize(text)} "
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for i in range(max(len(padded) - NGRAM + 1, 1)):
+        # crc32 instead of hash(): stable between processes and runs
+        vector[zlib.crc32(padded[i:i + NGRAM].encode("utf-8")) % DIMENSIONS] += 1
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SimilarityIndex:
+    def __init__(self, texts=(), threshold: float = DEDUP_THRESHOLD):
+        import numpy as np
+
+        # float32 rounding: identical texts score ~0.99999994, so 1 must still catch exact repeats
+        self.threshold = min(threshold, 0.9999)
+        vectors = [ngram_vector(text) for text in texts]
+        self._matrix = np.vstack(vectors) if vectors else np.zeros((0, DIMENSIONS), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return len(self._matrix)
+
+    def add_if_new(self, text: str) -> bool:
+        """ Add `text` and return True, unless it is a near-duplicate of something already in the index """
+        import numpy as np
+
+        vector = ngram_vector(text)
+        if len(self._matrix) and float((self._matrix @ vector).max()) >= self.threshold:
+            return False
+        self._matrix = np.vstack([self._matrix, vector])
+        return True
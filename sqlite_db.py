@@ -0,0 +1,57 @@
+# Python standard libraries
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+""" SQLite plumbing shared by the stores that keep state in a database file (storage, rate limits, file
+counters, daily pool): a connection per thread and BEGIN IMMEDIATE transactions that are atomic across
+worker processes """
+
+
+class ThreadConnections:
+    """ One connection per thread to the database at `path`, since sqlite3 connections must not be shared
+    between threads. Connections are in autocommit mode (statements outside `transaction` commit on their
+    own) with WAL, so readers never block the writer; `schema` (CREATE ... IF NOT EXISTS) runs on each. """
+
+    def __init__(self, path: str, schema: str = "", timeout: float = 30, synchronous: str = "NORMAL",
+                 row_factory=None):
+        self.path = path
+        self.schema = schema
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self.row_factory = row_factory
+        self._local = threading.local()
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.row_factory = self.row_factory
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            if self.schema:
+                conn.executescript(self.schema)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """ Close the connection of the calling thread """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    """ BEGIN IMMEDIATE takes the write lock up front, so a read-modify-write inside the block is atomic
+    across processes; committed at the end of the block, rolled back when it raises """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
@@ -0,0 +1,436 @@
+# Python standard libraries
+import os
+import json
+import time
+import uuid
+import sqlite3
+import bisect
+import itertools
+import threading
+from abc import ABC, abstractmethod
+from typing import Optional
+# Internal imports
+from file_indexer import allocate_index
+from sqlite_db import ThreadConnections, transaction
+from config import STORAGE_BACKEND, STORAGE_DB_PATH, STORAGE_IMPORT_FILES, BASE_DIR
+from logger import get_logger
+
+logger = get_logger()
+
+""" Storage for uploaded inputs and generated outputs.
+
+Every record is a dict: {"id", "kind", "user", "created_at", "location", "payload"} where kind is
+"user" (inputs for /generate) or "daily" (inputs for /generate_daily). Outputs also carry the
+"input_id" they were generated from.
+Input lookups accept raw=True to get the payload as the stored JSON text, so it can be validated
+straight from text (model_validate_json) instead of being parsed here and validated again.
+Two backends are available (STORAGE_BACKEND):
+- "sqlite": all records in one indexed SQLite database
+- "files": the original one-JSON-file-per-record layout in Inputs_Outputs, plus an append-only index.jsonl per folder
+Files written before either existed (inputN.json without an index) are picked up once at startup: the sqlite
+backend imports them, the files backend indexes them. They were stored without a user, so they get none.
+"""
+
+KINDS = ("user", "daily")
+
+
+def new_user_id() -> str:
+    """ Id for a user the client did not name; returned to the client, which sends it back as user_id """
+    return uuid.uuid4().hex
+
+
+def numbered_files(folder: str, prefix: str) -> list[tuple[int, str]]:
+    """ (index, path) of the <prefix>N.json files in a folder, oldest first """
+    files = []
+    if os.path.isdir(folder):
+        for name in os.listdir(folder):
+            index = name[len(prefix):-len(".json")]
+            if name.startswith(prefix) and name.endswith(".json") and index.isdigit():
+                files.append((int(index), os.path.join(folder, name)))
+    return sorted(files)
+
+
+class Storage(ABC):
+    @abstractmethod
+    def save_input(self, kind: str, payload: dict, user: str) -> dict:
+        ...
+
+    def save_inputs(self, kind: str, records: list[tuple[dict, str]]) -> list[dict]:
+        """Save many (payload, user) inputs at once, in order."""
+        return [self.save_input(kind, payload, user) for payload, user in records]
+
+    @abstractmethod
+    def get_input(self, kind: str, input_id: int, raw: bool = False) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def latest_input(self, kind: str, user: Optional[str] = None, raw: bool = False) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def list_inputs(self, kind: str, user: Optional[str] = None, limit: int = 20, before_id: Optional[int] = None,
+                    raw: bool = False) -> list[dict]:
+        """Newest first; pass the smallest id of a page as before_id to get the next page."""
+        ...
+
+    @abstractmethod
+    def roster(self, kind: str, after_user: Optional[str] = None, limit: int = 100, raw: bool = False) -> list[dict]:
+        """Latest input of every user, ordered by user; pass the last user of a page as after_user to get the next page."""
+        ...
+
+    @abstractmethod
+    def save_output(self, kind: str, input_id: Optional[int], payload: dict, user: Optional[str] = None) -> dict:
+        ...
+
+    @abstractmethod
+    def outputs_for_input(self, kind: str, input_id: int) -> list[dict]:
+        ...
+
+    @abstractmethod
+    def recent_outputs(self, kind: str, user: str, limit: int = 200) -> list[dict]:
+        """Newest outputs delivered to `user`, newest first."""
+        ...
+
+    def close(self):
+        pass
+
+
+class SQLiteStorage(Storage):
+    def __init__(self, path: str):
+        self.path = path
+        self._connections = ThreadConnections(path, """
+            CREATE TABLE IF NOT EXISTS inputs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                user TEXT,
+                created_at REAL NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_inputs_kind ON inputs (kind, id);
+            CREATE INDEX IF NOT EXISTS idx_inputs_user ON inputs (kind, user, id);
+            CREATE TABLE IF NOT EXISTS outputs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                input_id INTEGER REFERENCES inputs (id),
+                user TEXT,
+                created_at REAL NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_outputs_input ON outputs (input_id, id);
+            CREATE INDEX IF NOT EXISTS idx_outputs_user ON outputs (kind, user, id);
+            CREATE TABLE IF NOT EXISTS imports (
+                source TEXT PRIMARY KEY,
+                imported_at REAL NOT NULL
+            );
+        """, row_factory=sqlite3.Row)
+        self._conn = self._connections.get
+        self._conn()
+        logger.info("SQLite storage ready: %s", path)
+
+    def import_files(self, base_dir: str):
+        """ Import the records of the Inputs_Outputs folders under base_dir, once per database """
+        source = os.path.abspath(base_dir)
+        # one write transaction: workers starting together import the files only once
+        with transaction(self._conn()) as conn:
+            if conn.execute("SELECT 1 FROM imports WHERE source = ?", (source,)).fetchone() is None:
+                imported = 0
+                for (kind, table), folder in FileStorage.FOLDERS.items():
+                    prefix = "input" if table == "inputs" else "output"
+                    for _, path in numbered_files(os.path.join(base_dir, folder), prefix):
+                        try:
+                            with open(path, "r", encoding="utf-8") as f:
+                                payload = json.dumps(json.load(f), ensure_ascii=False)
+                        except (OSError, ValueError) as e:
+                            logger.warning("Storage import: skipped %s: %r", path, e)
+                            continue
+                        # outputs of the files layout do not record their input, so they stay unlinked
+                        conn.execute(
+                            f"INSERT INTO {table} (kind, user, created_at, payload) VALUES (?, NULL, ?, ?)",
+                            (kind, os.path.getmtime(path), payload)
+                        )
+                        imported += 1
+                conn.execute("INSERT INTO imports (source, imported_at) VALUES (?, ?)", (source, time.time()))
+                logger.info("Storage import: %s records from %s", imported, source)
+
+    def _record(self, row: sqlite3.Row, table: str, raw: bool = False) -> dict:
+        record = {
+            "id": row["id"],
+            "kind": row["kind"],
+            "user": row["user"],
+            "created_at": row["created_at"],
+            "location": f"sqlite:{table}/{row['id']}",
+            "payload": row["payload"] if raw else json.loads(row["payload"]),
+        }
+        if table == "outputs":
+            record["input_id"] = row["input_id"]
+        return record
+
+    def save_input(self, kind, payload, user):
+        created_at = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO inputs (kind, user, created_at, payload) VALUES (?, ?, ?, ?)",
+            (kind, user, created_at, json.dumps(payload, ensure_ascii=False))
+        )
+        input_id = cursor.lastrowid
+        return {"id": input_id, "kind": kind, "user": user, "created_at": created_at,
+                "location": f"sqlite:inputs/{input_id}", "payload": payload}
+
+    def save_inputs(self, kind, records):
+        # one transaction (one fsync) for the whole batch instead of one per input
+        created_at = time.time()
+        saved = []
+        with transaction(self._conn()) as conn:
+            for payload, user in records:
+                input_id = conn.execute(
+                    "INSERT INTO inputs (kind, user, created_at, payload) VALUES (?, ?, ?, ?)",
+                    (kind, user, created_at, json.dumps(payload, ensure_ascii=False))
+                ).lastrowid
+                saved.append({"id": input_id, "kind": kind, "user": user, "created_at": created_at,
+                              "location": f"sqlite:inputs/{input_id}", "payload": payload})
+        return saved
+
+    def get_input(self, kind, input_id, raw=False):
+        row = self._conn().execute("SELECT * FROM inputs WHERE id = ? AND kind = ?", (input_id, kind)).fetchone()
+        return self._record(row, "inputs", raw) if row else None
+
+    def latest_input(self, kind, user=None, raw=False):
+        rows = self.list_inputs(kind, user, limit=1, raw=raw)
+        return rows[0] if rows else None
+
+    def list_inputs(self, kind, user=None, limit=20, before_id=None, raw=False):
+        query = "SELECT * FROM inputs WHERE kind = ?"
+        params = [kind]
+        if user is not None:
+            query += " AND user = ?"
+            params.append(user)
+        if before_id is not None:
+            query += " AND id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return [self._record(row, "inputs", raw) for row in self._conn().execute(query, params)]
+
+    def roster(self, kind, after_user=None, limit=100, raw=False):
+        rows = self._conn().execute(
+            """SELECT inputs.* FROM inputs JOIN (
+                   SELECT MAX(id) AS id FROM inputs WHERE kind = ? AND user > ? GROUP BY user ORDER BY user LIMIT ?
+               ) AS latest ON inputs.id = latest.id ORDER BY inputs.user""",
+            (kind, after_user or "", limit)
+        )
+        return [self._record(row, "inputs", raw) for row in rows]
+
+    def save_output(self, kind, input_id, payload, user=None):
+        created_at = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO outputs (kind, input_id, user, created_at, payload) VALUES (?, ?, ?, ?, ?)",
+            (kind, input_id, user, created_at, json.dumps(payload, ensure_ascii=False))
+        )
+        output_id = cursor.lastrowid
+        return {"id": output_id, "kind": kind, "input_id": input_id, "user": user, "created_at": created_at,
+                "location": f"sqlite:outputs/{output_id}", "payload": payload}
+
+    def outputs_for_input(self, kind, input_id):
+        rows = self._conn().execute(
+            "SELECT * FROM outputs WHERE input_id = ? AND kind = ? ORDER BY id", (input_id, kind)
+        )
+        return [self._record(row, "outputs") for row in rows]
+
+    def recent_outputs(self, kind, user, limit=200):
+        rows = self._conn().execute(
+            "SELECT * FROM outputs WHERE kind = ? AND user = ? ORDER BY id DESC LIMIT ?", (kind, user, limit)
+        )
+        return [self._record(row, "outputs") for row in rows]
+
+    def close(self):
+        self._connections.close()
+
+
+class FileStorage(Storage):
+    """ Keeps the original Inputs_Outputs folder layout; each folder gets an append-only index.jsonl
+    so the latest record is found by reading the end of the index instead of sorting a listing. """
+
+    FOLDERS = {
+        ("user", "inputs"): "Inputs_Outputs/inputs",
+        ("user", "outputs"): "Inputs_Outputs/outputs",
+        ("daily", "inputs"): "Inputs_Outputs/daily_inputs",
+        ("daily", "outputs"): "Inputs_Outputs/daily_outputs",
+    }
+
+    def __init__(self, base_dir: str):
+        self.folders = {key: os.path.join(base_dir, folder) for key, folder in self.FOLDERS.items()}
+        # per kind: (bytes of inputs/index.jsonl read so far, latest entry per user, users sorted or None)
+        self._latest = {}
+        self._latest_lock = threading.Lock()
+        for (kind, table), folder in self.folders.items():
+            os.makedirs(folder, exist_ok=True)
+            self._index_existing_files(kind, table)
+
+    def _index_path(self, kind, table):
+        return os.path.join(self.folders[(kind, table)], "index.jsonl")
+
+    def _index_existing_files(self, kind, table):
+        # folders written before index.jsonl existed: index their files once, oldest first, without a user
+        path = self._index_path(kind, table)
+        prefix = "input" if table == "inputs" else "output"
+        files = numbered_files(self.folders[(kind, table)], prefix)
+        if os.path.exists(path) or not files:
+            return
+        entry = {"user": None} if table == "inputs" else {"input_id": None, "user": None}
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for record_id, file_path in files:
+                f.write(json.dumps({"id": record_id, **entry, "created_at": os.path.getmtime(file_path)}) + "\n")
+        try:
+            # link() fails when another worker created the index meanwhile, which is kept
+            os.link(temp_path, path)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_path)
+
+    def _append(self, kind, table, payload, entry):
+        prefix = "input" if table == "inputs" else "output"
+        record_id = allocate_index(self.folders[(kind, table)], prefix)
+        path = os.path.join(self.folders[(kind, table)], f"{prefix}{record_id}.json")
+        entry = {"id": record_id, **entry}
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2, ensure_ascii=False)
+        # one write() of a short line in append mode, so lines from concurrent writers do not interleave
+        with open(self._index_path(kind, table), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return {**entry, "kind": kind, "location": path, "payload": payload}
+
+    def _read_index(self, kind, table) -> list[dict]:
+        path = self._index_path(kind, table)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _last_index_entry(self, kind, table) -> Optional[dict]:
+        # read backwards from the end of the file so the cost does not grow with the index size
+        path = self._index_path(kind, table)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            position = f.tell()
+            block = b""
+            while position > 0:
+                step = min(4096, position)
+                position -= step
+                f.seek(position)
+                block = f.read(step) + block
+                lines = [line for line in block.split(b"\n") if line.strip()]
+                if len(lines) > 1 or (lines and position == 0):
+                    return json.loads(lines[-1])
+        return None
+
+    def _latest_per_user(self, kind) -> tuple[dict, list]:
+        """ Latest input index entry per user and the users in order, updated by reading only what was appended
+        to the index since the last call, so paging through the roster does not re-read the whole index """
+        path = self._index_path(kind, "inputs")
+        with self._latest_lock:
+            offset, latest, users = self._latest.get(kind, (0, {}, None))
+            if not os.path.exists(path):
+                return {}, []
+            if os.path.getsize(path) < offset:
+                # the index was replaced, start over
+                offset, latest, users = 0, {}, None
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read()
+            # a line still being written by another process is read on the next call
+            complete = data[:data.rfind(b"\n") + 1]
+            for line in complete.split(b"\n"):
+                if line.strip():
+                    entry = json.loads(line)
+                    if entry["user"]:
+                        if entry["user"] not in latest:
+                            users = None
+                        latest[entry["user"]] = entry
+            if users is None:
+                users = sorted(latest)
+            self._latest[kind] = (offset + len(complete), latest, users)
+            return latest, users
+
+    def _load(self, kind, table, entry, raw=False) -> Optional[dict]:
+        prefix = "input" if table == "inputs" else "output"
+        path = os.path.join(self.folders[(kind, table)], f"{prefix}{entry['id']}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                payload = f.read() if raw else json.load(f)
+        except FileNotFoundError:
+            return None
+        return {**entry, "kind": kind, "location": path, "payload": payload}
+
+    def save_input(self, kind, payload, user):
+        return self._append(kind, "inputs", payload, {"user": user, "created_at": time.time()})
+
+    def get_input(self, kind, input_id, raw=False):
+        record = self._load(kind, "inputs", {"id": input_id, "user": None, "created_at": None}, raw)
+        if record is not None:
+            for entry in self._read_index(kind, "inputs"):
+                if entry["id"] == input_id:
+                    record.update(entry)
+                    break
+        return record
+
+    def latest_input(self, kind, user=None, raw=False):
+        if user is None:
+            entry = self._last_index_entry(kind, "inputs")
+            return self._load(kind, "inputs", entry, raw) if entry else None
+        entry = self._latest_per_user(kind)[0].get(user)
+        record = self._load(kind, "inputs", entry, raw) if entry else None
+        if record is None and entry is not None:
+            # the file of the latest input is gone: fall back to the user's older inputs
+            rows = self.list_inputs(kind, user, limit=1, raw=raw)
+            record = rows[0] if rows else None
+        return record
+
+    def list_inputs(self, kind, user=None, limit=20, before_id=None, raw=False):
+        entries = (
+            entry for entry in reversed(self._read_index(kind, "inputs"))
+            if (user is None or entry["user"] == user) and (before_id is None or entry["id"] < before_id)
+        )
+        records = (self._load(kind, "inputs", entry, raw) for entry in entries)
+        # only the files of the returned page are opened
+        return list(itertools.islice((record for record in records if record is not None), limit))
+
+    def roster(self, kind, after_user=None, limit=100, raw=False):
+        latest, users = self._latest_per_user(kind)
+        records = []
+        for user in users[bisect.bisect_right(users, after_user or ""):]:
+            record = self._load(kind, "inputs", latest[user], raw)
+            if record is not None:
+                records.append(record)
+                if len(records) == limit:
+                    break
+        return records
+
+    def save_output(self, kind, input_id, payload, user=None):
+        return self._append(kind, "outputs", payload, {"input_id": input_id, "user": user, "created_at": time.time()})
+
+    def outputs_for_input(self, kind, input_id):
+        entries = [entry for entry in self._read_index(kind, "outputs") if entry["input_id"] == input_id]
+        records = (self._load(kind, "outputs", entry) for entry in entries)
+        return [record for record in records if record is not None]
+
+    def recent_outputs(self, kind, user, limit=200):
+        entries = [entry for entry in reversed(self._read_index(kind, "outputs")) if entry["user"] == user][:limit]
+        records = (self._load(kind, "outputs", entry) for entry in entries)
+        return [record for record in records if record is not None]
+
+
+def create_storage() -> Storage:
+    if STORAGE_BACKEND == "files":
+        return FileStorage(BASE_DIR)
+    if STORAGE_BACKEND == "sqlite":
+        sqlite_storage = SQLiteStorage(STORAGE_DB_PATH)
+        if STORAGE_IMPORT_FILES:
+            sqlite_storage.import_files(BASE_DIR)
+        return sqlite_storage
+    raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+
+storage = create_storage()
@@ -0,0 +1,63 @@
+"""
+batch_generator.generate_with_retry retries only retryable LLM errors and stops at an open circuit.
+"""
+# Python standard libraries
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# external libraries
+import pytest
+# Internal imports
+import batch_generator
+from llm_client import CircuitOpenError
+from validations.pydantic_validation import MotivationOutputValidation
+
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """ generate_sentence raising the queued errors in turn, then succeeding; returns the call count """
+    state = {"errors": [], "calls": 0}
+
+    async def fake_generate(*args):
+        state["calls"] += 1
+        if state["errors"]:
+            raise state["errors"].pop(0)
+        return MotivationOutputValidation(motivational_sentence="Keep going")
+
+    monkeypatch.setattr(batch_generator, "generate_sentence", fake_generate)
+    monkeypatch.setattr(batch_generator, "BATCH_RETRY_BACKOFF_SECONDS", 0)
+    return state
+
+
+def run(max_retries: int = 2):
+    return asyncio.run(batch_generator.generate_with_retry(None, "prompt", MotivationOutputValidation, True, max_retries))
+
+
+def test_retryable_errors_are_retried(calls):
+    calls["errors"] = [StatusError(503), StatusError(429)]
+    assert run().motivational_sentence == "Keep going"
+    assert calls["calls"] == 3
+
+
+@pytest.mark.parametrize("error", [StatusError(400), ValueError("invalid output"), CircuitOpenError(5.0)])
+def test_other_errors_fail_at_once(calls, error):
+    calls["errors"] = [error]
+    with pytest.raises(type(error)):
+        run()
+    assert calls["calls"] == 1
+
+
+def test_retries_are_bounded(calls):
+    calls["errors"] = [StatusError(500)] * 3
+    with pytest.raises(StatusError):
+        run(max_retries=1)
+    assert calls["calls"] == 2
@@ -0,0 +1,115 @@
+"""
+Circuit breaker of llm_client.ResilientCaller against benchmarks/mock_llm_server.py: opens after failures,
+lets one trial call through once half-open, survives a cancelled trial and closes again on success.
+"""
+# Python standard libraries
+import os
+import sys
+import time
+import asyncio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# external libraries
+import pytest
+from openai import AsyncOpenAI
+# Internal imports
+import llm_client
+from llm_client import ResilientCaller, CircuitBreaker, CircuitOpenError
+from mock_llm_server import MockHandler, start_server
+
+RESET_SECONDS = 0.3
+MESSAGES = [{"role": "user", "content": "motivate me"}]
+
+
+@pytest.fixture
+def server():
+    server = start_server()
+    yield server
+    server.shutdown()
+    MockHandler.errors = []
+    MockHandler.latency = 0.0
+
+
+@pytest.fixture
+def caller(monkeypatch):
+    monkeypatch.setattr(llm_client, "LLM_MAX_RETRIES", 0)
+    caller = ResilientCaller()
+    caller.breaker = CircuitBreaker(failure_threshold=1, reset_seconds=RESET_SECONDS)
+    return caller
+
+
+def make_client(server) -> AsyncOpenAI:
+    return AsyncOpenAI(base_url=f"http://127.0.0.1:{server.server_port}/v1", api_key="test-key", max_retries=0)
+
+
+async def open_circuit(caller: ResilientCaller, client: AsyncOpenAI):
+    MockHandler.errors = [("500", 1.0)]
+    with pytest.raises(Exception) as error:
+        await caller.call(lambda: client.chat.completions.create(model="mock", messages=MESSAGES))
+    assert getattr(error.value, "status_code", None) == 500
+    MockHandler.errors = []
+    assert caller.breaker.state == "open"
+
+
+def test_open_half_open_cancelled_trial_and_recovery(server, caller):
+    async def scenario():
+        client = make_client(server)
+
+        def complete():
+            return client.chat.completions.create(model="mock", messages=MESSAGES)
+
+        await open_circuit(caller, client)
+        # open: calls fail fast without reaching the server
+        with pytest.raises(CircuitOpenError):
+            await caller.call(complete)
+
+        time.sleep(RESET_SECONDS)
+        assert caller.breaker.state == "half_open"
+        # the trial call is cancelled (client disconnect / shutdown) before the slow server answers
+        MockHandler.latency = 2.0
+        trial = asyncio.create_task(caller.call(complete))
+        await asyncio.sleep(0.2)
+        assert caller.breaker.trial_running
+        trial.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await trial
+        assert caller.breaker.state == "half_open"
+        assert not caller.breaker.trial_running
+
+        # the next call becomes the trial, succeeds and closes the circuit
+        MockHandler.latency = 0.0
+        response = await caller.call(complete)
+        assert response.choices[0].message.content
+        assert caller.breaker.state == "closed"
+        await client.close()
+
+    asyncio.run(scenario())
+
+
+def test_stream_closed_by_client_ends_trial(server, caller):
+    async def scenario():
+        client = make_client(server)
+
+        async def open_stream():
+            stream = await client.chat.completions.create(model="mock", messages=MESSAGES, stream=True)
+            async for chunk in stream:
+                yield chunk
+
+        await open_circuit(caller, client)
+        time.sleep(RESET_SECONDS)
+        stream = caller.stream(open_stream)
+        await stream.__anext__()
+        # the SSE client goes away after the first chunk: GeneratorExit inside the trial
+        await stream.aclose()
+        assert caller.breaker.state == "half_open"
+        assert not caller.breaker.trial_running
+
+        chunks = [chunk async for chunk in caller.stream(open_stream)]
+        assert chunks
+        assert caller.breaker.state == "closed"
+        await client.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+"""
+Daily pool with inputs stored without a user (e.g. legacy files imported by storage.import_files): they have
+no pool, so /generate_daily serves them with a plain generate_sentence call and never starts a refill.
+"""
+# Python standard libraries
+import os
+import sys
+import json
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# external libraries
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+# Internal imports
+import daily_pool
+from routes import Endpoints
+from storage import SQLiteStorage
+from validations.pydantic_validation import MotivationOutputValidation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    storage = SQLiteStorage(str(tmp_path / "storage.sqlite"))
+    pool = daily_pool.SentencePool(str(tmp_path / "daily_pool.sqlite"))
+    for module in (Endpoints, daily_pool):
+        monkeypatch.setattr(module, "storage", storage)
+        monkeypatch.setattr(module, "sentence_pool", pool)
+    monkeypatch.setattr(Endpoints, "DAILY_POOL_ENABLED", True)
+
+    async def no_limit(request, route):
+        return None
+
+    async def fake_generate_sentence(*args, **kwargs):
+        return MotivationOutputValidation(motivational_sentence="One step at a time")
+
+    async def unexpected_pool_call(*args, **kwargs):
+        raise AssertionError("an input without a user must not reach the pool")
+
+    monkeypatch.setattr(Endpoints, "rate_limit_response", no_limit)
+    monkeypatch.setattr(Endpoints, "generate_sentence", fake_generate_sentence)
+    monkeypatch.setattr(daily_pool, "generate_sentences", unexpected_pool_call)
+    with open(os.path.join(ROOT, "Inputs_Outputs", "daily_inputs", "input1.json"), "r", encoding="utf-8") as f:
+        storage.save_input("daily", json.load(f), None)
+
+    app = FastAPI()
+    app.include_router(Endpoints.router, prefix="/motivation")
+    app.state.storage, app.state.pool = storage, pool
+    return app
+
+
+def test_generate_daily_serves_input_without_user_live(app):
+    response = TestClient(app).get("/motivation/generate_daily")
+    assert response.status_code == 200, response.text
+    output = app.state.storage.outputs_for_input("daily", response.json()["input_id"])
+    assert output[0]["payload"] == {"motivational_sentence": "One step at a time"}
+    assert app.state.pool.stats()["sentences"] == 0
+    assert not daily_pool._refill_tasks
+
+
+def test_no_refill_or_fill_for_input_without_user(app):
+    record = app.state.storage.latest_input("daily", None, True)
+    daily_pool.schedule_refill(record)
+    assert not daily_pool._refill_tasks
+    assert asyncio.run(daily_pool.fill_user(record, asyncio.Semaphore(1))) == (0, 0)
@@ -0,0 +1,66 @@
+"""
+inputN/outputN index allocation (file_indexer.allocate_index)
+"""
+# Python standard libraries
+import os
+import sys
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Internal imports
+import file_indexer
+from file_indexer import allocate_index, get_next_index_file
+from sqlite_db import ThreadConnections
+
+# run by every worker process of the concurrency test
+ALLOCATE = "import sys, file_indexer; print(*(file_indexer.allocate_index(sys.argv[1], 'input') for _ in range(50)))"
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "counters.sqlite")
+    monkeypatch.setattr(file_indexer, "_connections", ThreadConnections(path, file_indexer._connections.schema))
+    return path
+
+
+def test_counts_up_per_folder_prefix_and_extension(tmp_path, db_path):
+    inputs, outputs = tmp_path / "inputs", tmp_path / "outputs"
+    inputs.mkdir()
+    outputs.mkdir()
+    assert [allocate_index(str(inputs), "input") for _ in range(3)] == [1, 2, 3]
+    assert allocate_index(str(outputs), "input") == 1
+    assert allocate_index(str(inputs), "output") == 1
+    assert allocate_index(str(inputs), "input", ".txt") == 1
+    assert get_next_index_file(str(inputs), "input") == os.path.join(str(inputs), "input4.json")
+
+
+def test_first_allocation_continues_after_existing_files(tmp_path, db_path):
+    for name in ("input1.json", "input7.json", "input12.txt", "inputx.json", "output30.json"):
+        (tmp_path / name).write_text("{}")
+    assert allocate_index(str(tmp_path), "input") == 8
+    # only the first allocation scans the folder
+    (tmp_path / "input100.json").write_text("{}")
+    assert allocate_index(str(tmp_path), "input") == 9
+
+
+def test_unique_under_concurrent_threads(tmp_path, db_path):
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        indexes = list(pool.map(lambda _: allocate_index(str(tmp_path), "input"), range(200)))
+    assert sorted(indexes) == list(range(1, 201))
+
+
+def test_unique_under_concurrent_processes(tmp_path, db_path):
+    env = dict(os.environ, INDEX_DB_PATH=db_path, PYTHONPATH=ROOT)
+    workers = [
+        subprocess.Popen([sys.executable, "-c", ALLOCATE, str(tmp_path)], env=env, cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        for _ in range(4)
+    ]
+    indexes = [int(index) for worker in workers for index in worker.communicate(timeout=60)[0].split()]
+    assert all(worker.returncode == 0 for worker in workers)
+    assert sorted(indexes) == list(range(1, 201))
+    assert allocate_index(str(tmp_path), "input") == 201
@@ -0,0 +1,47 @@
+"""
+Loading the prompt tokenizer without network access (prompt_builder.load_tokenizer)
+"""
+# Python standard libraries
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Internal imports
+import prompt_builder
+
+tiktoken = pytest.importorskip("tiktoken")
+
+
+@pytest.fixture
+def loads(tmp_path, monkeypatch):
+    """ Encodings get_encoding was asked for; it fails like an offline download would """
+    requested = []
+
+    def get_encoding(name):
+        requested.append(name)
+        raise ConnectionError("offline")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", get_encoding)
+    monkeypatch.setattr(prompt_builder, "TOKENIZER_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(prompt_builder, "_encoding", None)
+    monkeypatch.setenv("TIKTOKEN_CACHE_DIR", str(tmp_path))
+    return requested
+
+
+def test_no_download_attempt_when_not_cached(loads, monkeypatch):
+    monkeypatch.setattr(prompt_builder, "TOKENIZER_DOWNLOAD", False)
+    prompt_builder.load_tokenizer()
+    assert loads == []
+    assert prompt_builder.count_tokens("12345678") == 2
+
+
+def test_failed_download_falls_back_to_the_estimate(loads, tmp_path, monkeypatch):
+    monkeypatch.setattr(prompt_builder, "TOKENIZER_DOWNLOAD", True)
+    prompt_builder.load_tokenizer()
+    assert len(loads) == 1
+    assert prompt_builder.count_tokens("12345678") == 2
+    # only a successful load marks the encoding as cached
+    assert os.listdir(tmp_path) == []
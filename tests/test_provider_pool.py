@@ -0,0 +1,61 @@
+"""
+Provider pool configuration (provider_pool.load_providers) and the state shared between worker processes
+(provider_pool.SharedProviderState)
+"""
+# Python standard libraries
+import os
+import sys
+import time
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Internal imports
+import provider_pool
+from provider_pool import Provider, ProviderPool, SharedProviderState, load_providers
+
+
+def make_pool(rpm: float = 0) -> ProviderPool:
+    # a pool of its own per simulated worker, as every process builds one
+    return ProviderPool([Provider("key1", "http://llm", "sk-1", "model", rpm=rpm)], "round_robin")
+
+
+def acquires(pool: ProviderPool) -> bool:
+    """ Whether the pool hands out its key now instead of waiting for it """
+    try:
+        asyncio.run(asyncio.wait_for(pool.acquire(), timeout=0.5))
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+def test_weights_must_be_positive():
+    providers = load_providers('[{"name": "a", "weight": 3}, {"name": "b", "weight": 0.5}, {"name": "c"}]')
+    assert [p.weight for p in providers] == [3, 0.5, 1]
+    for weight in ("0", "-1", '"nan"'):
+        with pytest.raises(ValueError, match="weight of 'b' must be greater than 0"):
+            load_providers(f'[{{"name": "a"}}, {{"name": "b", "weight": {weight}}}]')
+
+
+def test_duplicate_names_are_rejected():
+    with pytest.raises(ValueError, match="duplicate entry name 'a'"):
+        load_providers('[{"name": "a"}, {"name": "a", "base_url": "http://other"}]')
+
+
+def test_workers_share_the_rpm_of_a_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(provider_pool, "shared_state", SharedProviderState(str(tmp_path / "providers.sqlite")))
+    workers = [make_pool(rpm=3), make_pool(rpm=3)]
+    assert [acquires(workers[worker]) for worker in (0, 1, 0)] == [True, True, True]
+    # the three requests of the minute are used up, whichever worker asks next
+    assert not acquires(workers[1])
+    assert not acquires(workers[0])
+
+
+def test_drain_seen_by_the_other_workers(tmp_path, monkeypatch):
+    monkeypatch.setattr(provider_pool, "shared_state", SharedProviderState(str(tmp_path / "providers.sqlite")))
+    workers = [make_pool(), make_pool()]
+    workers[0].providers[0].drain(60, "test")
+    assert not acquires(workers[1])
+    assert workers[1].providers[0].drained_until > time.time() + 50
@@ -0,0 +1,64 @@
+"""
+Token buckets (delay_control.take_token, SQLiteRateLimiter) and the client identity they are kept for
+(delay_control.client_key)
+"""
+# Python standard libraries
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Internal imports
+import delay_control
+from delay_control import client_key, take_token, SQLiteRateLimiter
+
+
+def make_request(headers: dict, host: str = "10.0.0.1"):
+    return SimpleNamespace(headers=headers, client=SimpleNamespace(host=host))
+
+
+def test_unknown_api_keys_share_the_address_bucket(monkeypatch):
+    monkeypatch.setattr(delay_control, "RATE_LIMIT_API_KEYS", frozenset({"partner-key"}))
+    keys = {client_key(make_request({"x-api-key": f"k{i}"})) for i in range(5)}
+    assert keys == {"ip:10.0.0.1"}
+
+
+def test_configured_api_key_gets_its_own_bucket(monkeypatch):
+    monkeypatch.setattr(delay_control, "RATE_LIMIT_API_KEYS", frozenset({"partner-key"}))
+    key = client_key(make_request({"x-api-key": "partner-key"}))
+    assert key.startswith("key:") and "partner-key" not in key
+    assert client_key(make_request({"x-api-key": "partner-key"}, host="10.0.0.2")) == key
+
+
+def test_burst_then_retry_after():
+    tokens, now = 3.0, 1000.0
+    results = []
+    for _ in range(4):
+        ok, tokens, retry_after = take_token(tokens, now, now, rate=0.5, burst=3)
+        results.append((ok, retry_after))
+    assert results == [(True, 0), (True, 0), (True, 0), (False, 3)]
+
+
+def test_refill_is_capped_at_the_burst():
+    ok, tokens, _ = take_token(0.0, 1000.0, 1001.0, rate=0.5, burst=3)
+    assert not ok and tokens == 0.5
+    ok, tokens, _ = take_token(0.5, 1001.0, 1002.0, rate=0.5, burst=3)
+    assert ok and tokens == 0
+    # idle for an hour: back to the burst, not to 1800 tokens
+    ok, tokens, _ = take_token(0.0, 1000.0, 4600.0, rate=0.5, burst=3)
+    assert ok and tokens == 2
+
+
+def test_zero_rate_never_refills():
+    ok, tokens, retry_after = take_token(0.0, 1000.0, 9000.0, rate=0, burst=1)
+    assert (ok, tokens, retry_after) == (False, 0.0, 60)
+
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    # two limiters on one file, as two worker processes have
+    path = str(tmp_path / "rate_limits.sqlite")
+    workers = [SQLiteRateLimiter(path), SQLiteRateLimiter(path)]
+    results = [workers[i % 2].acquire("generate|ip:10.0.0.1", rate=1 / 60, burst=3)[0] for i in range(4)]
+    assert results == [True, True, True, False]
+    assert workers[0].acquire("generate|ip:10.0.0.2", rate=1 / 60, burst=3) == (True, 0)
@@ -0,0 +1,50 @@
+"""
+SQLite tier of response_cache.ResponseCache: shared through the database, expired entries and entries
+beyond its size removed by purge() instead of by the writes.
+"""
+# Python standard libraries
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Internal imports
+from response_cache import ResponseCache
+
+
+def count_rows(cache: ResponseCache) -> int:
+    return cache._db.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+
+def test_sqlite_tier_is_read_by_another_cache(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    writer = ResponseCache(10, 60, path)
+    reader = ResponseCache(10, 60, path)
+
+    async def scenario():
+        await writer.set("key", {"motivational_sentence": "You can do it"})
+        assert await reader.get("key") == {"motivational_sentence": "You can do it"}
+        assert await reader.get("other") is None
+
+    asyncio.run(scenario())
+    assert reader.stats()["disk_hits"] == 1
+    assert reader.stats()["misses"] == 1
+
+
+def test_purge_removes_expired_and_caps_the_tier(tmp_path):
+    cache = ResponseCache(10, 60, str(tmp_path / "cache.sqlite"), sqlite_max_entries=3)
+
+    async def scenario():
+        for i in range(5):
+            await cache.set(f"key{i}", {"n": i})
+        await cache.set("stale", {"n": -1})
+
+    asyncio.run(scenario())
+    cache._db.execute("UPDATE response_cache SET expires_at = 0 WHERE key = 'stale'")
+    # writes leave the purge to the timer
+    assert count_rows(cache) == 6
+
+    assert cache.purge() == 3
+    keys = {row[0] for row in cache._db.execute("SELECT key FROM response_cache")}
+    assert keys == {"key2", "key3", "key4"}
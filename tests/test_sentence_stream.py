@@ -0,0 +1,52 @@
+"""
+Streaming the sentence out of a JSON object that arrives in chunks (validations.text_cleaner.SentenceStreamExtractor)
+"""
+# Python standard libraries
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Internal imports
+from validations.text_cleaner import SentenceStreamExtractor
+
+# escaped quote and backslash, a "}" inside the value, an escaped Persian letter, an emoji as a surrogate
+# pair escape and a raw one, and a second field after the value
+RESPONSE = (
+    '```json\n{"language": "en", "motivational_sentence": "Say \\"yes\\" {today} \\\\ \\u0633\\n'
+    '\\ud83c\\udf1f 🚀", "tone": "calm"}\n```'
+)
+SENTENCE = json.loads(RESPONSE[RESPONSE.index("{"):RESPONSE.rindex("}") + 1])["motivational_sentence"]
+
+
+def stream(chunks) -> list[str]:
+    extractor = SentenceStreamExtractor()
+    return [extractor.feed(chunk) for chunk in chunks]
+
+
+def test_whole_response():
+    assert "".join(stream([RESPONSE])) == SENTENCE
+
+
+def test_same_sentence_whatever_the_chunk_boundaries():
+    for cut in range(1, len(RESPONSE)):
+        pieces = stream([RESPONSE[:cut], RESPONSE[cut:]])
+        assert "".join(pieces) == SENTENCE, cut
+        # half an escape or half a surrogate pair is never sent
+        assert SENTENCE.startswith(pieces[0]), cut
+        pieces[0].encode("utf-8")  # raises on a lone surrogate
+    assert "".join(stream(RESPONSE)) == SENTENCE
+
+
+def test_text_is_sent_as_soon_as_it_arrives():
+    pieces = stream(['{"motivational_sentence": "Keep', " going", '", "tone": "calm"}'])
+    assert pieces == ["Keep", " going", ""]
+
+
+def test_cut_off_response_gives_what_arrived():
+    assert "".join(stream(['{"motivational_sentence": "Keep go', "ing \\u06"])) == "Keep going "
+
+
+def test_no_sentence_field():
+    assert stream(['{"tone": "calm", ', '"other": "x"}']) == ["", ""]
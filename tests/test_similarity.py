@@ -0,0 +1,52 @@
+"""
+Near-duplicate detection of generated sentences (similarity.SimilarityIndex)
+"""
+# Python standard libraries
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Internal imports
+from similarity import SimilarityIndex, normalize
+
+
+def test_normalize_ignores_case_punctuation_and_spacing():
+    assert normalize("  Keep   GOING!! ") == "keep going"
+    assert normalize("امروز روز توست! 🌟") == "امروز روز توست 🌟"
+
+
+def test_exact_and_cosmetic_repeats_are_rejected():
+    index = SimilarityIndex()
+    assert index.add_if_new("Keep going, you are closer than you think.")
+    assert not index.add_if_new("Keep going, you are closer than you think.")
+    assert not index.add_if_new("keep going you are CLOSER than you think!")
+    assert len(index) == 1
+
+
+def test_reworded_repeat_is_rejected_and_new_sentence_kept():
+    index = SimilarityIndex(["You are so strong!"])
+    assert not index.add_if_new("you're so strong")
+    assert index.add_if_new("Believe in yourself today.")
+    assert len(index) == 2
+
+
+def test_persian_and_emoji():
+    index = SimilarityIndex(["امروز روز توست 🌟"])
+    assert not index.add_if_new("امروز روز توست! 🌟")
+    assert index.add_if_new("هر قدم کوچک تو را به هدف نزدیک‌تر می‌کند")
+
+
+def test_threshold():
+    strict = SimilarityIndex(["You are so strong!"], threshold=0.95)
+    assert strict.add_if_new("you're so strong")
+    # 1 still catches exact repeats despite float32 rounding
+    exact = SimilarityIndex(["Keep going"], threshold=1)
+    assert not exact.add_if_new("Keep going")
+    assert exact.add_if_new("Keep going today")
+
+
+def test_seeded_from_any_iterable():
+    index = SimilarityIndex(text for text in ["Small steps every day.", "Never give up."])
+    assert len(index) == 2
+    assert not index.add_if_new("Never give up!")
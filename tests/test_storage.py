@@ -0,0 +1,59 @@
+"""
+storage.FileStorage reads only the files of the records it returns, and its roster follows inputs appended
+between pages.
+"""
+# Python standard libraries
+import os
+import sys
+import builtins
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# external libraries
+import pytest
+# Internal imports
+import file_indexer
+from storage import FileStorage
+from sqlite_db import ThreadConnections
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    counters = ThreadConnections(str(tmp_path / "counters.sqlite"), file_indexer._connections.schema)
+    monkeypatch.setattr(file_indexer, "_connections", counters)
+    storage = FileStorage(str(tmp_path))
+    for i in range(60):
+        storage.save_input("daily", {"i": i}, f"user{i % 6}")
+    return storage
+
+
+@pytest.fixture
+def opened(monkeypatch):
+    """ Paths of the record files opened while the test runs """
+    paths = []
+    real_open = builtins.open
+
+    def counting_open(path, *args, **kwargs):
+        if str(path).endswith(".json"):
+            paths.append(path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", counting_open)
+    return paths
+
+
+def test_pages_open_only_their_files(storage, opened):
+    assert [record["payload"]["i"] for record in storage.list_inputs("daily", limit=5)] == [59, 58, 57, 56, 55]
+    assert len(opened) == 5
+    opened.clear()
+    assert storage.latest_input("daily", "user3")["payload"] == {"i": 57}
+    assert len(opened) == 1
+
+
+def test_roster_pages_and_later_inputs(storage):
+    first = storage.roster("daily", None, 4)
+    assert [record["user"] for record in first] == ["user0", "user1", "user2", "user3"]
+    storage.save_input("daily", {"i": 100}, "user4")
+    storage.save_input("daily", {"i": 101}, "user9")
+    rest = storage.roster("daily", first[-1]["user"], 4)
+    assert [(record["user"], record["payload"]["i"]) for record in rest] == [("user4", 100), ("user5", 59), ("user9", 101)]
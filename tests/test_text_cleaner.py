@@ -0,0 +1,46 @@
+"""
+Finding and repairing the JSON object in a model response (validations.text_cleaner.extract_json_object)
+"""
+# Python standard libraries
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Internal imports
+from validations.text_cleaner import extract_json_object
+
+
+def test_object_inside_prose_and_code_fence():
+    text = 'Here it is:\n```json\n{"sentence": "Keep going", "score": 3}\n```\nEnjoy!'
+    assert extract_json_object(text) == {"sentence": "Keep going", "score": 3}
+
+
+def test_first_object_only():
+    assert extract_json_object('{"a": 1} and then {"b": 2}') == {"a": 1}
+
+
+def test_brackets_and_escaped_quotes_inside_strings():
+    text = '{"s": "a \\"}\\" {", "n": {"k": "]"}, "l": ["[", "}"]} {"y": 1}'
+    assert extract_json_object(text) == {"s": 'a "}" {', "n": {"k": "]"}, "l": ["[", "}"]}
+
+
+def test_unicode_kept_and_whitespace_collapsed():
+    text = '{"sentence": "  سلام   دنیا\n\t🌟 ", "n": 1}'
+    assert extract_json_object(text) == {"sentence": "سلام دنیا 🌟", "n": 1}
+
+
+def test_cut_off_object_is_repaired():
+    assert extract_json_object('{"sentence": "Keep go') == {"sentence": "Keep go"}
+    assert extract_json_object('{"a": "x", "b": [1, 2,') == {"a": "x", "b": [1, 2]}
+    assert extract_json_object('{"a": {"b": "c"}') == {"a": {"b": "c"}}
+    # cut between a backslash and the character it escapes
+    assert extract_json_object('{"a": "x\\') == {"a": "x"}
+    assert extract_json_object('{"a": "x\\"') == {"a": 'x"'}
+
+
+def test_no_object():
+    assert extract_json_object("no JSON here") is None
+    assert extract_json_object("") is None
+    assert extract_json_object('{"a": [1}') is None
+    assert extract_json_object('{"a": 1,, }') is None
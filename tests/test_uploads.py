@@ -0,0 +1,65 @@
+"""
+Splitting a JSON array upload into its elements (uploads.JsonArraySplitter)
+"""
+# Python standard libraries
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Internal imports
+from uploads import JsonArraySplitter
+
+# strings holding quotes, backslashes, brackets and braces, nested values and bare scalars
+ARRAY = (
+    b' [ {"name": "a \\"quoted\\" ]} name", "tags": ["x", "{", "]"], "nested": {"deep": [1, {"k": "\\\\"}]}},\r\n'
+    b'"a string, with a comma ]", 42, -1.5e3, true, null, [], {} ]\n'
+)
+
+
+def split(chunks) -> list:
+    splitter = JsonArraySplitter()
+    items = [item for chunk in chunks for item in splitter.feed(chunk)]
+    splitter.close()
+    return [json.loads(item) for item in items]
+
+
+def test_elements_match_a_full_parse():
+    assert split([ARRAY]) == json.loads(ARRAY)
+
+
+def test_same_elements_whatever_the_chunk_boundaries():
+    expected = json.loads(ARRAY)
+    for cut in range(1, len(ARRAY)):
+        assert split([ARRAY[:cut], ARRAY[cut:]]) == expected, cut
+    assert split([ARRAY[i:i + 1] for i in range(len(ARRAY))]) == expected
+
+
+def test_empty_array():
+    assert split([b"[", b" ]"]) == []
+
+
+def test_truncated_upload_is_rejected():
+    for cut in (1, 20, len(ARRAY) - 3):
+        splitter = JsonArraySplitter()
+        splitter.feed(ARRAY[:cut])
+        with pytest.raises(ValueError, match="not closed"):
+            splitter.close()
+
+
+def test_not_an_array_is_rejected():
+    with pytest.raises(ValueError, match="neither JSONL nor a JSON array"):
+        JsonArraySplitter().feed(b'{"name": "a"}')
+    with pytest.raises(ValueError, match="after the end"):
+        JsonArraySplitter().feed(b'[1] [2]')
+
+
+def test_element_over_the_limit_is_rejected():
+    splitter = JsonArraySplitter(max_item_bytes=64)
+    assert splitter.feed(b'[{"name": "' + b"x" * 40 + b'"},') == [b'{"name": "' + b"x" * 40 + b'"}']
+    with pytest.raises(ValueError, match="larger than 64 bytes"):
+        for _ in range(10):
+            splitter.feed(b"y" * 10)
@@ -0,0 +1,179 @@
+# Python standard libraries
+import re
+from typing import AsyncIterator
+# external libraries
+from starlette.responses import JSONResponse
+# Internal imports
+from config import MAX_UPLOAD_BYTES, MAX_BULK_UPLOAD_BYTES, UPLOAD_CHUNK_BYTES
+
+""" Size-bounded uploads: a request body limit checked while the body is received, chunked reading of
+uploaded files, and a splitter that cuts a JSON array upload into its elements without loading it whole """
+
+# routes taking bulk uploads; every other request body is limited to MAX_UPLOAD_BYTES
+BULK_PATHS = ("/motivation/input_bulk", "/motivation/generate_batch")
+# multipart boundaries and form fields around the uploaded file
+FORM_OVERHEAD_BYTES = 16 * 1024
+
+WHITESPACE = b" \t\r\n"
+# characters that open or close a string, object or array; everything between them is skipped by the regex
+STRUCTURE = re.compile(rb'["\[\]{}]')
+STRING_REST = re.compile(rb'(?:[^"\\]|\\.)*"', re.DOTALL)
+SCALAR_END = re.compile(rb"[,\]]")
+
+
+class UploadTooLarge(ValueError):
+    def __init__(self, limit: int):
+        super().__init__(f"Upload larger than the limit of {limit} bytes")
+        self.limit = limit
+
+
+def body_limit(path: str) -> int:
+    return MAX_BULK_UPLOAD_BYTES if path in BULK_PATHS else MAX_UPLOAD_BYTES + FORM_OVERHEAD_BYTES
+
+
+class BodySizeLimitMiddleware:
+    """ Answers 413 as soon as a request body is over the limit of its route: up front by Content-Length,
+    and for chunked requests while the body is received, before the rest of it is spooled to disk """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = body_limit(scope["path"])
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > limit:
+            await self.reject(scope, receive, send, limit)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise UploadTooLarge(limit)
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+                if exceeded:
+                    # the app answered the cut-off body (FastAPI: 400 "error parsing the body"), 413 is sent instead
+                    await self.reject(scope, receive, send, limit)
+            if not exceeded:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+            if not response_started:
+                await self.reject(scope, receive, send, limit)
+
+    @staticmethod
+    async def reject(scope, receive, send, limit: int):
+        response = JSONResponse(content={"error": f"Request body larger than the limit of {limit} bytes"}, status_code=413)
+        await response(scope, receive, send)
+
+
+async def read_chunks(file, limit: int, chunk_size: int = UPLOAD_CHUNK_BYTES) -> AsyncIterator[bytes]:
+    """ The uploaded file chunk by chunk; raises UploadTooLarge once more than `limit` bytes were read """
+    total = 0
+    while chunk := await file.read(chunk_size):
+        total += len(chunk)
+        if total > limit:
+            raise UploadTooLarge(limit)
+        yield chunk
+
+
+async def read_upload(file, limit: int = MAX_UPLOAD_BYTES) -> bytes:
+    """ A single-input upload, read in chunks and never more than `limit` bytes of it """
+    return b"".join([chunk async for chunk in read_chunks(file, limit)])
+
+
+class JsonArraySplitter:
+    """ Cuts a JSON array fed in chunks into the raw bytes of its elements, so each one can be validated on
+    its own (pydantic-core parses it) and at most one element plus one chunk is held in memory. Only the
+    nesting is tracked; the elements themselves are not checked here. Raises ValueError on input that is not
+    an array and on an element longer than `max_item_bytes`. """
+
+    def __init__(self, max_item_bytes: int = MAX_UPLOAD_BYTES):
+        self.max_item_bytes = max_item_bytes
+        self.buffer = b""
+        self.pos = 0  # scan position in buffer
+        self.start = None  # buffer offset of the element being read
+        self.depth = 0
+        self.state = "before"  # "before" the opening bracket, in the "items", or after the "end"
+
+    def feed(self, data: bytes) -> list[bytes]:
+        buffer = self.buffer + data
+        i, items = self.pos, []
+        while i < len(buffer):
+            if self.start is None:
+                byte = buffer[i]
+                if byte in WHITESPACE or (byte == ord(",") and self.state == "items"):
+                    i += 1
+                elif self.state == "before" and byte == ord("["):
+                    self.state = "items"
+                    i += 1
+                elif self.state == "items" and byte == ord("]"):
+                    self.state = "end"
+                    i += 1
+                elif self.state == "items":
+                    self.start, self.depth = i, 0
+                else:
+                    raise ValueError("The upload is neither JSONL nor a JSON array" if self.state == "before"
+                                     else "Unexpected data after the end of the JSON array")
+                continue
+            if self.depth == 0 and buffer[self.start] not in b'{["':
+                # number, true, false or null: runs to the next separator
+                match = SCALAR_END.search(buffer, i)
+                if not match:
+                    i = len(buffer)
+                    break
+                items.append(buffer[self.start:match.start()].strip())
+                self.start, i = None, match.start()
+                continue
+            match = STRUCTURE.search(buffer, i)
+            if not match:
+                i = len(buffer)
+                break
+            byte = buffer[match.start()]
+            if byte == ord('"'):
+                rest = STRING_REST.match(buffer, match.end())
+                if not rest:
+                    i = match.start()  # string not complete yet, scanned again with the next chunk
+                    break
+                i = rest.end()
+            elif byte in b"[{":
+                self.depth += 1
+                i = match.end()
+            else:
+                self.depth -= 1
+                i = match.end()
+                if self.depth < 0:
+                    raise ValueError("Unbalanced brackets in the JSON array")
+            if self.depth == 0:
+                items.append(buffer[self.start:i])
+                self.start = None
+        keep = self.start if self.start is not None else i
+        self.buffer, self.pos = buffer[keep:], i - keep
+        if self.start is not None:
+            self.start = 0
+            if len(self.buffer) > self.max_item_bytes:
+                raise ValueError(f"A record of the JSON array is larger than {self.max_item_bytes} bytes")
+        return items
+
+    def close(self):
+        if self.state != "end":
+            raise ValueError("The JSON array is not closed, the upload ended early")
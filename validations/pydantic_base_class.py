@@ -42,14 +42,4 @@ class BaseMotivationInput(BaseModel):
         status = info.data.get("pregnancy_status")
         if status == "postpartum" and value is None:
             raise ValueError("child_age is required when pregnancy_status is 'postpartum'.")
-        return value
-
-    # Custom validator for pregnancy_status (optional)
-    @field_validator("pregnancy_status")
-    def validate_pregnancy_status(cls, value):
-        allowed = {"pregnant", "postpartum", "not_pregnant"}
-        if value not in allowed:
-            raise ValueError(
-                "pregnancy_status must be one of: pregnant, postpartum, not_pregnant"
-            )
         return value
\ No newline at end of file
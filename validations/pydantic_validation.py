@@ -27,8 +27,21 @@ class MotivationOutputValidation(BaseModel):
         return str(v)
 
 
+class MotivationListOutputValidation(BaseModel):
+    # several sentences from one call (SENTENCES_PER_CALL)
+    motivational_sentences: list[str]
+
+
 class UserMotivationInputWrapper(BaseModel):
     user_info: UserMotivationInput
 
 class DailyMotivationInputWrapper(BaseModel):
-    user_info: DailyMotivationInput
\ No newline at end of file
+    user_info: DailyMotivationInput
+
+
+# one record of /input_bulk: the input and the id of its user (generated when missing)
+class UserBulkInputRecord(UserMotivationInputWrapper):
+    user_id: Optional[str] = None
+
+class DailyBulkInputRecord(DailyMotivationInputWrapper):
+    user_id: Optional[str] = None
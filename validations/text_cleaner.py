@@ -1,10 +1,71 @@
 # Python standard libraries
 import re
+import json
 # internal modules
 from logger import get_logger
 
 logger = get_logger()
 
+# one token of JSON structure: a whole string literal (closed or cut off at the end of the text) or a bracket;
+# everything between tokens is skipped inside the regex engine instead of char by char in Python
+JSON_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*(?P<closed>"?)|[{}\[\]]', re.S)
+# built once: json.loads(..., strict=False) would create a new decoder on every call
+JSON_DECODER = json.JSONDecoder(strict=False)
+CLOSERS = {"{": "}", "[": "]"}
+
+
+def extract_json_object(text: str):
+    """
+    Single pass over the text: returns the first balanced JSON object as a dict, or None.
+    A response cut off mid-object (unclosed string, missing braces) is repaired by closing what is open.
+    Unicode (Persian, emoji) is kept as is; whitespace runs inside string values collapse to one space.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    expected = []
+    candidate = None
+    cut_string_end = None
+    for match in JSON_TOKEN.finditer(text, start):
+        token = match.group()
+        if token[0] == '"':
+            if not match.group("closed"):
+                cut_string_end = match.end()  # a trailing lone backslash is left out of the match
+                break
+        elif token in CLOSERS:
+            expected.append(CLOSERS[token])
+        elif not expected or expected.pop() != token:
+            return None
+        elif not expected:
+            candidate = text[start:match.end()]
+            break
+
+    if candidate is None:
+        # cut off: close the open string, drop a dangling comma and close every open bracket
+        if cut_string_end is not None:
+            candidate = text[start:cut_string_end] + '"'
+        else:
+            candidate = text[start:].rstrip().rstrip(",")
+        candidate += "".join(reversed(expected))
+        logger.warning("Model output was cut off, repaired the JSON object")
+    try:
+        data = JSON_DECODER.decode(candidate)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return {key: " ".join(value.split()) if isinstance(value, str) else value for key, value in data.items()}
+
+
+def parse_json_output(text: str) -> dict:
+    """ Fast path via extract_json_object; falls back to the regex clean-up when it cannot find an object """
+    data = extract_json_object(text)
+    if data is not None:
+        return data
+    logger.warning("Fast JSON extraction failed, falling back to normalize_mixed_text/force_json_closure")
+    return json.loads(force_json_closure(normalize_mixed_text(text.strip())))
+
+
 def force_json_closure(text: str) -> str:
     match = re.search(r"\{.*\}", text, re.S)
     if match:
@@ -24,4 +85,53 @@ def normalize_mixed_text(text: str) -> str:
     text = re.sub(r'[^\x20-\x7E\n]', '', text)
     text = re.sub(r'\s+', ' ', text)
     logger.debug("Text normalized using normalize_mixed_text")
-    return text.strip()
\ No newline at end of file
+    return text.strip()
+
+class SentenceStreamExtractor:
+    """
+    Incrementally pulls the value of "motivational_sentence" out of a JSON object arriving in chunks.
+    feed() returns only the newly decoded characters, so they can be forwarded as soon as they arrive.
+    """
+    KEY_PATTERN = re.compile(r'"motivational_sentence"\s*:\s*"')
+
+    def __init__(self):
+        self.buffer = ""
+        self.value_start = None
+        self.emitted = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> str:
+        if self.done:
+            return ""
+        self.buffer += chunk
+        if self.value_start is None:
+            match = self.KEY_PATTERN.search(self.buffer)
+            if not match:
+                return ""
+            self.value_start = match.end()
+
+        raw = self.buffer[self.value_start:]
+        # keep only complete characters: stop at the closing quote or before an escape cut in the middle
+        end = 0
+        while end < len(raw):
+            if raw[end] == "\\":
+                step = 6 if raw[end + 1:end + 2] == "u" else 2
+                if end + step > len(raw):
+                    break
+                end += step
+            elif raw[end] == '"':
+                self.done = True
+                break
+            else:
+                end += 1
+        raw = raw[:end]
+        try:
+            decoded = json.loads(f'"{raw}"', strict=False)
+        except json.JSONDecodeError:
+            return ""
+        # half of a surrogate pair (emoji sent as \ud83c\udf1f) waits for its second half
+        if not self.done and decoded and "\ud800" <= decoded[-1] <= "\udbff":
+            decoded = decoded[:-1]
+        new_text = decoded[self.emitted:]
+        self.emitted = len(decoded)
+        return new_text
@@ -0,0 +1,56 @@
+# Python standard libraries
+import os
+import itertools
+from typing import Optional
+# Internal imports
+from config import LOG_DIR, WORKERS
+
+""" A fixed number (1, 2, ...) per worker process when WORKERS > 1, used to name its log file (app-<slot>.log)
+and its rows in the shared metrics database.
+A process holds its slot by an exclusive lock on LOG_DIR/.slot-<n>.lock, which the OS releases when the
+process exits, so a restarted worker takes over a free slot and the number of files stays bounded. """
+
+_slot = None
+_slot_file = None  # kept open (and locked) for the lifetime of the process
+
+
+def _try_lock(f) -> bool:
+    try:
+        if os.name == "nt":
+            import msvcrt
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def _lock_path(slot: int) -> str:
+    return os.path.join(LOG_DIR, f".slot-{slot}.lock")
+
+
+def slot_in_use(slot: int) -> bool:
+    """ True while a live process holds the slot (including this process's own slot) """
+    if not os.path.exists(_lock_path(slot)):
+        return False
+    with open(_lock_path(slot), "a") as f:
+        # closing the file releases the lock again when it could be taken
+        return not _try_lock(f)
+
+
+def worker_slot() -> Optional[int]:
+    """ This process's slot, claimed on the first call; None with a single worker """
+    global _slot, _slot_file
+    if WORKERS == 1:
+        return None
+    if _slot is None:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        for slot in itertools.count(1):
+            f = open(_lock_path(slot), "a")
+            if _try_lock(f):
+                _slot, _slot_file = slot, f
+                break
+            f.close()
+    return _slot